@@ -13,9 +13,20 @@ import logging.config
 from aiogram import Bot, Dispatcher
 from aiogram.contrib.fsm_storage.files import JSONStorage
 
+from app.service.broadcast import Broadcaster
+from app.service.cache import UserCache
+from app.service.callback import CallbackCodec
 from app.service.cobra import CobraTaskReport, CobraTehn
 from app.service.config import CobraConfig, TelegramConfig
-from app.service.db import User
+from app.service.db import (
+    CallbackTokens,
+    Outbox,
+    ReportMessages,
+    TaskMirror,
+    TaskSearchIndex,
+    User,
+)
+from app.service.search import TaskSearch
 
 config_file = "config/config.ini"
 fsm_state_file = "job/states.json"
@@ -34,8 +45,15 @@ loop = asyncio.new_event_loop()
 asyncio.set_event_loop(loop)
 bot = Bot(token=tg_config.get_token(), loop=loop)
 dp = Dispatcher(bot, storage=JSONStorage(fsm_state_file))
+broadcaster = Broadcaster(bot, tg_config)
 
 
-user = User(db_file)
+user = UserCache(User(db_file), tg_config)
+outbox = Outbox(db_file)
+report_messages = ReportMessages(db_file)
+callback_codec = CallbackCodec(CallbackTokens(db_file))
+if cobra_config.get_mirror_enabled():
+    CobraTaskReport.mirror = TaskMirror(db_file)
 cobra_tasks = CobraTaskReport(cobra_config)
 cobra_account = CobraTehn(cobra_config)
+task_search = TaskSearch(cobra_tasks, TaskSearchIndex(db_file), tg_config)
@@ -5,15 +5,61 @@
 """
 
 # Standard Library
+import asyncio
+import time
 from datetime import datetime
 
+import aiohttp
 from aiogram import Dispatcher, types
 from aiogram.dispatcher import FSMContext
-
-from app.bot_global import bot, cobra_config, cobra_tasks, dp, logger, tg_config, user
+from aiogram.utils.exceptions import MessageNotModified
+
+from app.bot_global import (
+    bot,
+    callback_codec,
+    cobra_config,
+    cobra_tasks,
+    logger,
+    outbox,
+    task_search,
+    tg_config,
+    user,
+)
 from app.handlers.state import CloseMyTaskDialog, TaskParam
+from app.service.cache import UserTaskCache, UserTasks
+from app.service.callback import CallbackAction, CallbackRouter
 from app.service.cobra import CobraTaskEdit, CobraTaskReportMessage
-from tasks_notify import send_all_tasks, send_personal_tasks
+from tasks_notify import (
+    get_command_run_id,
+    send_all_tasks,
+    send_personal_tasks,
+)
+
+cobra_unavailable_text = "КПО Кобра временно недоступна, повторите запрос позже"
+""" Ответ пользователю, если данные КПО Кобра получить не удалось """
+
+callback_router = CallbackRouter(callback_codec)
+""" Маршрутизация нажатий кнопок модуля """
+
+my_tasks_cache = UserTaskCache(tg_config)
+""" Списки заявок пользователей для перелистывания страниц /my_tasks """
+
+
+def add_data_age(text: str, age: float | None) -> str:
+    """
+    Добавляет к тексту сообщения отметку о возрасте данных КПО Кобра.
+
+    Args:
+        text (str): текст сообщения
+        age (float | None): возраст данных в секундах или None, если данные
+        актуальны
+
+    Returns:
+        str: текст сообщения
+    """
+    if age is None:
+        return text
+    return f"{text}\r\n{CobraTaskReportMessage.get_data_age_text(age)}"
 
 
 def is_group_or_supergroup(message: types.Message) -> bool:
@@ -30,7 +76,7 @@ def is_group_or_supergroup(message: types.Message) -> bool:
     return type == types.ChatType.GROUP or type == types.ChatType.SUPERGROUP
 
 
-def is_private_chat(message: types.Message) -> bool:
+async def is_private_chat(message: types.Message) -> bool:
     """
     Проверяет пришло ли полученное сообщение в приватный чат.
 
@@ -42,31 +88,75 @@ def is_private_chat(message: types.Message) -> bool:
     """
     return (
         message.chat.type == types.ChatType.PRIVATE
-        and user.get_user(message.from_user.id) is not None
+        and await user.get_user(message.from_user.id) is not None
     )
 
 
-def get_task_action_params(data: str) -> tuple:
+async def get_my_tasks_page(user_tasks: UserTasks, page: int) -> tuple:
     """
-    Возвращает параметры функции обратного вызова для обработки заявки.
+    Возвращает страницу списка заявок пользователя.
 
-    Разбирает строку передаваемую функции обратного вызова, через
-    InlineKeyboard. Возвращает параметры
+    Страница содержит кнопки заявок и кнопки перехода к соседним страницам.
+    Номер страницы вне списка заменяется ближайшим допустимым.
 
     Args:
-        data (str): строка, содержащая данные параметров для функции обратного
-        вызова
+        user_tasks (UserTasks): список заявок пользователя
+        page (int): номер страницы, начиная с нуля
 
     Returns:
-        tuple: набор параметров
+        tuple: текст сообщения и types.InlineKeyboardMarkup
     """
-    params = data.split("|")
-    cobra_task_id = params[1]
-    chat_id = params[2]
-    return cobra_task_id, chat_id
+    page_size = tg_config.get_my_tasks_page_size()
+    pages = max(1, -(-len(user_tasks.tasks) // page_size))
+    page = min(max(page, 0), pages - 1)
+    start = page * page_size
+    end = start + page_size
+    btns = []
+    for task in user_tasks.tasks[start:end]:
+        btns.append(
+            [
+                types.InlineKeyboardButton(
+                    text=f"{task.numobj} (№ {task.n_abs} от {task.timez})",
+                    callback_data=await callback_codec.encode(
+                        CallbackAction.task, task.n_abs
+                    ),
+                ),
+            ]  # type: ignore
+        )
+    nav_btns = []
+    if page > 0:
+        nav_btns.append(
+            types.InlineKeyboardButton(
+                text="« Назад",
+                callback_data=await callback_codec.encode(
+                    CallbackAction.page, page - 1
+                ),
+            )
+        )
+    if page < pages - 1:
+        nav_btns.append(
+            types.InlineKeyboardButton(
+                text="Вперед »",
+                callback_data=await callback_codec.encode(
+                    CallbackAction.page, page + 1
+                ),
+            )
+        )
+    if nav_btns:
+        btns.append(nav_btns)
+    text = "Выберите заявку из предложенного списка."
+    if pages > 1:
+        text = f"{text} Страница {page + 1} из {pages}."
+    stale_age = user_tasks.stale_age
+    if stale_age is not None:
+        stale_age += time.monotonic() - user_tasks.loaded_at
+    return (
+        add_data_age(text, stale_age),
+        types.InlineKeyboardMarkup(inline_keyboard=btns),
+    )
 
 
-def get_close_task_buttons() -> types.InlineKeyboardMarkup:
+async def get_close_task_buttons() -> types.InlineKeyboardMarkup:
     """Возвращает доступные действия для подтверждения закрытия задачи.
 
     Кнопки: подтверждение, корректировка отмена.
@@ -78,19 +168,25 @@ def get_close_task_buttons() -> types.InlineKeyboardMarkup:
         [
             types.InlineKeyboardButton(
                 text="Подтвердить",
-                callback_data="closing_act_accept",
+                callback_data=await callback_codec.encode(
+                    CallbackAction.closing_accept
+                ),
             ),  # type: ignore
         ],
         [
             types.InlineKeyboardButton(
                 text="Корректировать текст результата",
-                callback_data="closing_act_edit",
+                callback_data=await callback_codec.encode(
+                    CallbackAction.closing_edit
+                ),
             ),  # type: ignore
         ],
         [
             types.InlineKeyboardButton(
                 text="Отмена",
-                callback_data="closing_act_cancel",
+                callback_data=await callback_codec.encode(
+                    CallbackAction.closing_cancel
+                ),
             ),  # type: ignore
         ],
     ]
@@ -111,9 +207,9 @@ async def cmd_tasks_notify(message: types.Message, state: FSMContext):
         state (FSMContext): состояние диалога
     """
     pre_msg = "Запуск генерации списка заявок. Пожалуйста ожидайте"
-    if is_private_chat(message):
+    if await is_private_chat(message):
         await message.answer(pre_msg)
-        await send_personal_tasks()
+        await send_personal_tasks(get_command_run_id(message))
     elif is_group_or_supergroup(message):
         if str(message.from_user.id) not in tg_config.get_admin_chat_ids():
             await message.answer(
@@ -123,7 +219,7 @@ async def cmd_tasks_notify(message: types.Message, state: FSMContext):
             )
             return
         await message.answer(pre_msg)
-        await send_all_tasks()  # type: ignore
+        await send_all_tasks(get_command_run_id(message))
     else:
         logger.warning(
             "Генерация отчета запрошена пользователем, \
@@ -140,8 +236,8 @@ async def cmd_my_tasks(message: types.Message, state: FSMContext):
         state (FSMContext): состояние диалога
     """
     await state.finish()
-    if is_private_chat(message):
-        my_user = user.get_user(message.chat.id)
+    if await is_private_chat(message):
+        my_user = await user.get_user(message.chat.id)
         if not my_user or not my_user.tehn:
             await message.answer(
                 "Вам не доступна возможность запроса списка \
@@ -151,26 +247,23 @@ async def cmd_my_tasks(message: types.Message, state: FSMContext):
             )
             await state.finish()
             return
-        my_tasks = cobra_tasks.get_my_tasks(my_user.tehn)
-        btns = []
+        try:
+            my_tasks = await cobra_tasks.get_my_tasks(
+                my_user.tehn, allow_degraded=True
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            logger.warning(f"Не удалось получить заявки: {error!r}")
+            await message.answer(cobra_unavailable_text)
+            return
+        stale_age = cobra_tasks.snapshot.stale_age
         if len(my_tasks):
-            for task in my_tasks:
-                callback_data = f"task|{task['n_abs']}|{message.from_user.id}"
-                btns.append(
-                    [
-                        types.InlineKeyboardButton(
-                            text=f"{task['numobj']} (№ {task['n_abs']} от {task['timez']})",
-                            callback_data=callback_data,
-                        ),
-                    ]  # type: ignore
-                )
-            my_tasks_kb = types.InlineKeyboardMarkup(inline_keyboard=btns)
-            await message.answer(
-                "Выберите заявку из предложенного списка.",
-                reply_markup=my_tasks_kb,
+            user_tasks = my_tasks_cache.put(
+                message.chat.id, my_tasks, stale_age
             )
+            text, my_tasks_kb = await get_my_tasks_page(user_tasks, 0)
+            await message.answer(text, reply_markup=my_tasks_kb)
         else:
-            await message.answer("У вас нет заявок")
+            await message.answer(add_data_age("У вас нет заявок", stale_age))
     else:
         msg = "Запрос событий доступен только для зарегистрированных \
 пользователей в личном чате с ботом"
@@ -208,7 +301,7 @@ async def cmd_close_task(message: types.Message, state: FSMContext):
     task_param = await state.get_data()
     cobra_task_id = task_param[TaskParam.task_id.value]
     task_closing_reason = await ask_before_close(message, state)
-    my_actions_kb = get_close_task_buttons()
+    my_actions_kb = await get_close_task_buttons()
     await message.answer(
         f"Заявка {cobra_task_id} будет закрыта. Причина: {task_closing_reason}.\
  Выберите действие:",
@@ -217,8 +310,52 @@ async def cmd_close_task(message: types.Message, state: FSMContext):
     return
 
 
-@dp.callback_query_handler(lambda c: c.data and c.data.startswith("task"))
-async def task_actions(callback: types.CallbackQuery):
+@callback_router.route(CallbackAction.page)
+async def my_tasks_page_action(
+    callback: types.CallbackQuery, state: FSMContext, page: int
+):
+    """
+    Перелистывание страниц списка заявок.
+
+    Страница берется из списка, сохраненного командой /my_tasks, и заменяет
+    содержимое того же сообщения. Если список устарел, заявки запрашиваются
+    заново.
+
+    Args:
+        callback (types.CallbackQuery): полученная функция обратного вызова
+        state (FSMContext): состояние диалога
+        page (int): номер страницы, начиная с нуля
+    """
+    chat_id = callback.message.chat.id
+    user_tasks = my_tasks_cache.get(chat_id)
+    if user_tasks is None:
+        my_user = await user.get_user(chat_id)
+        if not my_user or not my_user.tehn:
+            await callback.answer()
+            return
+        try:
+            my_tasks = await cobra_tasks.get_my_tasks(
+                my_user.tehn, allow_degraded=True
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            logger.warning(f"Не удалось получить заявки: {error!r}")
+            await callback.answer(cobra_unavailable_text)
+            return
+        user_tasks = my_tasks_cache.put(
+            chat_id, my_tasks, cobra_tasks.snapshot.stale_age
+        )
+    text, my_tasks_kb = await get_my_tasks_page(user_tasks, page)
+    try:
+        await callback.message.edit_text(text, reply_markup=my_tasks_kb)
+    except MessageNotModified:
+        pass
+    await callback.answer()
+
+
+@callback_router.route(CallbackAction.task)
+async def task_actions(
+    callback: types.CallbackQuery, state: FSMContext, cobra_task_id: int
+):
     """
     Действие при выборе заявки.
 
@@ -226,8 +363,10 @@ async def task_actions(callback: types.CallbackQuery):
 
     Args:
         callback (types.CallbackQuery): полученная функция обратного вызова
+        state (FSMContext): состояние диалога
+        cobra_task_id (int): абсолютный номер заявки
     """
-    cobra_task_id, chat_id = get_task_action_params(callback.data)
+    chat_id = callback.message.chat.id
     await bot.delete_message(
         chat_id=callback.from_user.id, message_id=callback.message.message_id
     )
@@ -235,13 +374,17 @@ async def task_actions(callback: types.CallbackQuery):
         [
             types.InlineKeyboardButton(
                 text="Просмотр заявки",
-                callback_data=f"view_act|{cobra_task_id}|{chat_id}",
+                callback_data=await callback_codec.encode(
+                    CallbackAction.view, cobra_task_id
+                ),
             ),  # type: ignore
         ],
         [
             types.InlineKeyboardButton(
                 text="Закрыть заявку",
-                callback_data=f"close_action|{cobra_task_id}|{chat_id}",
+                callback_data=await callback_codec.encode(
+                    CallbackAction.close, cobra_task_id
+                ),
             ),  # type: ignore
         ],
     ]
@@ -253,8 +396,10 @@ async def task_actions(callback: types.CallbackQuery):
     )
 
 
-@dp.callback_query_handler(lambda c: c.data and c.data.startswith("view_act"))
-async def view_task_action(callback: types.CallbackQuery):
+@callback_router.route(CallbackAction.view)
+async def view_task_action(
+    callback: types.CallbackQuery, state: FSMContext, cobra_task_id: int
+):
     """
     Просмотр заявки.
 
@@ -262,29 +407,42 @@ async def view_task_action(callback: types.CallbackQuery):
 
     Args:
         callback (types.CallbackQuery): полученная функция обратного вызова
+        state (FSMContext): состояние диалога
+        cobra_task_id (int): абсолютный номер заявки
     """
-    cobra_task_id, chat_id = get_task_action_params(callback.data)
+    chat_id = callback.message.chat.id
     await bot.delete_message(
         chat_id=callback.from_user.id, message_id=callback.message.message_id
     )
-    task = cobra_tasks.get_one_task(cobra_task_id)
+    try:
+        task = await cobra_tasks.get_one_task(
+            cobra_task_id, allow_degraded=True
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+        logger.warning(f"Не удалось получить заявку: {error!r}")
+        await bot.send_message(chat_id, cobra_unavailable_text)
+        return
     if len(task):
         report_message = CobraTaskReportMessage()
         report_message.add_task_to_report_message(task[0])
         report_message.add_generation_datetime()
+        report_message.add_data_age(cobra_tasks.snapshot.stale_age)
         text = report_message.get_report_message_text()
         await bot.send_message(chat_id, text, parse_mode="html")
 
 
-@dp.callback_query_handler(lambda c: c.data.startswith("close_action"))
-async def close_task_action(callback: types.CallbackQuery, state: FSMContext):
+@callback_router.route(CallbackAction.close)
+async def close_task_action(
+    callback: types.CallbackQuery, state: FSMContext, cobra_task_id: int
+):
     """
     Закрытие заявки.
 
     Args:
         callback (types.CallbackQuery): полученная функция обратного вызова
+        state (FSMContext): состояние диалога
+        cobra_task_id (int): абсолютный номер заявки
     """
-    cobra_task_id, chat_id = get_task_action_params(callback.data)
     await bot.delete_message(
         chat_id=callback.from_user.id, message_id=callback.message.message_id
     )
@@ -295,9 +453,8 @@ async def close_task_action(callback: types.CallbackQuery, state: FSMContext):
     return
 
 
-@dp.callback_query_handler(
-    lambda c: c.data == "closing_act_cancel",
-    state=CloseMyTaskDialog.waiting_input_reason,
+@callback_router.route(
+    CallbackAction.closing_cancel, state=CloseMyTaskDialog.waiting_input_reason
 )
 async def cancel_closing_task(callback: types.CallbackQuery, state: FSMContext):
     """Отмена действия закрытия заявки.
@@ -317,10 +474,12 @@ async def cancel_closing_task(callback: types.CallbackQuery, state: FSMContext):
     await state.finish()
 
 
-@dp.callback_query_handler(
-    lambda c: c.data == "closing_act_edit", state=CloseMyTaskDialog.waiting_input_reason
+@callback_router.route(
+    CallbackAction.closing_edit, state=CloseMyTaskDialog.waiting_input_reason
 )
-async def edit_closing_task_reason(callback: types.CallbackQuery):
+async def edit_closing_task_reason(
+    callback: types.CallbackQuery, state: FSMContext
+):
     """Модифицирует текст результата завершения заявки.
 
     Args:
@@ -333,9 +492,8 @@ async def edit_closing_task_reason(callback: types.CallbackQuery):
     await callback.message.answer("Введите результат исполнения заявки")
 
 
-@dp.callback_query_handler(
-    lambda c: c.data == "closing_act_accept",
-    state=CloseMyTaskDialog.waiting_input_reason,
+@callback_router.route(
+    CallbackAction.closing_accept, state=CloseMyTaskDialog.waiting_input_reason
 )
 async def accept_closing_task(callback: types.CallbackQuery, state: FSMContext):
     """Подтверждение закрытия заявки.
@@ -350,7 +508,7 @@ async def accept_closing_task(callback: types.CallbackQuery, state: FSMContext):
     task_param = await state.get_data()
     cobra_task_id = task_param[TaskParam.task_id.value]
     task_closing_reason = task_param[TaskParam.reason_for_close.value]
-    my_user = user.get_user(callback.message.chat.id)
+    my_user = await user.get_user(callback.message.chat.id)
     if not my_user:
         error_msg = "Не найден пользователь в БД для подтверждения закрытия \
 заявки"
@@ -360,8 +518,8 @@ async def accept_closing_task(callback: types.CallbackQuery, state: FSMContext):
 Результат: {task_closing_reason}"
 
     task_modify = CobraTaskEdit(cobra_config)
-    task_modify.finish_one_task(cobra_task_id)
-    task_modify.add_finish_task_reason(cobra_task_id, task_closing_reason)
+    await task_modify.finish_one_task(cobra_task_id, task_closing_reason)
+    my_tasks_cache.invalidate(callback.message.chat.id)
 
     await state.finish()
     await callback.message.answer(msg)
@@ -370,23 +528,25 @@ async def accept_closing_task(callback: types.CallbackQuery, state: FSMContext):
     await bot.delete_message(
         chat_id=callback.from_user.id, message_id=callback.message.message_id
     )
-    for chat in tg_config.get_task_full_report_chat_ids():
-        await bot.send_message(
-            chat,
-            msg,
-        )
+    await enqueue_group_notice(callback, msg)
 
 
-@dp.callback_query_handler(lambda c: c.data.startswith("accept_action"))
-async def accept_tasks(callback: types.CallbackQuery):
+@callback_router.route(CallbackAction.accept)
+async def accept_tasks(
+    callback: types.CallbackQuery, state: FSMContext, tehn: str
+):
     """Установка признака принятия заявки техником.
 
     Удаляет клавиатуру для избежания повторного нажатия. Запрашивает список
-    заявок текущего техника. Устанавливает метку "Принято". Задает дату/время
-    принятия заявки. Направляет уведомление в группу
+    заявок текущего техника из КПО Кобра в обход снимка, чтобы не отметить
+    принятой заявку, завершенную после загрузки снимка. Устанавливает метку
+    "Принято". Задает дату/время принятия заявки. Направляет уведомление в
+    группу. Если КПО Кобра недоступна, клавиатура возвращается
 
     Args:
         callback (types.CallbackQuery): полученная функция обратного вызова
+        state (FSMContext): состояние диалога
+        tehn (str): имя техника
     """
     await bot.edit_message_reply_markup(
         chat_id=callback.from_user.id,
@@ -394,27 +554,60 @@ async def accept_tasks(callback: types.CallbackQuery):
         reply_markup=None,
     )
 
-    params = callback.data.split("|")
-    tehn = params[1]
-    my_tasks = cobra_tasks.get_my_tasks(tehn)
+    task_modify = CobraTaskEdit(cobra_config)
+    try:
+        my_tasks = await task_modify.fetch_my_tasks(tehn)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+        logger.warning(f"Не удалось получить заявки: {error!r}")
+        await bot.edit_message_reply_markup(
+            chat_id=callback.from_user.id,
+            message_id=callback.message.message_id,
+            reply_markup=callback.message.reply_markup,
+        )
+        await callback.answer(cobra_unavailable_text)
+        return
     current_date = datetime.today().strftime("%d.%m.%Y")
     current_datetime = datetime.today().strftime("%d.%m.%Y %H:%M:%S")
     msg = f"{tehn} с соcтавом аварийных заявок на {current_date} \
 ознакомлен"
 
-    for task in my_tasks:
-        task_modify = CobraTaskEdit(cobra_config)
-        task_modify.accept_one_task(task["n_abs"])
-        task_modify.update_one_task_time(task["n_abs"], current_datetime)
+    results = await task_modify.edit_tasks(
+        {
+            task.n_abs: task_modify.get_accept_fields(current_datetime)
+            for task in my_tasks
+        }
+    )
+    for result in results:
+        if not result.success:
+            logger.error(
+                f"Не удалось отметить принятие заявки {result.n_abs}: \
+{result.error}"
+            )
+
+    await enqueue_group_notice(callback, msg)
+
 
+async def enqueue_group_notice(callback: types.CallbackQuery, text: str):
+    """Добавляет уведомление для общих групп в очередь исходящих сообщений.
+
+    Уведомления доставляются с соблюдением лимитов групп. Ключ сообщения
+    содержит ID нажатия кнопки, поэтому повторная обработка того же нажатия
+    не дублирует уведомление.
+
+    Args:
+        callback (types.CallbackQuery): полученная функция обратного вызова
+        text (str): текст уведомления
+    """
     for chat in tg_config.get_task_full_report_chat_ids():
-        await bot.send_message(
+        await outbox.enqueue(
+            f"notice:{callback.id}:{chat}",
             chat,
-            msg,
+            "send_message",
+            {"text": text},
         )
 
 
-@dp.callback_query_handler(lambda c: c.data.startswith("responsibility_act"))
+@callback_router.route(CallbackAction.responsibility)
 async def get_resp_persons(callback: types.CallbackQuery, state: FSMContext):
     """Действие, производимое при запросе корректировки заявок.
 
@@ -432,6 +625,50 @@ async def get_resp_persons(callback: types.CallbackQuery, state: FSMContext):
     return
 
 
+async def inline_task_search(inline_query: types.InlineQuery):
+    """Поиск текущих заявок в режиме inline.
+
+    Ищет заявки по номеру, наименованию и адресу объекта и тексту заявки.
+    Выбранный результат отправляет в чат карточку заявки. Поиск доступен
+    только зарегистрированным пользователям, поэтому Telegram хранит
+    результаты отдельно для каждого пользователя.
+
+    Args:
+        inline_query (types.InlineQuery): полученный inline-запрос
+    """
+    if not await user.is_user_exists(inline_query.from_user.id):
+        await inline_query.answer([], cache_time=0, is_personal=True)
+        return
+    try:
+        tasks = await task_search.search(
+            inline_query.query, tg_config.get_inline_results()
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+        logger.warning(f"Не удалось выполнить поиск заявок: {error!r}")
+        await inline_query.answer([], cache_time=0, is_personal=True)
+        return
+    results = []
+    for task in tasks:
+        report_message = CobraTaskReportMessage()
+        report_message.add_task_to_report_message(task)
+        results.append(
+            types.InlineQueryResultArticle(
+                id=str(task.n_abs),
+                title=f"{task.numobj} {task.nameobj} (№ {task.n_abs})",
+                description=f"{task.addrobj}\n{task.zay}",
+                input_message_content=types.InputTextMessageContent(
+                    report_message.get_report_message_text(),
+                    parse_mode="html",
+                ),
+            )
+        )
+    await inline_query.answer(
+        results,
+        cache_time=tg_config.get_inline_cache_time(),
+        is_personal=True,
+    )
+
+
 def register_handlers_event(dp: Dispatcher):
     """
     Регистрация обработчиков событий модуля.
@@ -444,3 +681,5 @@ def register_handlers_event(dp: Dispatcher):
     dp.register_message_handler(
         cmd_close_task, state=CloseMyTaskDialog.waiting_input_reason
     )
+    dp.register_callback_query_handler(callback_router.dispatch, state="*")
+    dp.register_inline_handler(inline_task_search, state="*")
@@ -40,7 +40,7 @@ async def cmd_signup(message: types.Message, state: FSMContext):
         )
         await state.finish()
         return
-    if user.is_user_exists(message.from_user.id):
+    if await user.is_user_exists(message.from_user.id):
         already_signed_up_msg = "Вы уже зарегистрированы. Регистрация \
 не требуется"
         await message.answer(already_signed_up_msg)
@@ -96,8 +96,8 @@ async def get_password(message: types.Message, state: FSMContext) -> None:
         status=Status.active,
         tehn=username,
     )
-    if cobra_account.is_account_valid(account):
-        user.add_user(one_user)
+    if await cobra_account.is_account_valid(account):
+        await user.add_user(one_user)
         await message.answer(
             "Вы успешно зарегистрированы. Теперь вы можете получить доступ \
 к функциям бота"
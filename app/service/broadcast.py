@@ -0,0 +1,541 @@
+"""Рассылка сообщений Telegram с учетом ограничений Bot API.
+
+Сообщения отправляются одновременно, частота отправки ограничивается общим
+лимитом бота и лимитами отдельных чатов.
+"""
+
+# Standard Library
+import asyncio
+import functools
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable
+
+import aiohttp
+from aiogram import Bot, types
+from aiogram.utils.exceptions import (
+    BadRequest,
+    MessageCantBeEdited,
+    MessageNotModified,
+    MessageToEditNotFound,
+    RetryAfter,
+    TelegramAPIError,
+    Unauthorized,
+)
+
+from app.service.config import TelegramConfig
+from app.service.db import (
+    Outbox,
+    OutboxMessage,
+    ReportMessage,
+    ReportMessages,
+)
+
+logger = logging.getLogger(__name__)
+
+delivery_errors = (TelegramAPIError, aiohttp.ClientError, asyncio.TimeoutError)
+""" Ошибки отправки сообщения Telegram """
+
+permanent_errors = (BadRequest, Unauthorized)
+""" Ошибки, при которых повтор отправки сообщения бесполезен: чат не найден,
+бот заблокирован пользователем, некорректное сообщение """
+
+
+@dataclass
+class BroadcastStats:
+    """Объект передачи данных.
+
+    Содержит счетчики рассылки.
+    """
+
+    sent: int = 0
+    dropped: int = 0
+    retried: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Число отправленных сообщений в секунду."""
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+
+class TokenBucket:
+    """Ограничение частоты операций.
+
+    Каждая операция расходует один токен, токены восполняются со скоростью
+    rate в секунду до capacity. Если токенов нет, операция резервирует
+    следующий токен и ожидает его появления, поэтому ожидающие операции
+    выполняются в порядке обращения.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:  # noqa D107
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        """Ожидает и расходует один токен."""
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self._rate)
+
+    def pause(self, seconds: float) -> None:
+        """Запрещает операции на указанное время.
+
+        Args:
+            seconds (float): время запрета, в секундах
+        """
+        self._tokens = min(self._tokens, -seconds * self._rate)
+        self._updated = time.monotonic()
+
+
+class Broadcaster:
+    """Одновременная отправка сообщений Telegram.
+
+    Соблюдает общий лимит бота, лимит личного чата и более строгий лимит
+    группы. Если Telegram отвечает RetryAfter, отправка в чат
+    приостанавливается на указанное время и повторяется. Сообщения в один
+    чат отправляются в порядке вызова.
+    """
+
+    def __init__(self, bot: Bot, config: TelegramConfig) -> None:  # noqa D107
+        self.stats = BroadcastStats()
+        self.bot = bot
+        self._global = TokenBucket(config.get_broadcast_rate())
+        self._chat_rate = config.get_broadcast_chat_rate()
+        self._group_rate = config.get_broadcast_group_rate() / 60
+        self._retries = config.get_broadcast_retries()
+        self._chats: dict = dict()
+        self._locks: dict = dict()
+
+    async def deliver(
+        self, chat_id: int | str, method: Callable[[], Awaitable]
+    ):
+        """Выполняет метод отправки с соблюдением лимитов.
+
+        Ошибка доставки передается вызывающему.
+
+        Args:
+            chat_id (int | str): ID чата Telegram
+            method (Callable[[], Awaitable]): вызов метода Bot API
+
+        Returns:
+            Any: результат метода
+
+        Raises:
+            RetryAfter: лимит превышен после всех повторов
+            TelegramAPIError: ошибка Bot API
+        """
+        async with self.chat_lock(chat_id):
+            return await self.deliver_locked(chat_id, method)
+
+    async def deliver_locked(
+        self, chat_id: int | str, method: Callable[[], Awaitable]
+    ):
+        """Выполняет метод отправки, когда блокировка чата уже получена.
+
+        Используется для нескольких отправок в чат, порядок которых не должен
+        нарушаться другими сообщениями: вызывающий удерживает chat_lock.
+
+        Args:
+            chat_id (int | str): ID чата Telegram
+            method (Callable[[], Awaitable]): вызов метода Bot API
+
+        Returns:
+            Any: результат метода
+
+        Raises:
+            RetryAfter: лимит превышен после всех повторов
+            TelegramAPIError: ошибка Bot API
+        """
+        bucket = self._get_bucket(int(chat_id))
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            await self._global.acquire()
+            try:
+                result = await method()
+            except RetryAfter as error:
+                if attempt == self._retries:
+                    raise
+                attempt += 1
+                self.stats.retried += 1
+                bucket.pause(error.timeout)
+                continue
+            self.stats.sent += 1
+            return result
+
+    def chat_lock(self, chat_id: int | str) -> asyncio.Lock:
+        """Возвращает блокировку, упорядочивающую отправки в чат.
+
+        Args:
+            chat_id (int | str): ID чата Telegram
+
+        Returns:
+            asyncio.Lock: блокировка чата
+        """
+        chat_id = int(chat_id)
+        lock = self._locks.get(chat_id)
+        if lock is None:
+            lock = self._locks[chat_id] = asyncio.Lock()
+        return lock
+
+    def record_dropped(self, chat_id: int | str, error: Exception) -> None:
+        """Учитывает недоставленное сообщение.
+
+        Args:
+            chat_id (int | str): ID чата Telegram
+            error (Exception): ошибка доставки
+        """
+        self.stats.dropped += 1
+        logger.warning(f"Сообщение в чат {chat_id} не доставлено: {error!r}")
+
+    async def run(self, sends: Iterable[Awaitable]) -> BroadcastStats:
+        """Выполняет рассылку одновременно и возвращает ее счетчики.
+
+        Args:
+            sends (Iterable[Awaitable]): вызовы методов отправки рассылки
+
+        Returns:
+            BroadcastStats: счетчики рассылки
+        """
+        before = BroadcastStats(**vars(self.stats))
+        started_at = time.monotonic()
+        await asyncio.gather(*sends)
+        stats = BroadcastStats(
+            sent=self.stats.sent - before.sent,
+            dropped=self.stats.dropped - before.dropped,
+            retried=self.stats.retried - before.retried,
+            elapsed=time.monotonic() - started_at,
+        )
+        self.stats.elapsed += stats.elapsed
+        logger.info(
+            f"Рассылка: отправлено {stats.sent}, не доставлено \
+{stats.dropped}, повторов {stats.retried}, {stats.elapsed:.1f} с, \
+{stats.throughput:.1f} сообщ./с"
+        )
+        return stats
+
+    def _get_bucket(self, chat_id: int) -> TokenBucket:
+        """Возвращает ограничение частоты чата.
+
+        ID групп отрицательные, для них действует лимит в минуту.
+        """
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            rate = self._group_rate if chat_id < 0 else self._chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate)
+        return bucket
+
+
+class OutboxWorker:
+    """Доставка сообщений из очереди исходящих сообщений.
+
+    Фоновая задача бота периодически выбирает из очереди сообщения, срок
+    доставки которых наступил, и отправляет их через Broadcaster. При
+    временной ошибке доставка повторяется с увеличивающейся задержкой, после
+    max_attempts попыток или при постоянной ошибке сообщение отклоняется.
+
+    Части общего отчета, добавленные методом live_report, обновляются
+    редактированием сообщений отчета за тот же день: неизмененные части не
+    отправляются, лишние части прежнего отчета удаляются. Если сообщение
+    отчета отсутствует, устарело или не может быть отредактировано,
+    отправляется новое сообщение. Части отчета одного чата доставляются под
+    блокировкой чата в порядке очереди, а часть, оказавшаяся в чате выше
+    предыдущей части, отправляется заново.
+    """
+
+    live_report_method = "live_report"
+    """ Метод очереди для части общего отчета, обновляемой редактированием """
+
+    batch_size = 100
+    """ Максимальное число сообщений, выбираемых из очереди за раз """
+
+    retention = 7 * 24 * 3600
+    """ Время хранения доставленных и отклоненных сообщений, в секундах """
+
+    file_ids_size = 32
+    """ Число запоминаемых file_id загруженных документов """
+
+    def __init__(  # noqa D107
+        self,
+        outbox: Outbox,
+        broadcaster: Broadcaster,
+        config: TelegramConfig,
+        reports: ReportMessages,
+    ) -> None:
+        self._outbox = outbox
+        self._reports = reports
+        self._broadcaster = broadcaster
+        self._interval = config.get_outbox_interval()
+        self._max_attempts = config.get_outbox_max_attempts()
+        self._retry_delay = config.get_outbox_retry_delay()
+        self._file_ids: dict[str, str] = dict()
+        self._uploads: dict[str, asyncio.Lock] = dict()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Запускает фоновую доставку."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую доставку."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def drain(self) -> None:
+        """Доставляет все сообщения, срок доставки которых наступил."""
+        messages = await self._outbox.get_due(self.batch_size)
+        while messages:
+            await self._broadcaster.run(
+                self._deliver(message) for message in messages
+            )
+            messages = await self._outbox.get_due(self.batch_size)
+        await self._outbox.purge(time.time() - self.retention)
+
+    async def _deliver(self, message: OutboxMessage) -> None:
+        try:
+            if message.method == self.live_report_method:
+                await self._deliver_report(message)
+            else:
+                await self._broadcaster.deliver(
+                    message.chat_id, self._get_method(message)
+                )
+        except delivery_errors as error:
+            attempts = message.attempts + 1
+            if isinstance(error, permanent_errors) or (
+                attempts >= self._max_attempts
+            ):
+                self._broadcaster.record_dropped(message.chat_id, error)
+                await self._outbox.mark_failed(message.id, repr(error))
+            else:
+                delay = self._retry_delay * 2 ** (attempts - 1)
+                await self._outbox.mark_retry(message.id, repr(error), delay)
+            return
+        except OSError as error:
+            self._broadcaster.record_dropped(message.chat_id, error)
+            await self._outbox.mark_failed(message.id, repr(error))
+            return
+        await self._outbox.mark_sent(message.id)
+
+    def _get_method(self, message: OutboxMessage) -> Callable[[], Awaitable]:
+        """Возвращает вызов метода Bot API для сообщения очереди."""
+        bot_method = getattr(self._broadcaster.bot, message.method)
+        kwargs = dict(message.payload)
+        path = kwargs.pop("document", None)
+        if path is None:
+            return lambda: bot_method(message.chat_id, **kwargs)
+        return lambda: self._send_document(
+            bot_method, message.chat_id, path, kwargs
+        )
+
+    async def _deliver_report(self, message: OutboxMessage) -> None:
+        """Отправляет или редактирует сообщение части общего отчета.
+
+        Части отчета читаются и отправляются под блокировкой чата, поэтому
+        части следуют в порядке очереди. Часть, отправленная раньше
+        предыдущей части отчета, например документ после добавленной части
+        сообщения, удаляется и отправляется заново, чтобы сохранить порядок
+        частей в чате.
+        """
+        payload = dict(message.payload)
+        part = payload.pop("part")
+        parts = payload.pop("parts")
+        report_date = payload.pop("date")
+        digest = payload.pop("digest")
+        chat_id = message.chat_id
+        async with self._broadcaster.chat_lock(chat_id):
+            current_parts = await self._reports.get_parts(chat_id)
+            current = current_parts.get(part)
+            if current is not None and current.report_date != report_date:
+                current = None
+            if current is not None and self._is_out_of_order(
+                current, current_parts, parts, report_date
+            ):
+                await self._delete_message(chat_id, current.message_id)
+                current = None
+            if current is None or current.digest != digest:
+                result = await self._broadcaster.deliver_locked(
+                    chat_id,
+                    self._get_report_method(chat_id, payload, current),
+                )
+                if isinstance(result, types.Message):
+                    message_id = result.message_id
+                else:
+                    message_id = current.message_id  # type: ignore
+                await self._reports.save(
+                    ReportMessage(
+                        chat_id, part, message_id, digest, report_date
+                    )
+                )
+            if part == parts[-1]:
+                await self._delete_stale_parts(chat_id, parts, report_date)
+
+    @staticmethod
+    def _is_out_of_order(
+        current: ReportMessage,
+        current_parts: dict,
+        parts: list,
+        report_date: str,
+    ) -> bool:
+        """Проверяет, отправлено ли сообщение части раньше предыдущих частей.
+
+        Args:
+            current (ReportMessage): сообщение части отчета
+            current_parts (dict): сообщения частей отчета чата по имени части
+            parts (list): имена всех частей отчета в порядке отправки
+            report_date (str): дата отчета
+
+        Returns:
+            bool: True, если предыдущая часть отчета находится в чате ниже
+        """
+        for previous in parts[: parts.index(current.part)]:
+            message = current_parts.get(previous)
+            if (
+                message is not None
+                and message.report_date == report_date
+                and message.message_id > current.message_id
+            ):
+                return True
+        return False
+
+    def _get_report_method(
+        self, chat_id: int, payload: dict, current: ReportMessage | None
+    ) -> Callable[[], Awaitable]:
+        """Возвращает вызов отправки или редактирования части отчета."""
+        bot = self._broadcaster.bot
+        path = payload.pop("document", None)
+        if path is None:
+            send = functools.partial(bot.send_message, chat_id, **payload)
+        else:
+            send = functools.partial(
+                self._send_document, bot.send_document, chat_id, path, payload
+            )
+        if current is None:
+            return send
+        if path is None:
+            edit = functools.partial(
+                bot.edit_message_text,
+                chat_id=chat_id,
+                message_id=current.message_id,
+                **payload,
+            )
+        else:
+            edit_media = functools.partial(
+                self._edit_media, message_id=current.message_id
+            )
+            edit = functools.partial(
+                self._send_document, edit_media, chat_id, path, {}
+            )
+        return functools.partial(self._edit_or_send, edit, send)
+
+    async def _edit_media(self, chat_id: int, document, message_id: int):
+        """Заменяет документ сообщения."""
+        return await self._broadcaster.bot.edit_message_media(
+            types.InputMediaDocument(document), chat_id, message_id
+        )
+
+    @staticmethod
+    async def _edit_or_send(
+        edit: Callable[[], Awaitable], send: Callable[[], Awaitable]
+    ):
+        """Редактирует сообщение, а если оно недоступно, отправляет новое.
+
+        Returns:
+            types.Message|None: сообщение или None, если текст не изменился
+        """
+        try:
+            return await edit()
+        except MessageNotModified:
+            return None
+        except (MessageToEditNotFound, MessageCantBeEdited):
+            return await send()
+
+    async def _delete_stale_parts(
+        self, chat_id: int, parts: list, report_date: str
+    ) -> None:
+        """Удаляет части прежнего отчета, отсутствующие в новом отчете.
+
+        Сообщения отчетов за прошлые дни остаются в чате. Вызывается под
+        блокировкой чата.
+        """
+        current_parts = await self._reports.get_parts(chat_id)
+        for stale in current_parts.values():
+            if stale.part in parts:
+                continue
+            if stale.report_date == report_date:
+                await self._delete_message(chat_id, stale.message_id)
+            await self._reports.delete(chat_id, stale.part)
+
+    async def _delete_message(self, chat_id: int, message_id: int) -> None:
+        """Удаляет сообщение отчета под блокировкой чата.
+
+        Ошибка удаления не прерывает доставку отчета.
+        """
+        try:
+            await self._broadcaster.deliver_locked(
+                chat_id,
+                functools.partial(
+                    self._broadcaster.bot.delete_message, chat_id, message_id
+                ),
+            )
+        except delivery_errors as error:
+            logger.warning(
+                f"Не удалось удалить сообщение отчета в чате \
+{chat_id}: {error!r}"
+            )
+
+    async def _send_document(
+        self, bot_method: Callable, chat_id: int, path: str, kwargs: dict
+    ):
+        """Отправляет документ.
+
+        Файл загружается в Telegram один раз: одновременные отправки того же
+        файла ожидают завершения загрузки, после чего отправляют документ по
+        его file_id.
+        """
+        async with self._get_upload_lock(path):
+            file_id = self._file_ids.get(path)
+            if file_id is not None:
+                return await bot_method(chat_id, document=file_id, **kwargs)
+            with open(path, "rb") as document:
+                input_file = types.InputFile(
+                    document, filename=Path(path).name
+                )
+                result = await bot_method(
+                    chat_id, document=input_file, **kwargs
+                )
+            self._file_ids[path] = result.document.file_id
+            while len(self._file_ids) > self.file_ids_size:
+                expired = next(iter(self._file_ids))
+                del self._file_ids[expired]
+                self._uploads.pop(expired, None)
+            return result
+
+    def _get_upload_lock(self, path: str) -> asyncio.Lock:
+        lock = self._uploads.get(path)
+        if lock is None:
+            lock = self._uploads[path] = asyncio.Lock()
+        return lock
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.drain()
+            except Exception as error:
+                logger.warning(f"Ошибка доставки очереди сообщений: {error!r}")
+            await asyncio.sleep(self._interval)
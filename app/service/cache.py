@@ -0,0 +1,642 @@
+"""Кэширование данных КПО Кобра и пользователей бота.
+
+Содержит общий для процесса снимок таблицы заявок с ограниченным временем
+жизни, индекс учетных данных техников, списки заявок пользователей для
+перелистывания страниц и зарегистрированных пользователей бота.
+"""
+
+# Standard Library
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Iterable
+
+from app.service.config import CobraConfig, TelegramConfig
+from app.service.db import OneUser, Task, TaskSet, User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    """Объект передачи данных.
+
+    Содержит счетчики обращений к кэшу.
+    """
+
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+    invalidations: int = 0
+    degraded: int = 0
+
+
+class TaskSnapshotCache:
+    """Снимок таблицы заявок КПО Кобра.
+
+    Пока возраст снимка не превышает ttl, данные возвращаются из памяти.
+    Если возраст снимка между ttl и max_staleness, возвращается имеющийся
+    снимок, а обновление запускается в фоне. Более старый снимок загружается
+    заново. Одновременные промахи ожидают одну общую загрузку. Нулевое время
+    жизни отключает кэширование: снимок загружается при каждом обращении.
+
+    Последний успешно загруженный снимок сохраняется в файл. Если вызывающий
+    допускает устаревшие данные (allow_degraded), а загрузка не завершилась
+    за degraded_budget или завершилась ошибкой, возвращается последний
+    успешный снимок, а загрузка продолжается в фоне. Это действует и при
+    отключенном кэшировании, в том числе для запросов заявок в обход снимка
+    (fetch). Остальные вызывающие ожидают загрузку.
+    """
+
+    def __init__(self) -> None:  # noqa D107
+        self.stats = CacheStats()
+        self.version = 0
+        """ Номер версии снимка, увеличивается при каждом изменении """
+        self._ttl = CobraConfig.default_cache_ttl
+        self._max_staleness = CobraConfig.default_cache_max_staleness
+        self._degraded_budget = CobraConfig.default_degraded_budget
+        self._file: Path | None = None
+        self._tasks: TaskSet | None = None
+        self._loaded_at = 0.0
+        self._loading: asyncio.Task | None = None
+        self._last_good: TaskSet | None = None
+        self._last_good_at = 0.0
+        self._served_at = 0.0
+        self._served_degraded = False
+
+    def configure(self, config: CobraConfig) -> None:
+        """Устанавливает время жизни снимка из файла конфигурации.
+
+        Если последний успешный снимок еще не загружен, он читается из файла.
+
+        Args:
+            config (CobraConfig): параметры подключения к КПО Кобра
+        """
+        self._ttl = config.get_cache_ttl()
+        self._max_staleness = max(self._ttl, config.get_cache_max_staleness())
+        self._degraded_budget = config.get_degraded_budget()
+        snapshot_file = config.get_snapshot_file()
+        self._file = Path(snapshot_file) if snapshot_file else None
+        if self._last_good is None:
+            self._read_file()
+
+    @property
+    def enabled(self) -> bool:
+        """Признак включенного кэширования."""
+        return self._ttl > 0
+
+    @property
+    def age(self) -> float | None:
+        """Возраст снимка в секундах или None, если снимок не загружен."""
+        if self._tasks is None:
+            return None
+        return time.monotonic() - self._loaded_at
+
+    @property
+    def stale_age(self) -> float | None:
+        """Возраст последнего возвращенного снимка, если он превышает ttl.
+
+        Returns:
+            float|None: возраст данных в секундах или None, если возвращены
+            актуальные данные
+        """
+        if not self._served_at:
+            return None
+        age = time.time() - self._served_at
+        if self._served_degraded or (self.enabled and age > self._ttl):
+            return age
+        return None
+
+    def served_live(self) -> None:
+        """Отмечает, что возвращены данные, полученные из КПО Кобра."""
+        self._served_at = time.time()
+        self._served_degraded = False
+
+    async def get(
+        self,
+        loader: Callable[[], Awaitable[TaskSet]],
+        allow_degraded: bool = False,
+    ) -> TaskSet:
+        """Возвращает снимок заявок.
+
+        Args:
+            loader (Callable[[], Awaitable[TaskSet]]): загрузка заявок из КПО
+            Кобра
+            allow_degraded (bool): допускается возврат последнего успешного
+            снимка, если загрузка не завершилась за degraded_budget
+
+        Returns:
+            TaskSet: заявки из снимка
+        """
+        age = self.age
+        if self.enabled and self._tasks is not None and age is not None:
+            if age <= self._ttl:
+                self.stats.hits += 1
+                return self._serve(self._tasks)
+            if age <= self._max_staleness:
+                self.stats.stale_hits += 1
+                self._start_loading(loader)
+                return self._serve(self._tasks)
+        self.stats.misses += 1
+        loading = self._start_loading(loader)
+        if not allow_degraded or not self._is_degraded_available():
+            return self._serve(await asyncio.shield(loading))
+        try:
+            tasks = await asyncio.wait_for(
+                asyncio.shield(loading), self._degraded_budget
+            )
+        except Exception as error:
+            return self._serve_degraded(error)
+        return self._serve(tasks)
+
+    async def fetch(
+        self,
+        loader: Callable[[], Awaitable[TaskSet]],
+        matches: Callable[[Task], bool],
+        allow_degraded: bool = False,
+    ) -> TaskSet:
+        """Запрашивает заявки из КПО Кобра в обход снимка.
+
+        Если устаревшие данные допускаются, а запрос не выполнен за
+        degraded_budget или завершился ошибкой, заявки отбираются из
+        последнего успешного снимка.
+
+        Args:
+            loader (Callable[[], Awaitable[TaskSet]]): запрос заявок
+            matches (Callable[[Task], bool]): условие отбора заявки из снимка
+            allow_degraded (bool): допускается отбор заявок из последнего
+            успешного снимка
+
+        Returns:
+            TaskSet: заявки
+        """
+        if not allow_degraded or not self._is_degraded_available():
+            tasks = await loader()
+        else:
+            try:
+                tasks = await asyncio.wait_for(
+                    loader(), self._degraded_budget
+                )
+            except Exception as error:
+                last_good = self._serve_degraded(error)
+                return TaskSet(task for task in last_good if matches(task))
+        self.served_live()
+        return tasks
+
+    def invalidate(self) -> None:
+        """Сбрасывает снимок. Следующее обращение загрузит его заново."""
+        self.stats.invalidations += 1
+        self._tasks = None
+
+    def patch(self, n_abs: int, fields: dict) -> None:
+        """Применяет изменение полей заявки к снимку.
+
+        Args:
+            n_abs (int): абсолютный номер заявки
+            fields (dict): новые значения полей заявки
+        """
+        if self._tasks is not None:
+            self._tasks.patch(n_abs, fields)
+            self.version += 1
+
+    def remove(self, n_abs: int) -> None:
+        """Удаляет заявку из снимка.
+
+        Args:
+            n_abs (int): абсолютный номер заявки
+        """
+        if self._tasks is not None:
+            self._tasks.remove(n_abs)
+            self.version += 1
+
+    def _start_loading(
+        self, loader: Callable[[], Awaitable[TaskSet]]
+    ) -> asyncio.Task:
+        """Запускает загрузку снимка, если она еще не выполняется."""
+        loop = asyncio.get_running_loop()
+        loading = self._loading
+        if loading is None or loading.done() or loading.get_loop() is not loop:
+            loading = loop.create_task(self._load(loader))
+            loading.add_done_callback(self._on_loaded)
+            self._loading = loading
+        return loading
+
+    async def _load(
+        self, loader: Callable[[], Awaitable[TaskSet]]
+    ) -> TaskSet:
+        tasks = await loader()
+        self.stats.refreshes += 1
+        self._tasks = tasks
+        self._loaded_at = time.monotonic()
+        self.version += 1
+        self._last_good = tasks
+        self._last_good_at = time.time()
+        if self._file is not None:
+            rows = [task.to_row() for task in tasks]
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._write_file, rows, self._last_good_at
+            )
+        return tasks
+
+    def _serve(self, tasks: TaskSet) -> TaskSet:
+        """Запоминает время загрузки возвращаемого снимка."""
+        if tasks is self._last_good:
+            self._served_at = self._last_good_at
+        else:
+            self._served_at = time.time()
+        self._served_degraded = False
+        return tasks
+
+    def _is_degraded_available(self) -> bool:
+        """Проверяет, можно ли вернуть последний успешный снимок."""
+        return self._last_good is not None and self._degraded_budget > 0
+
+    def _serve_degraded(self, error: Exception) -> TaskSet:
+        """Возвращает последний успешный снимок вместо незагруженных данных."""
+        self.stats.degraded += 1
+        logger.warning(
+            f"Заявки возвращены из последнего успешного снимка: {error!r}"
+        )
+        self._serve(self._last_good)  # type: ignore
+        self._served_degraded = True
+        return self._last_good  # type: ignore
+
+    def _read_file(self) -> None:
+        """Читает последний успешный снимок из файла."""
+        if self._file is None or not self._file.exists():
+            return
+        try:
+            with self._file.open(encoding="utf-8") as snapshot_file:
+                data = json.load(snapshot_file)
+            tasks = TaskSet(Task.from_row(row) for row in data["tasks"])
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            logger.warning(f"Не удалось прочитать снимок заявок: {error!r}")
+            return
+        self._last_good = tasks
+        self._last_good_at = float(data["loaded_at"])
+
+    def _write_file(self, rows: list, loaded_at: float) -> None:
+        """Сохраняет снимок в файл. Файл заменяется целиком."""
+        path: Path = self._file  # type: ignore
+        temp_path = None
+        try:
+            # Файл пишут бот и планировщик, у каждого записи свой
+            # временный файл
+            with tempfile.NamedTemporaryFile(
+                "w",
+                encoding="utf-8",
+                dir=path.parent,
+                prefix=f"{path.name}.",
+                suffix=".tmp",
+                delete=False,
+            ) as snapshot_file:
+                temp_path = snapshot_file.name
+                json.dump(
+                    {"loaded_at": loaded_at, "tasks": rows},
+                    snapshot_file,
+                    ensure_ascii=False,
+                )
+            os.replace(temp_path, path)
+        except OSError as error:
+            logger.warning(f"Не удалось сохранить снимок заявок: {error!r}")
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def _on_loaded(loading: asyncio.Task) -> None:
+        """Журналирует ошибку загрузки снимка."""
+        if not loading.cancelled() and loading.exception() is not None:
+            logger.warning(
+                f"Не удалось обновить снимок заявок: {loading.exception()!r}"
+            )
+
+
+class AccountIndex:
+    """Индекс учетных данных техников из таблицы lkuser КПО Кобра.
+
+    Индекс хранит только хэши паролей с солью, создаваемой при запуске
+    процесса, и обновляется не реже, чем раз в ttl. Если техник не найден
+    или пароль не совпал, индекс обновляется вне очереди, но не чаще, чем
+    раз в refresh_interval: так находятся только что созданные учетные записи
+    и измененные пароли.
+    """
+
+    def __init__(self) -> None:  # noqa D107
+        self.stats = CacheStats()
+        self._ttl = CobraConfig.default_accounts_ttl
+        self._refresh_interval = CobraConfig.default_accounts_refresh_interval
+        self._salt = os.urandom(hashlib.blake2b.SALT_SIZE)
+        self._hashes: dict[str, tuple] = dict()
+        self._loaded_at: float | None = None
+        self._loading: asyncio.Task | None = None
+
+    def configure(self, config: CobraConfig) -> None:
+        """Устанавливает периоды обновления из файла конфигурации.
+
+        Args:
+            config (CobraConfig): параметры подключения к КПО Кобра
+        """
+        self._ttl = config.get_accounts_ttl()
+        self._refresh_interval = config.get_accounts_refresh_interval()
+
+    async def verify(
+        self,
+        username: str,
+        password: str,
+        loader: Callable[[], AsyncIterator[dict]],
+    ) -> bool:
+        """Проверяет учетные данные техника.
+
+        Args:
+            username (str): имя техника (поле fio)
+            password (str): пароль техника
+            loader (Callable[[], AsyncIterator[dict]]): чтение строк таблицы
+            lkuser с полями fio и pass
+
+        Returns:
+            bool: результат проверки
+        """
+        age = self._get_age()
+        if age is None or age > self._ttl:
+            self.stats.misses += 1
+            await asyncio.shield(self._start_loading(loader))
+        elif self._check(username, password):
+            self.stats.hits += 1
+            return True
+        else:
+            self.stats.misses += 1
+            if age < self._refresh_interval:
+                return False
+            await asyncio.shield(self._start_loading(loader))
+        return self._check(username, password)
+
+    def invalidate(self) -> None:
+        """Сбрасывает индекс. Следующая проверка загрузит его заново."""
+        self.stats.invalidations += 1
+        self._loaded_at = None
+
+    def _get_age(self) -> float | None:
+        if self._loaded_at is None:
+            return None
+        return time.monotonic() - self._loaded_at
+
+    def _check(self, username: str, password: str) -> bool:
+        """Сравнивает хэш пароля с хэшами техника за постоянное время."""
+        digest = self._hash(password)
+        matched = False
+        for known in self._hashes.get(username, ()):
+            matched |= hmac.compare_digest(digest, known)
+        return matched
+
+    def _hash(self, password: str) -> bytes:
+        return hashlib.blake2b(
+            password.encode(), salt=self._salt, digest_size=32
+        ).digest()
+
+    def _start_loading(
+        self, loader: Callable[[], AsyncIterator[dict]]
+    ) -> asyncio.Task:
+        """Запускает загрузку индекса, если она еще не выполняется."""
+        loop = asyncio.get_running_loop()
+        loading = self._loading
+        if loading is None or loading.done() or loading.get_loop() is not loop:
+            loading = loop.create_task(self._load(loader))
+            self._loading = loading
+        return loading
+
+    async def _load(self, loader: Callable[[], AsyncIterator[dict]]) -> None:
+        hashes: dict[str, tuple] = dict()
+        async for row in loader():
+            if row.get("pass") is None:
+                continue
+            name = str(row["fio"])
+            digest = self._hash(str(row["pass"]))
+            hashes[name] = hashes.get(name, ()) + (digest,)
+        self.stats.refreshes += 1
+        self._hashes = hashes
+        self._loaded_at = time.monotonic()
+
+
+@dataclass
+class UserTasks:
+    """Объект передачи данных.
+
+    Содержит список заявок пользователя, показанный командой /my_tasks.
+    """
+
+    tasks: tuple
+    stale_age: float | None
+    loaded_at: float
+
+
+class UserTaskCache:
+    """Списки заявок пользователей для перелистывания страниц /my_tasks.
+
+    Список хранится ttl секунд после запроса, поэтому перелистывание страниц
+    не обращается к КПО Кобра. Устаревшие списки удаляются при сохранении
+    нового списка.
+    """
+
+    def __init__(self, config: TelegramConfig) -> None:  # noqa D107
+        self.stats = CacheStats()
+        self._ttl = config.get_my_tasks_cache_ttl()
+        self._lists: dict[int, UserTasks] = dict()
+
+    def get(self, chat_id: int) -> UserTasks | None:
+        """Возвращает список заявок пользователя, если он не устарел.
+
+        Args:
+            chat_id (int): ID чата Telegram
+
+        Returns:
+            UserTasks|None: список заявок или None
+        """
+        user_tasks = self._lists.get(chat_id)
+        if user_tasks is None or self._is_expired(user_tasks):
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return user_tasks
+
+    def put(
+        self, chat_id: int, tasks: tuple, stale_age: float | None
+    ) -> UserTasks:
+        """Сохраняет список заявок пользователя.
+
+        Args:
+            chat_id (int): ID чата Telegram
+            tasks (tuple): заявки пользователя
+            stale_age (float | None): возраст данных КПО Кобра
+
+        Returns:
+            UserTasks: сохраненный список
+        """
+        for expired in [
+            key for key, item in self._lists.items() if self._is_expired(item)
+        ]:
+            del self._lists[expired]
+        user_tasks = UserTasks(tuple(tasks), stale_age, time.monotonic())
+        self._lists[chat_id] = user_tasks
+        return user_tasks
+
+    def invalidate(self, chat_id: int) -> None:
+        """Удаляет список заявок пользователя.
+
+        Args:
+            chat_id (int): ID чата Telegram
+        """
+        self.stats.invalidations += 1
+        self._lists.pop(chat_id, None)
+
+    def _is_expired(self, user_tasks: UserTasks) -> bool:
+        return time.monotonic() - user_tasks.loaded_at > self._ttl
+
+
+class UserCache:
+    """Зарегистрированные пользователи бота.
+
+    Таблица user загружается целиком при первом обращении и хранится в
+    словарях по chat_id и по имени техника МТ, поэтому проверка
+    пользователя не обращается к БД. Регистрация и смена статуса
+    записываются в БД и сразу применяются к кэшу. Изменения, внесенные
+    другим процессом, становятся видны после перечитывания таблицы через
+    ttl секунд.
+    """
+
+    def __init__(  # noqa D107
+        self, users: User, config: TelegramConfig
+    ) -> None:
+        self.stats = CacheStats()
+        self._users = users
+        self._ttl = config.get_user_cache_ttl()
+        self._by_chat_id: dict[int, OneUser] = dict()
+        self._by_tehn: dict[str, OneUser] = dict()
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def load(self) -> None:
+        """Перечитывает пользователей из БД."""
+        async with self._lock:
+            await self._load()
+
+    async def get_user(self, chat_id: int) -> OneUser | None:
+        """Возвращает данные пользователя по Telegram chat id.
+
+        Args:
+            chat_id (int): Telegram Chat ID
+
+        Returns:
+            OneUser|None: DTO с данными пользователя
+        """
+        await self._refresh()
+        return self._count(self._by_chat_id.get(chat_id))
+
+    async def get_user_by_tehn(self, tehn: str) -> OneUser | None:
+        """Возвращает данные пользователя по имени техника МТ.
+
+        Args:
+            tehn (str): имя техника в приложении МТ
+
+        Returns:
+            OneUser|None: DTO с данными пользователя
+        """
+        await self._refresh()
+        return self._count(self._by_tehn.get(tehn))
+
+    async def get_users_by_tehns(self, tehns: Iterable[str]) -> dict:
+        """Возвращает данные пользователей по именам техников МТ.
+
+        Args:
+            tehns (Iterable[str]): имена техников в приложении МТ
+
+        Returns:
+            dict: DTO с данными пользователя (OneUser) по имени техника;
+            техники без зарегистрированного пользователя не включаются
+        """
+        await self._refresh()
+        users = dict()
+        for tehn in tehns:
+            one_user = self._count(self._by_tehn.get(tehn))
+            if one_user is not None:
+                users[tehn] = one_user
+        return users
+
+    async def is_user_exists(self, chat_id: int) -> bool:
+        """Проверяет существование пользователя по Telegram chat id.
+
+        Args:
+            chat_id (int): Telegram chat_id
+
+        Returns:
+            bool: результат проверки (True/False)
+        """
+        return await self.get_user(chat_id) is not None
+
+    async def add_user(self, user: OneUser) -> None:
+        """Добавляет пользователя в БД и в кэш.
+
+        Args:
+            user (OneUser): DTO с данными пользователя
+        """
+        async with self._lock:
+            await self._users.add_user(user)
+            self._put(user)
+
+    async def change_status(self, user: OneUser) -> None:
+        """Изменяет статус пользователя в БД и в кэше.
+
+        Args:
+            user (OneUser): DTO с данными пользователя
+        """
+        async with self._lock:
+            await self._users.change_status(user)
+            cached = self._by_chat_id.get(user.chat_id)
+            if cached is not None:
+                cached.status = user.status
+
+    def invalidate(self) -> None:
+        """Отмечает кэш устаревшим: таблица перечитывается при обращении."""
+        self.stats.invalidations += 1
+        self._loaded_at = None
+
+    async def _refresh(self) -> None:
+        if not self._is_expired():
+            return
+        async with self._lock:
+            if self._is_expired():
+                await self._load()
+
+    async def _load(self) -> None:
+        users = await self._users.get_users()
+        self._by_chat_id = dict()
+        self._by_tehn = dict()
+        for one_user in users:
+            self._put(one_user)
+        self._loaded_at = time.monotonic()
+        self.stats.refreshes += 1
+
+    def _put(self, user: OneUser) -> None:
+        self._by_chat_id[user.chat_id] = user
+        if user.tehn:
+            self._by_tehn.setdefault(user.tehn, user)
+
+    def _count(self, user: OneUser | None) -> OneUser | None:
+        if user is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return user
+
+    def _is_expired(self) -> bool:
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at > self._ttl
+        )
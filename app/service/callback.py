@@ -0,0 +1,269 @@
+"""Кодирование callback_data кнопок и маршрутизация нажатий.
+
+callback_data содержит версию формата, короткий код действия и параметры.
+Числа записываются в системе счисления по основанию 36, строки заменяются
+токенами из таблицы БД, поэтому данные кнопки укладываются в ограничение
+Telegram в 64 байта. Данные кнопок, отправленных до введения формата,
+разбираются по-прежнему.
+"""
+
+# Standard Library
+import inspect
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from aiogram import types
+from aiogram.dispatcher import FSMContext
+from aiogram.dispatcher.filters.state import State
+
+from app.service.db import CallbackTokens
+
+logger = logging.getLogger(__name__)
+
+
+class CallbackAction:
+    """Коды действий кнопок."""
+
+    task = "t"
+    """ Выбор заявки из списка /my_tasks """
+
+    view = "v"
+    """ Просмотр заявки """
+
+    close = "c"
+    """ Закрытие заявки """
+
+    closing_accept = "ca"
+    """ Подтверждение закрытия заявки """
+
+    closing_edit = "ce"
+    """ Корректировка результата закрытия заявки """
+
+    closing_cancel = "cx"
+    """ Отмена закрытия заявки """
+
+    accept = "a"
+    """ Ознакомление техника с заявками """
+
+    responsibility = "r"
+    """ Корректировка ответственных лиц """
+
+    page = "p"
+    """ Перелистывание страниц списка /my_tasks """
+
+
+@dataclass(frozen=True)
+class CallbackData:
+    """Объект передачи данных.
+
+    Содержит разобранные данные нажатой кнопки.
+    """
+
+    action: str
+    args: tuple = ()
+
+
+class CallbackCodec:
+    """Кодирование и разбор callback_data.
+
+    Формат: "<версия><код действия>:<параметр>:...". Параметр-число
+    записывается по основанию 36, параметр-строка заменяется токеном с
+    префиксом "~". Токены разрешаются через таблицу callback_token и
+    запоминаются в памяти: значение токена не изменяется.
+    """
+
+    version = "1"
+    """ Версия формата callback_data """
+
+    separator = ":"
+    """ Разделитель действия и параметров """
+
+    token_prefix = "~"
+    """ Признак параметра, заданного токеном """
+
+    max_size = 64
+    """ Максимальный размер callback_data в байтах """
+
+    legacy_actions = {
+        "task": CallbackAction.task,
+        "view_act": CallbackAction.view,
+        "close_action": CallbackAction.close,
+        "closing_act_accept": CallbackAction.closing_accept,
+        "closing_act_edit": CallbackAction.closing_edit,
+        "closing_act_cancel": CallbackAction.closing_cancel,
+        "accept_action": CallbackAction.accept,
+        "responsibility_act": CallbackAction.responsibility,
+    }
+    """ Коды действий по именам действий прежнего формата """
+
+    def __init__(self, tokens: CallbackTokens) -> None:  # noqa D107
+        self._tokens = tokens
+        self._values: dict[str, str] = dict()
+
+    async def encode(self, action: str, *args: int | str) -> str:
+        """Возвращает callback_data кнопки.
+
+        Args:
+            action (str): код действия (CallbackAction)
+            args (int | str): параметры действия
+
+        Returns:
+            str: callback_data
+
+        Raises:
+            ValueError: размер callback_data превышает ограничение Telegram
+        """
+        encoded = [await self._encode_arg(arg) for arg in args]
+        data = self.separator.join([self.version + action, *encoded])
+        if len(data.encode()) > self.max_size:
+            raise ValueError(f"callback_data превышает {self.max_size} байт")
+        return data
+
+    async def decode(self, data: str | None) -> CallbackData | None:
+        """Разбирает callback_data.
+
+        Args:
+            data (str | None): callback_data нажатой кнопки
+
+        Returns:
+            CallbackData|None: данные кнопки или None, если формат, токен
+            или параметр некорректны
+        """
+        if not data:
+            return None
+        if not data.startswith(self.version):
+            return self._decode_legacy(data)
+        start = len(self.version)
+        action, *encoded = data[start:].split(self.separator)
+        token_start = len(self.token_prefix)
+        args = []
+        for arg in encoded:
+            if arg.startswith(self.token_prefix):
+                value = await self._resolve(arg[token_start:])
+                if value is None:
+                    return None
+                args.append(value)
+            else:
+                try:
+                    args.append(int(arg, 36))
+                except ValueError:
+                    return None
+        return CallbackData(action, tuple(args))
+
+    async def _encode_arg(self, arg: int | str) -> str:
+        if isinstance(arg, int):
+            return self._to_base36(arg)
+        token = await self._tokens.put(arg)
+        self._values[token] = arg
+        return self.token_prefix + token
+
+    async def _resolve(self, token: str) -> str | None:
+        value = self._values.get(token)
+        if value is None:
+            value = await self._tokens.get(token)
+            if value is not None:
+                self._values[token] = value
+        return value
+
+    def _decode_legacy(self, data: str) -> CallbackData | None:
+        """Разбирает callback_data прежнего формата "действие|параметр|...".
+
+        ID чата из данных прежнего формата не используется: кнопки заявок
+        отправлялись в личный чат нажавшего их техника.
+        """
+        name, *params = data.split("|")
+        action = self.legacy_actions.get(name)
+        if action is None:
+            return None
+        if action in (
+            CallbackAction.task,
+            CallbackAction.view,
+            CallbackAction.close,
+        ):
+            try:
+                return CallbackData(action, (int(params[0]),))
+            except (IndexError, ValueError):
+                return None
+        return CallbackData(action, tuple(params))
+
+    @staticmethod
+    def _to_base36(value: int) -> str:
+        digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+        if value < 0:
+            return "-" + CallbackCodec._to_base36(-value)
+        encoded = ""
+        while True:
+            value, digit = divmod(value, 36)
+            encoded = digits[digit] + encoded
+            if not value:
+                return encoded
+
+
+class CallbackRouter:
+    """Маршрутизация нажатий кнопок.
+
+    Регистрируется в диспетчере одним обработчиком для любого состояния
+    диалога. Обработчик нажатия выбирается по коду действия одним обращением
+    к словарю. Состояние диалога проверяется так же, как фильтр state
+    диспетчера: действие без состояния доступно вне диалога, действие с
+    состоянием "*" - в любом состоянии. Нажатие в другом состоянии или с
+    неверным числом параметров игнорируется.
+    """
+
+    any_state = "*"
+    """ Состояние, при котором действие доступно в любом состоянии диалога """
+
+    def __init__(self, codec: CallbackCodec) -> None:  # noqa D107
+        self._codec = codec
+        self._routes: dict[str, tuple] = dict()
+
+    def route(self, action: str, state: State | str | None = None) -> Callable:
+        """Регистрирует обработчик действия.
+
+        Обработчик вызывается с параметрами callback, state и параметрами
+        действия.
+
+        Args:
+            action (str): код действия (CallbackAction)
+            state (State | str | None): состояние диалога, в котором
+            доступно действие, "*" для любого состояния или None вне диалога
+
+        Returns:
+            Callable: декоратор обработчика
+        """
+
+        def decorator(handler: Callable[..., Awaitable]):
+            arg_count = len(inspect.signature(handler).parameters) - 2
+            self._routes[action] = (handler, state, arg_count)
+            return handler
+
+        return decorator
+
+    async def dispatch(
+        self, callback: types.CallbackQuery, state: FSMContext
+    ) -> None:
+        """Вызывает обработчик нажатой кнопки.
+
+        Args:
+            callback (types.CallbackQuery): полученная функция обратного
+            вызова
+            state (FSMContext): состояние диалога
+        """
+        data = await self._codec.decode(callback.data)
+        route = self._routes.get(data.action) if data is not None else None
+        if route is None:
+            logger.warning(f"Неизвестные данные кнопки: {callback.data}")
+            await callback.answer()
+            return
+        handler, required_state, arg_count = route
+        if len(data.args) != arg_count:  # type: ignore
+            logger.warning(f"Неверные параметры кнопки: {callback.data}")
+            await callback.answer()
+            return
+        if required_state != self.any_state:
+            expected = getattr(required_state, "state", required_state)
+            if await state.get_state() != expected:
+                await callback.answer()
+                return
+        await handler(callback, state, *data.args)  # type: ignore
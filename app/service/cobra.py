@@ -4,15 +4,43 @@
 """
 
 # Standard Library
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import sqlite3
+import time
 import urllib.parse
-import urllib.request
 from abc import ABC
-from datetime import datetime
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Iterable
 
-import requests
+import aiohttp
+from yarl import URL
 
+from app.service.cache import AccountIndex, TaskSnapshotCache
 from app.service.config import CobraConfig
-from app.service.db import CobraOneLkUser, MobileAppAccount
+from app.service.db import (
+    CobraTaskEditResult,
+    MobileAppAccount,
+    ReportMessages,
+    Task,
+    TaskMirror,
+    TaskSet,
+)
+from app.service.http import (
+    CircuitBreaker,
+    CobraSession,
+    RetryPolicy,
+    SingleFlight,
+    iter_json_array,
+    loads,
+)
+from app.service.query import CobraQuery
+
+logger = logging.getLogger(__name__)
 
 
 class TaskReportHeader:
@@ -32,6 +60,49 @@ class TaskReportHeader:
     timev = "Назначенное время"
 
 
+class TaskFields:
+    """Наборы полей таблицы заявок, запрашиваемые из КПО Кобра.
+
+    Для каждого представления запрашиваются только нужные ему поля.
+    """
+
+    list_view = ("n_abs", "numobj", "timez")
+    """ Список заявок техника (кнопки /my_tasks) """
+
+    card_view = (
+        "n_abs",
+        "zay",
+        "prin",
+        "who",
+        "timez",
+        "nameobj",
+        "numobj",
+        "addrobj",
+    )
+    """ Карточка заявки и текст отчета """
+
+    excel_report = (
+        "timez",
+        "timev",
+        "prin",
+        "numobj",
+        "nameobj",
+        "addrobj",
+        "zay",
+        "tehn",
+    )
+    """ Строка отчета в формате Excel """
+
+    query = ("n_abs", "zay", "tehn", "timev", "sttech")
+    """ Поля, по которым отбираются заявки """
+
+    @staticmethod
+    def merge(*field_sets: tuple) -> tuple:
+        """Объединяет наборы полей с сохранением порядка."""
+        names = (name for fields in field_sets for name in fields)
+        return tuple(dict.fromkeys(names))
+
+
 class CobraTable(ABC):
     """Базовый класс для получения данных из таблиц КПО Кобра."""
 
@@ -42,11 +113,38 @@ class CobraTable(ABC):
     удаленного доступа """
     token_key = "pud"
 
+    read_only = True
+    """ Запрос не изменяет данные и может быть объединен с одинаковыми
+    одновременными запросами """
+
+    session = CobraSession()
+    """ Общий для процесса пул соединений с КПО Кобра """
+
+    flights = SingleFlight()
+    """ Выполняющиеся запросы чтения, общие для всех клиентов процесса """
+
+    breaker = CircuitBreaker()
+    """ Общая для процесса приостановка запросов к недоступной КПО Кобра """
+
     def __init__(self, config: CobraConfig) -> None:  # noqa D107
         self._host = config.get_host()
         self._port = config.get_port()
         self._token = config.get_token()
         self._endpoint_url = self._get_endpoint_url()
+        self.session.configure(config)
+        self.breaker.configure(config)
+        if self.read_only:
+            self._deadline = config.get_read_deadline()
+            retries = config.get_retries()
+        else:
+            self._deadline = config.get_write_deadline()
+            retries = 0
+        self._retry = RetryPolicy(retries, config.get_retry_backoff())
+
+    @classmethod
+    async def close_session(cls) -> None:
+        """Закрывает общий пул соединений с КПО Кобра."""
+        await cls.session.close()
 
     def _get_endpoint_url(self) -> str:
         """Генерирует полный url для отправки http-запроса."""
@@ -54,6 +152,139 @@ class CobraTable(ABC):
         token = urllib.parse.urlencode({self.token_key: self._token})
         return f"{endpoint}?{token}"
 
+    async def _request(self, params: dict) -> dict:
+        """Выполняет асинхронный http-запрос к REST API КПО Кобра.
+
+        Args:
+            params (dict): параметры запроса
+
+        Returns:
+            dict: ответ REST API КПО Кобра
+        """
+        query_string = urllib.parse.urlencode(params)
+        return await self._request_url(f"{self._endpoint_url}&{query_string}")
+
+    async def _select(self, query: CobraQuery) -> list:
+        """Выполняет запрос чтения строк таблицы.
+
+        Условия, которые не выражаются фильтром КПО Кобра, проверяются по
+        полученным строкам.
+
+        Args:
+            query (CobraQuery): запрос к таблице КПО Кобра
+
+        Returns:
+            list: строки таблицы, удовлетворяющие условиям запроса
+        """
+        response = await self._request_url(self._get_query_url(query))
+        return query.filter_response(response["result"])
+
+    async def _stream(self, query: CobraQuery) -> AsyncIterator[dict]:
+        """Выполняет запрос чтения строк таблицы с потоковым разбором ответа.
+
+        Строки разбираются по мере получения тела ответа и сразу проверяются
+        условиями запроса, поэтому ответ целиком в памяти не хранится. Запрос
+        повторяется, только если ошибка произошла до получения первой строки.
+
+        Args:
+            query (CobraQuery): запрос к таблице КПО Кобра
+
+        Yields:
+            dict: строки таблицы, удовлетворяющие условиям запроса
+        """
+        url = URL(self._get_query_url(query), encoded=True)
+        attempt = 0
+        while True:
+            self.breaker.check()
+            session = await self.session.get()
+            timeout = self.session.get_timeout(self._deadline)
+            received = False
+            try:
+                async with session.get(url, timeout=timeout) as resp:
+                    resp.raise_for_status()
+                    async for row in iter_json_array(resp.content):
+                        received = True
+                        if query.accepts(row):
+                            yield row
+                    size = resp.content.total_bytes
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                await self._on_error(error, attempt, retry=not received)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            self.session.record_response(size)
+            logger.debug(f"{resp.url.path} {query.table}: {size} байт")
+            return
+
+    def _get_query_url(self, query: CobraQuery) -> str:
+        """Генерирует url запроса. Параметры запроса кэшируются."""
+        return f"{self._endpoint_url}&{query.compile()}"
+
+    async def _request_url(self, url: str) -> dict:
+        """Выполняет http-запрос по готовому url.
+
+        Запрос не блокирует цикл событий, поэтому ожидание ответа КПО Кобра
+        не задерживает обработку остальных обновлений бота. Соединение берется
+        из общего пула и возвращается в него после чтения ответа. Одинаковые
+        одновременные запросы чтения выполняются один раз, разобранный ответ
+        возвращается всем ожидающим.
+        """
+        if not self.read_only:
+            return await self._send(url)
+        return await self.flights.do(url, lambda: self._send(url))
+
+    async def _send(self, url: str) -> dict:
+        """Отправляет http-запрос к REST API КПО Кобра.
+
+        Время выполнения запроса ограничено. Неудачные запросы чтения
+        повторяются с задержкой, запросы изменения не повторяются.
+        """
+        attempt = 0
+        while True:
+            self.breaker.check()
+            session = await self.session.get()
+            timeout = self.session.get_timeout(self._deadline)
+            try:
+                async with session.get(
+                    URL(url, encoded=True), timeout=timeout
+                ) as resp:
+                    resp.raise_for_status()
+                    body = await resp.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                await self._on_error(error, attempt)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            self.session.record_response(len(body))
+            table_name = resp.url.query.get("name")
+            logger.debug(f"{resp.url.path} {table_name}: {len(body)} байт")
+            return loads(body)
+
+    async def _on_error(
+        self, error: Exception, attempt: int, retry: bool = True
+    ) -> None:
+        """Учитывает ошибку запроса и ожидает перед повтором.
+
+        Args:
+            error (Exception): ошибка запроса
+            attempt (int): номер попытки, начиная с нуля
+            retry (bool): допускается ли повтор запроса
+
+        Raises:
+            Exception: ошибка запроса, если запрос не будет повторен
+        """
+        if not self._retry.is_transient(error):
+            self.breaker.record_success()
+            raise error
+        self.breaker.record_failure()
+        if not retry or attempt >= self._retry.retries:
+            raise error
+        delay = self._retry.get_delay(attempt)
+        logger.info(
+            f"Повтор запроса к КПО Кобра через {delay:.1f} с: {error!r}"
+        )
+        await asyncio.sleep(delay)
+
 
 class CobraTaskReport(CobraTable):
     """Реализует запрос к REST API КПО Кобра, формирует параметры запроса.
@@ -68,157 +299,375 @@ class CobraTaskReport(CobraTable):
     table_name = "zayavki"
     """ Название таблицы, хранящей данные заявок """
 
-    def get_tasks(self) -> tuple:
-        """Получает заявки из КПО Кобра."""
-        response = self._get_unfinished_tasks()
-        tasks_list = list()
-        current_date = datetime.today().date()
-        for task in response:
-            timev = datetime.strptime(task["timev"], "%d.%m.%Y %H:%M:%S")
-            if current_date >= timev.date() and task["sttech"] != 3:
-                tasks_list.append(task)
-        return tuple(tasks_list)
+    snapshot = TaskSnapshotCache()
+    """ Общий для процесса снимок текущих заявок """
+
+    snapshot_fields = TaskFields.merge(
+        TaskFields.query, TaskFields.card_view, TaskFields.excel_report
+    )
+    """ Поля снимка: снимок используется всеми представлениями заявок """
+
+    mirror: TaskMirror | None = None
+    """ Локальная копия текущих заявок в БД. Устанавливается при включенной
+    синхронизации копии """
+
+    def __init__(self, config: CobraConfig) -> None:  # noqa D107
+        super().__init__(config)
+        self.snapshot.configure(config)
+        self._mirror_max_age = config.get_mirror_max_age()
 
-    def get_my_tasks(self, name: str) -> tuple:
+    async def get_tasks(self) -> TaskSet:
+        """Получает заявки из КПО Кобра.
+
+        Returns:
+            TaskSet: незавершенные заявки с назначенным временем не позднее
+            текущей даты
+        """
+        current_date = datetime.today().date()
+        query = (
+            self._get_query(self.snapshot_fields)
+            .date_until("timev", current_date)
+            .not_equals("sttech", 3)
+        )
+        if await self._has_local_tasks():
+            task_set = await self._get_unfinished_tasks()
+            tasks = task_set.get_until(current_date)
+            return TaskSet(task for task in tasks if query.matches(task))
+        return await self.snapshot.fetch(
+            lambda: self._fetch_tasks(query), query.matches
+        )
+
+    async def get_my_tasks(
+        self, name: str, allow_degraded: bool = False
+    ) -> tuple:
         """Возвращает заявки техника по его имени из МТ.
 
         Args:
             name (str): имя техника из приложения МТ КПО Кобра.
+            allow_degraded (bool): допускаются заявки из последнего
+            успешного снимка, если КПО Кобра не отвечает
 
         Returns:
             tuple: кортеж, содержащий данные заявок.
         """
-        response = self._get_unfinished_tasks()
-        tasks_list = []
-        for task in response:
-            if task["tehn"] == name and task["sttech"] != 3:
-                tasks_list.append(task)
-        return tuple(tasks_list)
-
-    def get_one_task(self, n_abs: str) -> tuple:
+        fields = TaskFields.merge(TaskFields.query, TaskFields.list_view)
+        query = (
+            self._get_query(fields)
+            .equals("tehn", name)
+            .not_equals("sttech", 3)
+        )
+        if await self._has_local_tasks():
+            task_set = await self._get_unfinished_tasks(allow_degraded)
+            tasks = task_set.get_by_tehn(name)
+            return tuple(task for task in tasks if query.matches(task))
+        tasks = await self.snapshot.fetch(
+            lambda: self._fetch_tasks(query), query.matches, allow_degraded
+        )
+        return tuple(tasks)
+
+    async def get_one_task(
+        self, n_abs: int | str, allow_degraded: bool = False
+    ) -> tuple:
         """Получение данных одной заявки по ее абсолютному номеру.
 
+        Заявка ищется в снимке текущих заявок. Если в снимке ее нет, данные
+        запрашиваются из КПО Кобра.
+
         Args:
-            n_abs (str): абсолютный номер заявки. Используется str, т.к.
-            в этом формате возвращается от REST API КПО Кобра.
+            n_abs (int | str): абсолютный номер заявки
+            allow_degraded (bool): допускается заявка из последнего
+            успешного снимка, если КПО Кобра не отвечает
 
         Returns:
             tuple: данные одной заявки.
         """
-        url = f"{self._endpoint_url}"
-        params = {
-            "name": self.table_name,
-            "filter": '[{"n_abs": "' + n_abs + '"}]',
-        }
-        response = requests.get(url=url, params=params).json()
-        return (response["result"][0],)
+        if await self._has_local_tasks():
+            task_set = await self._get_unfinished_tasks(allow_degraded)
+            local_task = task_set.get(n_abs)
+            if local_task is not None:
+                return (local_task,)
+        task = await self.fetch_one_task(n_abs, TaskFields.card_view)
+        self.snapshot.served_live()
+        return (task,) if task is not None else ()
+
+    async def get_unfinished_tasks(self) -> TaskSet:
+        """Возвращает все текущие заявки из общего снимка.
 
-    def _get_unfinished_tasks(self):
-        """Запрос текущих заявок из КПО Кобра."""
-        url = f"{self._endpoint_url}"
-        params = {
-            "name": self.table_name,
-            "filter": self._get_filter(),
-        }
-        response = requests.get(url=url, params=params).json()
-        result = sorted(response["result"], key=lambda task: task["tehn"])
-        return result
+        Returns:
+            TaskSet: текущие заявки
+        """
+        return await self._get_unfinished_tasks()
 
-    def _get_filter(self):
-        """Установка фильтра при запросе заявок из КПО Кобра."""
-        filter_value = '[{"zay": "' + self.name_template + '"}]'
-        return f"{filter_value}"
+    async def fetch_unfinished_tasks(self, fields: tuple) -> TaskSet:
+        """Запрашивает текущие заявки непосредственно из КПО Кобра.
 
-    def _get_fields(self):
-        """Запрос полей из таблицы КПО Кобра.
+        Args:
+            fields (tuple): запрашиваемые поля заявок
 
-        Запрашиваются только поля, соответствующие формату отчета.
+        Returns:
+            TaskSet: текущие заявки
+        """
+        return await self._fetch_tasks(self._get_query(fields))
+
+    async def fetch_my_tasks(self, name: str) -> tuple:
+        """Запрашивает текущие заявки техника непосредственно из КПО Кобра.
+
+        Используется перед изменением заявок: снимок может не содержать
+        завершения заявки в приложении МТ после загрузки снимка.
+
+        Args:
+            name (str): имя техника из приложения МТ КПО Кобра
+
+        Returns:
+            tuple: незавершенные заявки техника
+        """
+        query = (
+            self._get_query(TaskFields.query)
+            .equals("tehn", name)
+            .not_equals("sttech", 3)
+        )
+        return tuple(await self._fetch_tasks(query))
+
+    async def fetch_one_task(
+        self, n_abs: int | str, fields: tuple
+    ) -> Task | None:
+        """Запрашивает одну заявку непосредственно из КПО Кобра.
+
+        Args:
+            n_abs (int | str): абсолютный номер заявки
+            fields (tuple): запрашиваемые поля заявки
+
+        Returns:
+            Task|None: данные заявки или None, если заявка не найдена
         """
-        fields_value = '[{"n_abs": "1"}, {"zay": "1"}, {"prin": "1"}, \
-{"timez": "1"}, {"nameobj": "1"}, {"numobj": "1"}, {"addrobj": "1"}, \
-{"tehn": "1"}, {"timev": "1"}, {"who": 1}, {"sttech": 1}]'
-        return f"{fields_value}"
+        query = (
+            CobraQuery(self.table_name).equals("n_abs", n_abs).select(*fields)
+        )
+        response = await self._select(query)
+        return Task.from_row(response[0]) if len(response) else None
+
+    async def _fetch_tasks(self, query: CobraQuery) -> TaskSet:
+        """Запрашивает заявки из КПО Кобра.
+
+        Строки ответа преобразуются в заявки по мере разбора тела ответа.
+        Одинаковые одновременные запросы выполняются один раз.
+
+        Args:
+            query (CobraQuery): запрос к таблице заявок
+
+        Returns:
+            TaskSet: заявки, удовлетворяющие условиям запроса
+        """
+        url = self._get_query_url(query)
+        return await self.flights.do(
+            (Task, url), lambda: self._load_tasks(query)
+        )
+
+    async def _load_tasks(self, query: CobraQuery) -> TaskSet:
+        tasks = [Task.from_row(row) async for row in self._stream(query)]
+        return TaskSet(tasks)
+
+    async def _get_unfinished_tasks(
+        self, allow_degraded: bool = False
+    ) -> TaskSet:
+        """Возвращает текущие заявки из общего снимка."""
+        return await self.snapshot.get(
+            self._fetch_unfinished_tasks, allow_degraded
+        )
+
+    async def _fetch_unfinished_tasks(self) -> TaskSet:
+        """Загрузка снимка текущих заявок.
+
+        Заявки читаются из локальной копии, если она актуальна. Иначе
+        запрашиваются из КПО Кобра.
+        """
+        if await self._is_mirror_fresh():
+            return await self.mirror.get_tasks()  # type: ignore
+        return await self.fetch_unfinished_tasks(self.snapshot_fields)
+
+    async def _has_local_tasks(self) -> bool:
+        """Проверяет, можно ли отбирать заявки без запроса к КПО Кобра."""
+        return self.snapshot.enabled or await self._is_mirror_fresh()
+
+    async def _update_mirror(self, update: Awaitable) -> None:
+        """Применяет к локальной копии изменение, выполненное в КПО Кобра.
+
+        Изменение в КПО Кобра уже выполнено, поэтому ошибка БД не
+        передается вызывающему: копия помечается устаревшей и не
+        используется до следующей синхронизации, которая ее исправит.
+
+        Args:
+            update (Awaitable): изменение копии
+        """
+        try:
+            await update
+        except sqlite3.Error as error:
+            logger.warning(f"Не удалось изменить копию заявок: {error!r}")
+            try:
+                await self.mirror.mark_stale()  # type: ignore
+            except sqlite3.Error as stale_error:
+                logger.error(
+                    f"Не удалось пометить копию заявок устаревшей: \
+{stale_error!r}"
+                )
+
+    async def _is_mirror_fresh(self) -> bool:
+        """Проверяет актуальность локальной копии заявок."""
+        if self.mirror is None:
+            return False
+        synced_at = await self.mirror.get_state(TaskMirror.synced_at_state)
+        if synced_at is None:
+            return False
+        return time.time() - float(synced_at) <= self._mirror_max_age
+
+    def _get_query(self, fields: tuple) -> CobraQuery:
+        """Запрос текущих заявок из КПО Кобра.
+
+        Отбираются заявки, наименование которых начинается с шаблона.
+
+        Args:
+            fields (tuple): запрашиваемые поля заявок
+        """
+        return (
+            CobraQuery(self.table_name)
+            .startswith("zay", self.name_template)
+            .select(*fields)
+        )
 
 
 class CobraTaskEdit(CobraTaskReport):
-    """Реализует модификацию данных в таблице заявок."""
+    """Реализует модификацию данных в таблице заявок.
+
+    Изменения нескольких полей одной заявки объединяются в один запрос.
+    Запросы по разным заявкам выполняются параллельно с ограничением числа
+    одновременных запросов.
+    """
 
     endpoint_root = "api.table.edit"
     """ Метод для редактирования данных таблиц """
 
-    def update_one_task_time(self, n_abs: int, event_time: str) -> None:
-        """Редактирует время исполнения одной заявки.
+    read_only = False
+
+    datetime_format = "%d.%m.%Y %H:%M:%S"
+    """ Формат даты/времени полей заявки """
+
+    def __init__(self, config: CobraConfig) -> None:  # noqa D107
+        super().__init__(config)
+        self._edit_concurrency = config.get_edit_concurrency()
+
+    async def edit_one_task(self, n_abs: int, fields: dict) -> None:
+        """Изменяет поля одной заявки одним запросом.
 
         Args:
             n_abs (int): абсолютный номер заявки
-            event_time (str): время исполнения
+            fields (dict): новые значения полей заявки
         """
-        url = f"{self._endpoint_url}"
         params = {
             "name": self.table_name,
             "n_abs": n_abs,
-            "fields": '[{"timev":"' + event_time + '"}]',
+            "fields": self._get_edit_fields(fields),
         }
-        requests.get(url=url, params=params).json()
+        await self._request(params)
+        self.snapshot.patch(n_abs, fields)
+        if self.mirror is not None:
+            await self._update_mirror(self.mirror.patch_task(n_abs, fields))
+
+    async def edit_tasks(self, tasks_fields: dict) -> tuple:
+        """Изменяет поля нескольких заявок.
+
+        Для каждой заявки выполняется один запрос. Одновременно выполняется
+        не более edit_concurrency запросов.
+
+        Args:
+            tasks_fields (dict): новые значения полей по номерам заявок
+
+        Returns:
+            tuple: результаты изменения каждой заявки (CobraTaskEditResult)
+        """
+        semaphore = asyncio.Semaphore(self._edit_concurrency)
+
+        async def edit(n_abs: int, fields: dict) -> CobraTaskEditResult:
+            async with semaphore:
+                try:
+                    await self.edit_one_task(n_abs, fields)
+                except (
+                    aiohttp.ClientError,
+                    asyncio.TimeoutError,
+                    ValueError,
+                ) as error:
+                    error_text = f"{type(error).__name__}: {error}"
+                    return CobraTaskEditResult(n_abs, False, error_text)
+            return CobraTaskEditResult(n_abs, True)
+
+        return tuple(
+            await asyncio.gather(
+                *(edit(n_abs, fields) for n_abs, fields in tasks_fields.items())
+            )
+        )
 
-    def accept_one_task(self, n_abs: int) -> None:
-        """Устанавливает метку принятия заявки.
+    async def update_one_task_time(self, n_abs: int, event_time: str) -> None:
+        """Редактирует время исполнения одной заявки.
 
         Args:
             n_abs (int): абсолютный номер заявки
+            event_time (str): время исполнения
         """
-        url = f"{self._endpoint_url}"
-        params = {
-            "name": self.table_name,
-            "n_abs": n_abs,
-            "fields": '[{"sttech": "1"}]',
-        }
-        requests.get(url=url, params=params).json()
-        self._set_task_accept_time(n_abs)
+        await self.edit_one_task(n_abs, {"timev": event_time})
+
+    async def accept_one_task(self, n_abs: int) -> None:
+        """Устанавливает метку и время принятия заявки.
 
-    def finish_one_task(self, n_abs: int) -> None:
+        Args:
+            n_abs (int): абсолютный номер заявки
+        """
+        await self.edit_one_task(n_abs, self.get_accept_fields())
+
+    async def finish_one_task(
+        self, n_abs: int, reason: str | None = None
+    ) -> None:
         """Завершает одну заявку.
 
         Args:
             n_abs (int): абсолютный номер заявки в КПО Кобра.
+            reason (str | None): текст описания результата завершения заявки.
+            Записывается тем же запросом, что и признак завершения.
         """
-        url = f"{self._endpoint_url}"
-        params = {
-            "name": self.table_name,
-            "n_abs": n_abs,
-            "fields": '[{"sttech": "3"}]',
-        }
-        requests.get(url=url, params=params).json()
+        fields = {"sttech": "3"}
+        if reason is not None:
+            fields["rez"] = reason
+        await self.edit_one_task(n_abs, fields)
 
-    def add_finish_task_reason(self, n_abs: int, reason: str) -> None:
+    async def add_finish_task_reason(self, n_abs: int, reason: str) -> None:
         """Записывает результат выполнения заявки.
 
         Args:
             n_abs (int): абсолютный номер заявки.
             reason (str): текст описания результата завершения заявки.
         """
-        url = f"{self._endpoint_url}"
-        params = {
-            "name": self.table_name,
-            "n_abs": n_abs,
-            "fields": '[{"rez":"' + reason + '"}]',
-        }
-        requests.get(url=url, params=params).json()
+        await self.edit_one_task(n_abs, {"rez": reason})
 
-    def _set_task_accept_time(self, n_abs: int) -> None:
-        """Указывыает время принятия заявки.
+    def get_accept_fields(self, event_time: str | None = None) -> dict:
+        """Возвращает поля, устанавливаемые при принятии заявки.
 
         Args:
-            n_abs (int): абсолютный номер заявки
+            event_time (str | None): новое время исполнения заявки. Если не
+            передано - время исполнения не изменяется.
+
+        Returns:
+            dict: метка и время принятия заявки
         """
-        current_datetime = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
-        url = f"{self._endpoint_url}"
-        params = {
-            "name": self.table_name,
-            "n_abs": n_abs,
-            "fields": '[{"timer":"' + current_datetime + '"}]',
-        }
-        requests.get(url=url, params=params).json()
+        current_datetime = datetime.now().strftime(self.datetime_format)
+        fields = {"sttech": "1", "timer": current_datetime}
+        if event_time is not None:
+            fields["timev"] = event_time
+        return fields
+
+    def _get_edit_fields(self, fields: dict) -> str:
+        """Формирует параметр fields запроса редактирования."""
+        return json.dumps(
+            [{name: value} for name, value in fields.items()],
+            ensure_ascii=False,
+        )
 
 
 class CobraTaskDelete(CobraTaskReport):
@@ -226,7 +675,9 @@ class CobraTaskDelete(CobraTaskReport):
 
     endpoint_root = "api.table.delete"
 
-    def delete_one_task(self, n_abs: int) -> None:
+    read_only = False
+
+    async def delete_one_task(self, n_abs: int) -> None:
         """Удаление одной заявки.
 
         Реализует метод REST API КПО Кобра для удаления одной заявки.
@@ -234,12 +685,14 @@ class CobraTaskDelete(CobraTaskReport):
         Args:
             n_abs (int): абсолютный номер заявки
         """
-        url = f"{self._endpoint_url}"
         params = {
             "name": self.table_name,
             "n_abs": n_abs,
         }
-        requests.get(url=url, params=params).json()
+        await self._request(params)
+        self.snapshot.remove(n_abs)
+        if self.mirror is not None:
+            await self._update_mirror(self.mirror.delete_tasks([n_abs]))
 
 
 class CobraTaskReportMessage:
@@ -268,21 +721,20 @@ class CobraTaskReportMessage:
         self.message += f"<b>{str(tehn)}</b>"
         self.add_empty_string_to_report_message()
 
-    def add_task_to_report_message(self, task: dict) -> None:
+    def add_task_to_report_message(self, task: Task) -> None:
         """Добавление одной заявки из КПО Кобра в строку сообщения отчета.
 
         Args:
-            task (dict): словарь содержащий данные одной заявки, полученный из
-            КПО Кобра
+            task (Task): данные одной заявки, полученной из КПО Кобра
         """
-        task_string = f"{task['numobj']}\r\n{task['nameobj']} \
-{task['addrobj']}\r\n<code>{task['zay']}</code>"
+        task_string = f"{task.numobj}\r\n{task.nameobj} \
+{task.addrobj}\r\n<code>{task.zay}</code>"
         self.message += str(task_string)
         self.add_empty_string_to_report_message()
-        self.message += f"<ins>Заявку подал: {task['who']} \
-({task['prin']})</ins>"
+        self.message += f"<ins>Заявку подал: {task.who} \
+({task.prin})</ins>"
         self.add_empty_string_to_report_message()
-        self.message += f"<ins>Дата поступления: {task['timez']}</ins>"
+        self.message += f"<ins>Дата поступления: {task.timez}</ins>"
         self.add_empty_string_to_report_message()
 
     def add_empty_string_to_report_message(self) -> None:
@@ -296,6 +748,32 @@ class CobraTaskReportMessage:
         self.message += f"<ins>Дата формирования отчета: \
 {current_datetime}</ins>"
 
+    def add_data_age(self, age: float | None) -> None:
+        """Добавляет к сообщению отметку о возрасте данных КПО Кобра.
+
+        Args:
+            age (float|None): возраст данных в секундах. Отметка не
+            добавляется, если данные актуальны
+        """
+        if age is None:
+            return
+        self.add_empty_string_to_report_message()
+        self.message += f"<i>{self.get_data_age_text(age)}</i>"
+
+    @staticmethod
+    def get_data_age_text(age: float) -> str:
+        """Возвращает текст отметки о возрасте данных КПО Кобра.
+
+        Args:
+            age (float): возраст данных в секундах
+
+        Returns:
+            str: текст отметки
+        """
+        loaded_at = datetime.now() - timedelta(seconds=age)
+        return f"Данные КПО Кобра по состоянию на \
+{loaded_at:%d.%m.%Y %H:%M} ({int(age // 60)} мин. назад)"
+
     def get_report_message_text(self) -> str:
         """Возвращает сгенерированную строку сообщения отчета.
 
@@ -305,6 +783,128 @@ class CobraTaskReportMessage:
         return self.message
 
 
+class CobraTaskReportPacker:
+    """Разбиение общего отчета по заявкам на сообщения Telegram.
+
+    Заявки добавляются в сообщение, пока его длина не достигнет предела
+    Telegram. Блок заявки не разделяется между сообщениями, поэтому разметка
+    HTML остается корректной. Если заявки техника продолжаются в следующем
+    сообщении, имя техника повторяется.
+    """
+
+    max_length = 4096
+    """ Максимальная длина текста сообщения Telegram """
+
+    def __init__(self, max_length: int = max_length) -> None:  # noqa D107
+        self._max_length = max_length
+        header = CobraTaskReportMessage()
+        header.add_report_header()
+        self._header = header.get_report_message_text()
+        footer = CobraTaskReportMessage()
+        footer.add_generation_datetime()
+        self._footer = footer.get_report_message_text()
+        self._base_size = self.get_size(self._header + self._footer)
+        self._messages: list[str] = []
+        self._digests: list[str] = []
+        self._blocks: list[str] = []
+        self._size = self._base_size
+        self._tehn: str | None = None
+
+    def add_tehn_tasks(self, tehn: str, tasks: Iterable[Task]) -> None:
+        """Добавляет в отчет заявки техника.
+
+        Args:
+            tehn (str): Ф.И.О. техника
+            tasks (Iterable[Task]): заявки техника
+        """
+        tehn_block = self._render_tehn(tehn)
+        tehn_size = self.get_size(tehn_block)
+        for task in tasks:
+            block = self._render_task(task)
+            block_size = self.get_size(block)
+            if self._tehn != tehn:
+                block_size += tehn_size
+            if self._blocks and self._size + block_size > self._max_length:
+                self._flush()
+                block_size = self.get_size(block) + tehn_size
+            if self._base_size + block_size > self._max_length:
+                block = self._shorten(task, block_size - self.get_size(block))
+                block_size = self.get_size(block) + tehn_size
+            if self._tehn != tehn:
+                self._blocks.append(tehn_block)
+                self._tehn = tehn
+            self._blocks.append(block)
+            self._size += block_size
+
+    def get_messages(self) -> list:
+        """Возвращает тексты сообщений отчета.
+
+        Returns:
+            list: тексты сообщений в порядке отправки
+        """
+        if self._blocks:
+            self._flush()
+        return list(self._messages)
+
+    def get_digests(self) -> list:
+        """Возвращает контрольные суммы сообщений отчета.
+
+        Сумма считается по тексту без даты формирования отчета, поэтому
+        совпадает у сообщений с одинаковыми заявками.
+
+        Returns:
+            list: контрольные суммы в порядке сообщений get_messages
+        """
+        if self._blocks:
+            self._flush()
+        return list(self._digests)
+
+    @staticmethod
+    def get_size(text: str) -> int:
+        """Возвращает длину текста в единицах, которыми ее считает Telegram.
+
+        Длина считается по тексту с разметкой HTML, поэтому оценка сверху.
+        """
+        return len(text.encode("utf-16-le")) // 2
+
+    def _flush(self) -> None:
+        body = self._header + "".join(self._blocks)
+        self._messages.append(body + self._footer)
+        self._digests.append(ReportMessages.get_digest(body))
+        self._blocks = []
+        self._size = self._base_size
+        self._tehn = None
+
+    @staticmethod
+    def _render_tehn(tehn: str) -> str:
+        message = CobraTaskReportMessage()
+        message.add_tehn_to_report_message(tehn)
+        return message.get_report_message_text()
+
+    @staticmethod
+    def _render_task(task: Task) -> str:
+        message = CobraTaskReportMessage()
+        message.add_task_to_report_message(task)
+        message.add_empty_string_to_report_message()
+        return message.get_report_message_text()
+
+    def _shorten(self, task: Task, extra_size: int) -> str:
+        """Сокращает текст заявки, который не помещается в одно сообщение.
+
+        Args:
+            task (Task): заявка
+            extra_size (int): длина, занимаемая в сообщении кроме блока заявки
+        """
+        zay = task.zay
+        block = self._render_task(task)
+        available = self._max_length - self._base_size - extra_size
+        while zay and self.get_size(block) > available:
+            excess = self.get_size(block) - available
+            zay = zay[: max(0, len(zay) - excess - 1)]
+            block = self._render_task(replace(task, zay=f"{zay}…"))
+        return block
+
+
 class CobraTehn(CobraTable):
     """Взаимодействие с таблицей lkuser КПО Кобра.
 
@@ -315,39 +915,61 @@ class CobraTehn(CobraTable):
     table_name = "lkuser"
     """ Название таблицы, хранящей данные техников """
 
-    def is_account_valid(self, account: MobileAppAccount) -> bool:
+    accounts = AccountIndex()
+    """ Общий для процесса индекс учетных данных техников """
+
+    def __init__(self, config: CobraConfig) -> None:  # noqa D107
+        super().__init__(config)
+        self.accounts.configure(config)
+
+    async def is_account_valid(self, account: MobileAppAccount) -> bool:
         """Валидация аккаунта приложения МТ в КПО Кобра.
 
+        Учетные данные проверяются по индексу, который загружается из КПО
+        Кобра периодически и при неудачной проверке.
+
         Args:
             account (MobileAppAccount): данные аккаунта приложения МТ.
 
         Returns:
             bool: результат проверки.
         """
-        lk_users = self._get_tehn_list()
-        for tehn in lk_users:
-            lk_user = CobraOneLkUser(
-                n_abs=tehn["n_abs"],
-                name=tehn["fio"],
-                status=tehn["status"],
-                password=tehn["pass"],
-            )
-            user = account.username
-            pwd = account.password
-            if user == lk_user.name and pwd == lk_user.password:
-                return True
-        return False
-
-    def _get_tehn_list(self):
-        url = f"{self._endpoint_url}"
-        params = {
-            "name": self.table_name,
-            "fields": self._get_fields(),
-        }
-        response = requests.get(url=url, params=params).json()
-        result = sorted(response["result"], key=lambda task: task["fio"])
-        return result
+        return await self.accounts.verify(
+            account.username, account.password, self._get_tehn_list
+        )
+
+    def _get_tehn_list(self) -> AsyncIterator[dict]:
+        query = CobraQuery(self.table_name).select(*self._get_fields())
+        return self._stream(query)
+
+    def _get_fields(self) -> tuple:
+        return ("fio", "pass")
+
+
+class CobraSyncClient:
+    """Синхронный фасад асинхронного клиента КПО Кобра.
+
+    Используется в скриптах, выполняемых вне цикла событий бота. Асинхронные
+    методы обернутого клиента выполняются в собственном цикле событий фасада.
+    """
+
+    def __init__(self, client: CobraTable) -> None:  # noqa D107
+        self._client = client
+        self._loop = asyncio.new_event_loop()
+
+    def __getattr__(self, name: str):
+        """Возвращает синхронную обертку над методом клиента."""
+        attr = getattr(self._client, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            return self._loop.run_until_complete(attr(*args, **kwargs))
+
+        return call
 
-    def _get_fields(self) -> str:
-        fields_value = '[{"fio": 1}, {"n_abs": 1}, {"status": 1}, {"pass": 1}]'
-        return f"{fields_value}"
+    def close(self) -> None:
+        """Закрывает пул соединений и цикл событий фасада."""
+        self._loop.run_until_complete(CobraTable.close_session())
+        self._loop.close()
@@ -2,6 +2,7 @@
 
 # Standard Library
 import configparser
+import re
 from abc import ABC
 
 
@@ -33,6 +34,99 @@ class CobraConfig(Config):
     """ Имя параметра, хранящего пароль удаленного доступа pud для подключения
     к КПО Кобра """
 
+    pool_size_param = "pool_size"
+    """ Имя параметра, хранящего максимальное число соединений пула """
+
+    keepalive_timeout_param = "keepalive_timeout"
+    """ Имя параметра, хранящего время удержания простаивающего соединения,
+    в секундах """
+
+    connect_timeout_param = "connect_timeout"
+    """ Имя параметра, хранящего таймаут установки соединения, в секундах """
+
+    read_timeout_param = "read_timeout"
+    """ Имя параметра, хранящего таймаут чтения ответа, в секундах """
+
+    read_deadline_param = "read_deadline"
+    """ Имя параметра, хранящего предельное время выполнения запроса чтения
+    (api.table.get), в секундах """
+
+    write_deadline_param = "write_deadline"
+    """ Имя параметра, хранящего предельное время выполнения запроса изменения
+    (api.table.edit, api.table.delete), в секундах """
+
+    retries_param = "retries"
+    """ Имя параметра, хранящего число повторов неудачного запроса чтения """
+
+    retry_backoff_param = "retry_backoff"
+    """ Имя параметра, хранящего базовую задержку перед повтором запроса,
+    в секундах """
+
+    breaker_threshold_param = "breaker_threshold"
+    """ Имя параметра, хранящего число ошибок подряд, после которого запросы
+    к КПО Кобра приостанавливаются """
+
+    breaker_reset_timeout_param = "breaker_reset_timeout"
+    """ Имя параметра, хранящего время приостановки запросов к КПО Кобра,
+    в секундах """
+
+    edit_concurrency_param = "edit_concurrency"
+    """ Имя параметра, хранящего максимальное число одновременных запросов
+    на изменение заявок """
+
+    cache_ttl_param = "cache_ttl"
+    """ Имя параметра, хранящего время жизни снимка заявок, в секундах """
+
+    cache_max_staleness_param = "cache_max_staleness"
+    """ Имя параметра, хранящего максимальный возраст снимка заявок, который
+    может быть возвращен до завершения его обновления, в секундах """
+
+    snapshot_file_param = "snapshot_file"
+    """ Имя параметра, хранящего путь к файлу последнего успешно загруженного
+    снимка заявок """
+
+    degraded_budget_param = "degraded_budget"
+    """ Имя параметра, хранящего время ожидания загрузки снимка, после
+    которого возвращается последний успешно загруженный снимок, в секундах """
+
+    mirror_enabled_param = "mirror_enabled"
+    """ Имя параметра, включающего локальную копию заявок в БД """
+
+    mirror_interval_param = "mirror_interval"
+    """ Имя параметра, хранящего период синхронизации копии, в секундах """
+
+    mirror_max_age_param = "mirror_max_age"
+    """ Имя параметра, хранящего максимальный возраст копии, при котором
+    чтение заявок выполняется из нее, в секундах """
+
+    accounts_ttl_param = "accounts_ttl"
+    """ Имя параметра, хранящего период обновления индекса учетных данных
+    техников, в секундах """
+
+    accounts_refresh_interval_param = "accounts_refresh_interval"
+    """ Имя параметра, хранящего минимальный интервал между внеочередными
+    обновлениями индекса учетных данных техников, в секундах """
+
+    default_pool_size = 10
+    default_keepalive_timeout = 30.0
+    default_connect_timeout = 5.0
+    default_read_timeout = 30.0
+    default_read_deadline = 30.0
+    default_write_deadline = 15.0
+    default_retries = 2
+    default_retry_backoff = 0.5
+    default_breaker_threshold = 5
+    default_breaker_reset_timeout = 30.0
+    default_edit_concurrency = 5
+    default_cache_ttl = 60.0
+    default_cache_max_staleness = 300.0
+    default_snapshot_file = "job/tasks.json"
+    default_degraded_budget = 0.8
+    default_mirror_interval = 60.0
+    default_mirror_max_age = 300.0
+    default_accounts_ttl = 600.0
+    default_accounts_refresh_interval = 30.0
+
     def get_host(self) -> str:
         """Возвращает адрес хоста или FQDN-имя сервера КПО Кобра."""
         return self.config.get(self.section, self.host_param)
@@ -48,6 +142,158 @@ class CobraConfig(Config):
         """
         return self.config.get(self.section, self.token_param)
 
+    def get_pool_size(self) -> int:
+        """Возвращает максимальное число соединений пула с КПО Кобра."""
+        return self.config.getint(
+            self.section, self.pool_size_param, fallback=self.default_pool_size
+        )
+
+    def get_keepalive_timeout(self) -> float:
+        """Возвращает время удержания простаивающего соединения."""
+        return self.config.getfloat(
+            self.section,
+            self.keepalive_timeout_param,
+            fallback=self.default_keepalive_timeout,
+        )
+
+    def get_connect_timeout(self) -> float:
+        """Возвращает таймаут установки соединения с КПО Кобра."""
+        return self.config.getfloat(
+            self.section,
+            self.connect_timeout_param,
+            fallback=self.default_connect_timeout,
+        )
+
+    def get_read_timeout(self) -> float:
+        """Возвращает таймаут чтения ответа КПО Кобра."""
+        return self.config.getfloat(
+            self.section,
+            self.read_timeout_param,
+            fallback=self.default_read_timeout,
+        )
+
+    def get_read_deadline(self) -> float:
+        """Возвращает предельное время выполнения запроса чтения."""
+        return self.config.getfloat(
+            self.section,
+            self.read_deadline_param,
+            fallback=self.default_read_deadline,
+        )
+
+    def get_write_deadline(self) -> float:
+        """Возвращает предельное время выполнения запроса изменения."""
+        return self.config.getfloat(
+            self.section,
+            self.write_deadline_param,
+            fallback=self.default_write_deadline,
+        )
+
+    def get_retries(self) -> int:
+        """Возвращает число повторов неудачного запроса чтения."""
+        return self.config.getint(
+            self.section, self.retries_param, fallback=self.default_retries
+        )
+
+    def get_retry_backoff(self) -> float:
+        """Возвращает базовую задержку перед повтором запроса."""
+        return self.config.getfloat(
+            self.section,
+            self.retry_backoff_param,
+            fallback=self.default_retry_backoff,
+        )
+
+    def get_breaker_threshold(self) -> int:
+        """Возвращает число ошибок подряд, приостанавливающее запросы."""
+        return self.config.getint(
+            self.section,
+            self.breaker_threshold_param,
+            fallback=self.default_breaker_threshold,
+        )
+
+    def get_breaker_reset_timeout(self) -> float:
+        """Возвращает время приостановки запросов к КПО Кобра."""
+        return self.config.getfloat(
+            self.section,
+            self.breaker_reset_timeout_param,
+            fallback=self.default_breaker_reset_timeout,
+        )
+
+    def get_edit_concurrency(self) -> int:
+        """Возвращает максимальное число одновременных запросов изменения."""
+        return self.config.getint(
+            self.section,
+            self.edit_concurrency_param,
+            fallback=self.default_edit_concurrency,
+        )
+
+    def get_cache_ttl(self) -> float:
+        """Возвращает время жизни снимка заявок."""
+        return self.config.getfloat(
+            self.section, self.cache_ttl_param, fallback=self.default_cache_ttl
+        )
+
+    def get_cache_max_staleness(self) -> float:
+        """Возвращает максимальный возраст снимка заявок."""
+        return self.config.getfloat(
+            self.section,
+            self.cache_max_staleness_param,
+            fallback=self.default_cache_max_staleness,
+        )
+
+    def get_snapshot_file(self) -> str:
+        """Возвращает путь к файлу снимка заявок."""
+        return self.config.get(
+            self.section,
+            self.snapshot_file_param,
+            fallback=self.default_snapshot_file,
+        )
+
+    def get_degraded_budget(self) -> float:
+        """Возвращает время ожидания загрузки снимка заявок."""
+        return self.config.getfloat(
+            self.section,
+            self.degraded_budget_param,
+            fallback=self.default_degraded_budget,
+        )
+
+    def get_mirror_enabled(self) -> bool:
+        """Возвращает признак использования локальной копии заявок."""
+        return self.config.getboolean(
+            self.section, self.mirror_enabled_param, fallback=False
+        )
+
+    def get_mirror_interval(self) -> float:
+        """Возвращает период синхронизации локальной копии заявок."""
+        return self.config.getfloat(
+            self.section,
+            self.mirror_interval_param,
+            fallback=self.default_mirror_interval,
+        )
+
+    def get_mirror_max_age(self) -> float:
+        """Возвращает максимальный возраст локальной копии заявок."""
+        return self.config.getfloat(
+            self.section,
+            self.mirror_max_age_param,
+            fallback=self.default_mirror_max_age,
+        )
+
+    def get_accounts_ttl(self) -> float:
+        """Возвращает период обновления индекса учетных данных техников."""
+        return self.config.getfloat(
+            self.section,
+            self.accounts_ttl_param,
+            fallback=self.default_accounts_ttl,
+        )
+
+    def get_accounts_refresh_interval(self) -> float:
+        """Возвращает минимальный интервал внеочередного обновления индекса."""
+        return self.config.getfloat(
+            self.section,
+            self.accounts_refresh_interval_param,
+            fallback=self.default_accounts_refresh_interval,
+        )
+
 
 class TelegramConfig(Config):
     """Получение параметров, отвечающих за взаимодействие с Telegram API."""
@@ -76,6 +322,115 @@ class TelegramConfig(Config):
     """Имя параметра, хранящего время запуска генерации персональных
     напоминаний о незавершенных заявках в конце рабочей смены """
 
+    broadcast_rate_param = "broadcast_rate"
+    """ Имя параметра, хранящего максимальное число сообщений, отправляемых
+    ботом в секунду """
+
+    broadcast_chat_rate_param = "broadcast_chat_rate"
+    """ Имя параметра, хранящего максимальное число сообщений в секунду
+    в один личный чат """
+
+    broadcast_group_rate_param = "broadcast_group_rate"
+    """ Имя параметра, хранящего максимальное число сообщений в минуту
+    в одну группу """
+
+    broadcast_retries_param = "broadcast_retries"
+    """ Имя параметра, хранящего число повторов отправки сообщения после
+    ответа Telegram о превышении лимита """
+
+    outbox_interval_param = "outbox_interval"
+    """ Имя параметра, хранящего период проверки очереди исходящих сообщений,
+    в секундах """
+
+    outbox_max_attempts_param = "outbox_max_attempts"
+    """ Имя параметра, хранящего максимальное число попыток доставки
+    сообщения из очереди """
+
+    outbox_retry_delay_param = "outbox_retry_delay"
+    """ Имя параметра, хранящего задержку перед повторной доставкой
+    сообщения, в секундах. Удваивается с каждой попыткой """
+
+    live_report_param = "live_report"
+    """ Имя параметра, хранящего признак обновления общего отчета в группе
+    редактированием ранее отправленных сообщений """
+
+    my_tasks_page_size_param = "my_tasks_page_size"
+    """ Имя параметра, хранящего число заявок на одной странице списка
+    /my_tasks """
+
+    my_tasks_cache_ttl_param = "my_tasks_cache_ttl"
+    """ Имя параметра, хранящего время хранения списка /my_tasks для
+    перелистывания страниц, в секундах """
+
+    inline_cache_time_param = "inline_cache_time"
+    """ Имя параметра, хранящего время хранения результатов поиска заявок
+    в режиме inline на стороне Telegram, в секундах """
+
+    inline_results_param = "inline_results"
+    """ Имя параметра, хранящего максимальное число результатов поиска
+    заявок в режиме inline """
+
+    inline_refresh_interval_param = "inline_refresh_interval"
+    """ Имя параметра, хранящего период сверки индекса поиска заявок со
+    снимком заявок, в секундах """
+
+    user_cache_ttl_param = "user_cache_ttl"
+    """ Имя параметра, хранящего время, через которое кэш
+    зарегистрированных пользователей перечитывается из БД, в секундах """
+
+    mode_param = "mode"
+    """ Имя параметра, хранящего режим получения обновлений: polling или
+    webhook """
+
+    webhook_url_param = "webhook_url"
+    """ Имя параметра, хранящего внешний адрес бота для получения обновлений,
+    например https://bot.example.com """
+
+    webhook_path_param = "webhook_path"
+    """ Имя параметра, хранящего путь, по которому принимаются обновления """
+
+    webhook_host_param = "webhook_host"
+    """ Имя параметра, хранящего адрес, на котором http-сервер бота
+    принимает соединения """
+
+    webhook_port_param = "webhook_port"
+    """ Имя параметра, хранящего порт http-сервера бота """
+
+    webhook_secret_param = "webhook_secret"
+    """ Имя параметра, хранящего секретный токен, который Telegram передает
+    в заголовке каждого обновления """
+
+    webhook_secret_pattern = re.compile(r"[A-Za-z0-9_-]{1,256}")
+    """ Допустимое значение секретного токена обновлений """
+
+    drain_timeout_param = "drain_timeout"
+    """ Имя параметра, хранящего время ожидания обработки принятых
+    обновлений при остановке бота, в секундах """
+
+    polling_mode = "polling"
+    """ Получение обновлений запросами к Telegram """
+
+    webhook_mode = "webhook"
+    """ Получение обновлений от Telegram на http-сервер бота """
+
+    default_broadcast_rate = 25.0
+    default_broadcast_chat_rate = 1.0
+    default_broadcast_group_rate = 20.0
+    default_broadcast_retries = 3
+    default_outbox_interval = 1.0
+    default_outbox_max_attempts = 5
+    default_outbox_retry_delay = 30.0
+    default_my_tasks_page_size = 8
+    default_my_tasks_cache_ttl = 120.0
+    default_inline_cache_time = 60
+    default_inline_results = 20
+    default_inline_refresh_interval = 60.0
+    default_user_cache_ttl = 300.0
+    default_webhook_path = "/webhook"
+    default_webhook_host = "127.0.0.1"
+    default_webhook_port = 8080
+    default_drain_timeout = 10.0
+
     def get_token(self) -> str:
         """Возвращает токен бота Telegram."""
         return self.config.get(self.section, self.token_param)
@@ -125,3 +480,176 @@ class TelegramConfig(Config):
         chat_ids = self.config.get(self.section, self.admin_chat_ids_param)
         admin_chat_ids_list = chat_ids.split(",")
         return tuple(admin_chat_ids_list)
+
+    def get_broadcast_rate(self) -> float:
+        """Возвращает максимальное число сообщений бота в секунду."""
+        return self.config.getfloat(
+            self.section,
+            self.broadcast_rate_param,
+            fallback=self.default_broadcast_rate,
+        )
+
+    def get_broadcast_chat_rate(self) -> float:
+        """Возвращает максимальное число сообщений в секунду в личный чат."""
+        return self.config.getfloat(
+            self.section,
+            self.broadcast_chat_rate_param,
+            fallback=self.default_broadcast_chat_rate,
+        )
+
+    def get_broadcast_group_rate(self) -> float:
+        """Возвращает максимальное число сообщений в минуту в группу."""
+        return self.config.getfloat(
+            self.section,
+            self.broadcast_group_rate_param,
+            fallback=self.default_broadcast_group_rate,
+        )
+
+    def get_broadcast_retries(self) -> int:
+        """Возвращает число повторов отправки после превышения лимита."""
+        return self.config.getint(
+            self.section,
+            self.broadcast_retries_param,
+            fallback=self.default_broadcast_retries,
+        )
+
+    def get_outbox_interval(self) -> float:
+        """Возвращает период проверки очереди исходящих сообщений."""
+        return self.config.getfloat(
+            self.section,
+            self.outbox_interval_param,
+            fallback=self.default_outbox_interval,
+        )
+
+    def get_outbox_max_attempts(self) -> int:
+        """Возвращает максимальное число попыток доставки сообщения."""
+        return self.config.getint(
+            self.section,
+            self.outbox_max_attempts_param,
+            fallback=self.default_outbox_max_attempts,
+        )
+
+    def get_outbox_retry_delay(self) -> float:
+        """Возвращает задержку перед повторной доставкой сообщения."""
+        return self.config.getfloat(
+            self.section,
+            self.outbox_retry_delay_param,
+            fallback=self.default_outbox_retry_delay,
+        )
+
+    def get_live_report(self) -> bool:
+        """Возвращает признак обновления общего отчета редактированием."""
+        return self.config.getboolean(
+            self.section, self.live_report_param, fallback=False
+        )
+
+    def get_my_tasks_page_size(self) -> int:
+        """Возвращает число заявок на одной странице списка /my_tasks."""
+        return self.config.getint(
+            self.section,
+            self.my_tasks_page_size_param,
+            fallback=self.default_my_tasks_page_size,
+        )
+
+    def get_my_tasks_cache_ttl(self) -> float:
+        """Возвращает время хранения списка /my_tasks для перелистывания."""
+        return self.config.getfloat(
+            self.section,
+            self.my_tasks_cache_ttl_param,
+            fallback=self.default_my_tasks_cache_ttl,
+        )
+
+    def get_inline_cache_time(self) -> int:
+        """Возвращает время хранения результатов поиска в режиме inline."""
+        return self.config.getint(
+            self.section,
+            self.inline_cache_time_param,
+            fallback=self.default_inline_cache_time,
+        )
+
+    def get_inline_results(self) -> int:
+        """Возвращает максимальное число результатов поиска в режиме inline."""
+        return self.config.getint(
+            self.section,
+            self.inline_results_param,
+            fallback=self.default_inline_results,
+        )
+
+    def get_inline_refresh_interval(self) -> float:
+        """Возвращает период сверки индекса поиска со снимком заявок."""
+        return self.config.getfloat(
+            self.section,
+            self.inline_refresh_interval_param,
+            fallback=self.default_inline_refresh_interval,
+        )
+
+    def get_user_cache_ttl(self) -> float:
+        """Возвращает время жизни кэша зарегистрированных пользователей."""
+        return self.config.getfloat(
+            self.section,
+            self.user_cache_ttl_param,
+            fallback=self.default_user_cache_ttl,
+        )
+
+    def get_mode(self) -> str:
+        """Возвращает режим получения обновлений: polling или webhook."""
+        return self.config.get(
+            self.section, self.mode_param, fallback=self.polling_mode
+        )
+
+    def get_webhook_url(self) -> str:
+        """Возвращает полный адрес, на который Telegram отправляет обновления.
+
+        Returns:
+            str: внешний адрес бота с путем получения обновлений
+        """
+        url = self.config.get(self.section, self.webhook_url_param)
+        return url.rstrip("/") + self.get_webhook_path()
+
+    def get_webhook_path(self) -> str:
+        """Возвращает путь, по которому принимаются обновления."""
+        return self.config.get(
+            self.section,
+            self.webhook_path_param,
+            fallback=self.default_webhook_path,
+        )
+
+    def get_webhook_host(self) -> str:
+        """Возвращает адрес, на котором принимает соединения http-сервер."""
+        return self.config.get(
+            self.section,
+            self.webhook_host_param,
+            fallback=self.default_webhook_host,
+        )
+
+    def get_webhook_port(self) -> int:
+        """Возвращает порт http-сервера бота."""
+        return self.config.getint(
+            self.section,
+            self.webhook_port_param,
+            fallback=self.default_webhook_port,
+        )
+
+    def get_webhook_secret(self) -> str:
+        """Возвращает секретный токен обновлений.
+
+        Raises:
+            ValueError: токен не задан или содержит недопустимые символы
+        """
+        secret = self.config.get(
+            self.section, self.webhook_secret_param, fallback=""
+        )
+        if not self.webhook_secret_pattern.fullmatch(secret):
+            raise ValueError(
+                f"Параметр {self.webhook_secret_param} должен содержать от 1 \
+до 256 символов A-Z, a-z, 0-9, _ и -"
+            )
+        return secret
+
+    def get_drain_timeout(self) -> float:
+        """Возвращает время ожидания обработки обновлений при остановке."""
+        return self.config.getfloat(
+            self.section,
+            self.drain_timeout_param,
+            fallback=self.default_drain_timeout,
+        )
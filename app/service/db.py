@@ -4,9 +4,237 @@
 """
 
 # Standard Library
+import asyncio
+import base64
+import functools
+import hashlib
+import json
+import queue
+import re
 import sqlite3
-from dataclasses import dataclass
-from typing import Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, ClassVar, Iterable, Iterator, Optional
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_cobra_datetime(value: str) -> datetime | None:
+    """Разбирает дату/время в формате КПО Кобра "дд.мм.гггг чч:мм:сс".
+
+    Разбор выполняется по позициям символов без strptime. Результаты
+    кэшируются: назначенное время у многих заявок совпадает.
+
+    Args:
+        value (str): дата/время в формате КПО Кобра
+
+    Returns:
+        datetime|None: дата/время или None, если значение не разобрано
+    """
+    try:
+        return datetime(
+            int(value[6:10]),
+            int(value[3:5]),
+            int(value[0:2]),
+            int(value[11:13] or 0),
+            int(value[14:16] or 0),
+            int(value[17:19] or 0),
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(slots=True)
+class Task:
+    """Объект передачи данных.
+
+    Содержит данные одной заявки таблицы zayavki КПО Кобра. Поля, не
+    запрошенные из КПО Кобра, содержат пустые значения. Дата поступления и
+    назначенное время разбираются один раз при создании объекта.
+    """
+
+    n_abs: int
+    zay: str = ""
+    prin: str = ""
+    who: str = ""
+    timez: str = ""
+    nameobj: str = ""
+    numobj: str = ""
+    addrobj: str = ""
+    tehn: str = ""
+    timev: str = ""
+    sttech: int = 0
+    timez_at: datetime | None = field(default=None, init=False, repr=False)
+    timev_at: datetime | None = field(default=None, init=False, repr=False)
+
+    row_fields: ClassVar[tuple] = (
+        "n_abs",
+        "zay",
+        "prin",
+        "who",
+        "timez",
+        "nameobj",
+        "numobj",
+        "addrobj",
+        "tehn",
+        "timev",
+        "sttech",
+    )
+    """ Поля заявки, хранимые в КПО Кобра """
+
+    def __post_init__(self) -> None:  # noqa D105
+        self.n_abs = int(self.n_abs)
+        self.numobj = str(self.numobj)
+        self.sttech = int(self.sttech) if str(self.sttech).isdigit() else 0
+        self.timez_at = parse_cobra_datetime(self.timez)
+        self.timev_at = parse_cobra_datetime(self.timev)
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Task":
+        """Создает заявку из строки ответа КПО Кобра.
+
+        Args:
+            row (dict): строка таблицы zayavki
+
+        Returns:
+            Task: данные заявки
+        """
+        return cls(
+            **{
+                name: row[name]
+                for name in cls.row_fields
+                if row.get(name) is not None
+            }
+        )
+
+    def to_row(self) -> dict:
+        """Возвращает данные заявки в формате строки КПО Кобра."""
+        return {name: getattr(self, name) for name in self.row_fields}
+
+    def patch(self, fields: dict) -> None:
+        """Применяет изменение полей заявки.
+
+        Поля, не хранимые в объекте, пропускаются.
+
+        Args:
+            fields (dict): новые значения полей заявки
+        """
+        for name, value in fields.items():
+            if name in self.row_fields:
+                setattr(self, name, value)
+        self.__post_init__()
+
+
+class TaskSet:
+    """Набор заявок с индексами.
+
+    Индексы по технику, номеру заявки и дате назначенного времени строятся
+    один раз при создании набора. Заявки хранятся отсортированными по технику.
+    """
+
+    def __init__(self, tasks: Iterable[Task] = ()) -> None:  # noqa D107
+        self._tasks = sorted(tasks, key=lambda task: task.tehn)
+        self._build_indexes()
+
+    def __iter__(self) -> Iterator[Task]:  # noqa D105
+        return iter(self._tasks)
+
+    def __len__(self) -> int:  # noqa D105
+        return len(self._tasks)
+
+    def get(self, n_abs: int | str) -> Task | None:
+        """Возвращает заявку по абсолютному номеру.
+
+        Args:
+            n_abs (int | str): абсолютный номер заявки
+
+        Returns:
+            Task|None: заявка или None, если ее нет в наборе
+        """
+        return self._by_n_abs.get(int(n_abs))
+
+    def get_by_tehn(self, tehn: str) -> tuple:
+        """Возвращает заявки техника.
+
+        Args:
+            tehn (str): имя техника в приложении МТ
+
+        Returns:
+            tuple: заявки техника
+        """
+        return self._by_tehn.get(tehn, ())
+
+    def get_by_date(self, day: date) -> tuple:
+        """Возвращает заявки с назначенным временем в указанную дату.
+
+        Args:
+            day (date): дата назначенного времени
+
+        Returns:
+            tuple: заявки, отсортированные по технику
+        """
+        return self._by_date.get(day, ())
+
+    def get_until(self, day: date) -> "TaskSet":
+        """Возвращает заявки с назначенным временем не позднее даты.
+
+        Args:
+            day (date): последняя дата назначенного времени
+
+        Returns:
+            TaskSet: заявки, отсортированные по технику
+        """
+        return TaskSet(
+            task
+            for task_day, tasks in self._by_date.items()
+            if task_day <= day
+            for task in tasks
+        )
+
+    def group_by_tehn(self) -> Iterator[tuple]:
+        """Возвращает заявки, сгруппированные по технику.
+
+        Returns:
+            Iterator[tuple]: пары (техник, заявки техника) в порядке техников
+        """
+        return iter(self._by_tehn.items())
+
+    def patch(self, n_abs: int | str, fields: dict) -> None:
+        """Применяет изменение полей заявки и обновляет индексы.
+
+        Args:
+            n_abs (int | str): абсолютный номер заявки
+            fields (dict): новые значения полей заявки
+        """
+        task = self.get(n_abs)
+        if task is not None:
+            task.patch(fields)
+            if "tehn" in fields:
+                self._tasks.sort(key=lambda task: task.tehn)
+            self._build_indexes()
+
+    def remove(self, n_abs: int | str) -> None:
+        """Удаляет заявку из набора.
+
+        Args:
+            n_abs (int | str): абсолютный номер заявки
+        """
+        task = self.get(n_abs)
+        if task is not None:
+            self._tasks.remove(task)
+            self._build_indexes()
+
+    def _build_indexes(self) -> None:
+        by_tehn: dict = dict()
+        by_date: dict = dict()
+        for task in self._tasks:
+            by_tehn.setdefault(task.tehn, []).append(task)
+            if task.timev_at is not None:
+                by_date.setdefault(task.timev_at.date(), []).append(task)
+        self._by_n_abs = {task.n_abs: task for task in self._tasks}
+        self._by_tehn = {tehn: tuple(tasks) for tehn, tasks in by_tehn.items()}
+        self._by_date = {day: tuple(tasks) for day, tasks in by_date.items()}
 
 
 @dataclass
@@ -22,6 +250,18 @@ class CobraOneLkUser:
     password: str | None = None
 
 
+@dataclass
+class CobraTaskEditResult:
+    """Объект передачи данных.
+
+    Содержит результат изменения одной заявки в КПО Кобра.
+    """
+
+    n_abs: int
+    success: bool
+    error: str | None = None
+
+
 @dataclass
 class OneUser:
     """Объект передачи данных.
@@ -37,6 +277,35 @@ class OneUser:
     tehn: str | None = None
 
 
+@dataclass
+class OutboxMessage:
+    """Объект передачи данных.
+
+    Содержит данные таблицы в БД outbox: исходящее сообщение Telegram.
+    """
+
+    id: int
+    chat_id: int
+    method: str
+    payload: dict
+    attempts: int = 0
+
+
+@dataclass
+class ReportMessage:
+    """Объект передачи данных.
+
+    Содержит данные таблицы в БД report_message: сообщение общего отчета,
+    отправленное в чат.
+    """
+
+    chat_id: int
+    part: str
+    message_id: int
+    digest: str
+    report_date: str
+
+
 @dataclass
 class MobileAppAccount:
     """Объект передачи данных.
@@ -48,38 +317,178 @@ class MobileAppAccount:
     password: str
 
 
+class ConnectionPool:
+    """Пул соединений с файлом БД.
+
+    Запросы выполняются в потоках пула и не блокируют цикл событий. Потоков
+    столько же, сколько соединений: на время запроса поток получает
+    свободное соединение, поэтому соединений открывается не больше size.
+    Соединения открываются в режиме WAL: чтение не блокируется записью, в
+    том числе записью другого процесса, а запись ожидает освобождения
+    блокировки не дольше busy_timeout. Подготовленные выражения кэшируются
+    соединением и используются повторно для одинакового текста запроса.
+    """
+
+    size = 4
+    """ Максимальное число соединений """
+
+    busy_timeout = 5.0
+    """ Время ожидания блокировки БД, в секундах """
+
+    cached_statements = 256
+    """ Число подготовленных выражений, кэшируемых соединением """
+
+    pragmas = (
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA cache_size = -8000",
+    )
+    """ Параметры, устанавливаемые при открытии соединения """
+
+    _pools: ClassVar[dict] = dict()
+
+    def __init__(self, db_file: str) -> None:  # noqa D107
+        self._db_file = db_file
+        self._idle: queue.SimpleQueue = queue.SimpleQueue()
+        self._executor: ThreadPoolExecutor | None = None
+
+    @classmethod
+    def get_pool(cls, db_file: str) -> "ConnectionPool":
+        """Возвращает пул соединений с файлом БД, общий для процесса.
+
+        Args:
+            db_file (str): путь к файлу БД
+
+        Returns:
+            ConnectionPool: пул соединений
+        """
+        pool = cls._pools.get(db_file)
+        if pool is None:
+            pool = cls._pools[db_file] = cls(db_file)
+        return pool
+
+    @classmethod
+    async def close_all(cls) -> None:
+        """Закрывает соединения всех пулов процесса."""
+        await asyncio.gather(*(pool.close() for pool in cls._pools.values()))
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Выполняет функцию в транзакции на свободном соединении пула.
+
+        Потоки и соединения закрытого пула открываются заново.
+
+        Args:
+            func (Callable): функция, получающая соединение и args
+            args: параметры функции
+
+        Returns:
+            Any: результат функции
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.size, thread_name_prefix="db"
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._call, self._idle, func, args
+        )
+
+    async def close(self) -> None:
+        """Ожидает завершения запросов и закрывает соединения.
+
+        Ожидание выполняется вне цикла событий. Запросы, переданные после
+        вызова, выполняются на новых соединениях.
+        """
+        executor, self._executor = self._executor, None
+        idle, self._idle = self._idle, queue.SimpleQueue()
+        if executor is not None:
+            await asyncio.to_thread(self._shutdown, executor, idle)
+
+    @staticmethod
+    def _shutdown(
+        executor: ThreadPoolExecutor, idle: queue.SimpleQueue
+    ) -> None:
+        executor.shutdown(wait=True)
+        while True:
+            try:
+                idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _call(
+        self, idle: queue.SimpleQueue, func: Callable, args: tuple
+    ) -> Any:
+        try:
+            connection = idle.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            with connection:
+                return func(connection, *args)
+        finally:
+            idle.put(connection)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self._db_file,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        for pragma in self.pragmas:
+            connection.execute(pragma)
+        return connection
+
+
 class DB:
-    """Базовый класс для работы с БД."""
+    """Базовый класс для работы с БД.
+
+    Запросы выполняются через общий для процесса пул соединений с файлом БД.
+    """
 
     def __init__(self, db_file) -> None:  # noqa D107
-        self._connection = sqlite3.connect(db_file)
-        self._cursor = self._connection.cursor()
+        self._pool = ConnectionPool.get_pool(db_file)
+
+    async def _fetchall(self, query_str: str, params: tuple = ()) -> list:
+        return await self._pool.run(
+            lambda connection: connection.execute(query_str, params).fetchall()
+        )
+
+    async def _execute(self, query_str: str, params: tuple = ()) -> int:
+        return await self._pool.run(
+            lambda connection: connection.execute(query_str, params).rowcount
+        )
+
+    async def _executemany(self, query_str: str, params: list) -> None:
+        await self._pool.run(
+            lambda connection: connection.executemany(query_str, params)
+        )
 
 
 class User(DB):
     """Взаимодействие с поьлзователями в БД."""
 
-    def add_user(self, user: OneUser):
+    async def add_user(self, user: OneUser) -> None:
         """Добавляет пользователя в БД.
 
         Args:
             user (OneUser): DTO с данными пользователя
         """
-        with self._connection:
-            params = (
-                user.chat_id,
-                user.first_name,
-                user.last_name,
-                user.username,
-                user.status,
-                user.tehn,
-            )
-            query_str = "INSERT INTO `user` \
+        params = (
+            user.chat_id,
+            user.first_name,
+            user.last_name,
+            user.username,
+            user.status,
+            user.tehn,
+        )
+        query_str = "INSERT INTO `user` \
 (`chat_id`, `first_name`, `last_name`, `username`, `status`, `tehn`) VALUES \
 (?, ?, ?, ?, ?, ?)"
-            return self._cursor.execute(query_str, params)
+        await self._execute(query_str, params)
 
-    def get_user(self, chat_id: int) -> Optional[OneUser]:
+    async def get_user(self, chat_id: int) -> Optional[OneUser]:
         """Возвращает данные техника по Telegram chat id.
 
         Args:
@@ -88,23 +497,22 @@ class User(DB):
         Returns:
             OneUser|None: DTO с данными пользователя
         """
-        with self._connection:
-            params = (chat_id,)
-            query_str = "SELECT * FROM `user` WHERE `chat_id` = ? "
-            result = self._cursor.execute(query_str, params).fetchall()
-            if len(result):
-                user = OneUser(
-                    chat_id=result[0][1],
-                    first_name=result[0][2],
-                    last_name=result[0][3],
-                    username=result[0][4],
-                    status=result[0][5],
-                    tehn=result[0][6],
-                )
-                return user
-            return None
-
-    def get_user_by_tehn(self, tehn: str) -> OneUser | None:
+        params = (chat_id,)
+        query_str = "SELECT * FROM `user` WHERE `chat_id` = ? "
+        result = await self._fetchall(query_str, params)
+        if len(result):
+            user = OneUser(
+                chat_id=result[0][1],
+                first_name=result[0][2],
+                last_name=result[0][3],
+                username=result[0][4],
+                status=result[0][5],
+                tehn=result[0][6],
+            )
+            return user
+        return None
+
+    async def get_user_by_tehn(self, tehn: str) -> OneUser | None:
         """Возвращает данные техника по имени пользователя МТ.
 
         Сверяет имя пользователя приложения Мобильный Техник КПО Кобра
@@ -116,22 +524,31 @@ class User(DB):
         Returns:
             OneUser|None: DTO с данными пользователя или None.
         """
-        with self._connection:
-            params = (tehn,)
-            query_str = "SELECT * FROM `user` WHERE `tehn` = ? "
-            result = self._cursor.execute(query_str, params).fetchall()
-            if len(result):
-                return OneUser(
-                    chat_id=result[0][1],
-                    first_name=result[0][2],
-                    last_name=result[0][3],
-                    username=result[0][4],
-                    status=result[0][5],
-                    tehn=result[0][6],
-                )
-            return None
-
-    def is_user_exists(self, chat_id: int) -> bool:
+        params = (tehn,)
+        query_str = "SELECT * FROM `user` WHERE `tehn` = ? "
+        result = await self._fetchall(query_str, params)
+        if len(result):
+            return OneUser(
+                chat_id=result[0][1],
+                first_name=result[0][2],
+                last_name=result[0][3],
+                username=result[0][4],
+                status=result[0][5],
+                tehn=result[0][6],
+            )
+        return None
+
+    async def get_users(self) -> list:
+        """Возвращает данные всех пользователей в порядке регистрации.
+
+        Returns:
+            list: DTO с данными пользователей (OneUser)
+        """
+        query_str = "SELECT `chat_id`, `first_name`, `last_name`, \
+`username`, `status`, `tehn` FROM `user` ORDER BY `id`"
+        return [OneUser(*row) for row in await self._fetchall(query_str)]
+
+    async def is_user_exists(self, chat_id: int) -> bool:
         """Проверяет существование пользователя.
 
         Проверка производится по chat_id в Telegram.
@@ -142,17 +559,467 @@ class User(DB):
         Returns:
             bool: результат проверки (True/False)
         """
-        result = self.get_user(chat_id)
+        result = await self.get_user(chat_id)
         return True if result else False
 
-    def change_status(self, user: OneUser) -> None:
+    async def change_status(self, user: OneUser) -> None:
         """Смена статуса пользователя.
 
         Args:
             user (OneUser): объект передачи данных, содержащий данные одного
             пользователя
         """
-        with self._connection:
-            params = (user.status, user.chat_id)
-            query_str = "UPDATE `user` SET `status` = ? WHERE `chat_id` = ?"
-            self._cursor.execute(query_str, params)
+        params = (user.status, user.chat_id)
+        query_str = "UPDATE `user` SET `status` = ? WHERE `chat_id` = ?"
+        await self._execute(query_str, params)
+
+
+class TaskMirror(DB):
+    """Локальная копия текущих заявок КПО Кобра.
+
+    Хранит строки таблицы zayavki, отобранные ботом, и состояние
+    синхронизации с КПО Кобра.
+    """
+
+    synced_at_state = "synced_at"
+    """ Время последней синхронизации (unix time) """
+
+    upsert_query = "INSERT OR REPLACE INTO `task` \
+(`n_abs`, `tehn`, `timev`, `timev_date`, `sttech`, `digest`, `data`) VALUES \
+(?, ?, ?, ?, ?, ?, ?)"
+    """ Запрос добавления или замены строки копии """
+
+    async def get_digests(self) -> dict:
+        """Возвращает контрольные суммы строк копии по номерам заявок.
+
+        Returns:
+            dict: контрольная сумма строки по абсолютному номеру заявки
+        """
+        query_str = "SELECT `n_abs`, `digest` FROM `task`"
+        return dict(await self._fetchall(query_str))
+
+    async def get_tasks(self) -> TaskSet:
+        """Возвращает заявки копии.
+
+        Returns:
+            TaskSet: заявки, отсортированные по технику
+        """
+        query_str = "SELECT `data` FROM `task` ORDER BY `tehn`, `n_abs`"
+        result = await self._fetchall(query_str)
+        return TaskSet(Task.from_row(json.loads(row[0])) for row in result)
+
+    async def upsert_tasks(self, tasks: list) -> None:
+        """Добавляет или заменяет строки копии.
+
+        Args:
+            tasks (list): заявки (Task)
+        """
+        await self._pool.run(
+            lambda connection: connection.executemany(
+                self.upsert_query, [self._get_row(task) for task in tasks]
+            )
+        )
+
+    async def delete_tasks(self, n_abs_list: list) -> None:
+        """Удаляет строки копии.
+
+        Args:
+            n_abs_list (list): абсолютные номера заявок
+        """
+        query_str = "DELETE FROM `task` WHERE `n_abs` = ?"
+        await self._executemany(query_str, [(n_abs,) for n_abs in n_abs_list])
+
+    async def patch_task(self, n_abs: int, fields: dict) -> None:
+        """Применяет изменение полей заявки к копии.
+
+        Строка заявки читается и заменяется в одной транзакции.
+
+        Args:
+            n_abs (int): абсолютный номер заявки
+            fields (dict): новые значения полей заявки
+        """
+        await self._pool.run(self._patch_task, n_abs, fields)
+
+    async def get_state(self, name: str) -> str | None:
+        """Возвращает параметр состояния синхронизации.
+
+        Args:
+            name (str): имя параметра
+
+        Returns:
+            str|None: значение параметра
+        """
+        query_str = "SELECT `value` FROM `task_sync` WHERE `name` = ?"
+        result = await self._fetchall(query_str, (name,))
+        return result[0][0] if len(result) else None
+
+    async def set_state(self, name: str, value: str) -> None:
+        """Сохраняет параметр состояния синхронизации.
+
+        Args:
+            name (str): имя параметра
+            value (str): значение параметра
+        """
+        query_str = "INSERT OR REPLACE INTO `task_sync` (`name`, `value`) \
+VALUES (?, ?)"
+        await self._execute(query_str, (name, value))
+
+    async def mark_stale(self) -> None:
+        """Сбрасывает время синхронизации копии.
+
+        До следующей синхронизации заявки не читаются из копии.
+        """
+        query_str = "DELETE FROM `task_sync` WHERE `name` = ?"
+        await self._execute(query_str, (self.synced_at_state,))
+
+    @staticmethod
+    def get_digest(task: Task) -> str:
+        """Возвращает контрольную сумму строки заявки."""
+        data = json.dumps(task.to_row(), ensure_ascii=False)
+        return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+    def _patch_task(
+        self, connection: sqlite3.Connection, n_abs: int, fields: dict
+    ) -> None:
+        query_str = "SELECT `data` FROM `task` WHERE `n_abs` = ?"
+        result = connection.execute(query_str, (n_abs,)).fetchall()
+        if len(result):
+            task = Task.from_row(json.loads(result[0][0]))
+            task.patch(fields)
+            connection.execute(self.upsert_query, self._get_row(task))
+
+    def _get_row(self, task: Task) -> tuple:
+        timev_date = None
+        if task.timev_at is not None:
+            timev_date = task.timev_at.date().isoformat()
+        return (
+            task.n_abs,
+            task.tehn,
+            task.timev,
+            timev_date,
+            task.sttech,
+            self.get_digest(task),
+            json.dumps(task.to_row(), ensure_ascii=False),
+        )
+
+
+class Outbox(DB):
+    """Очередь исходящих сообщений Telegram.
+
+    Сообщения добавляются скриптами уведомлений и доставляются процессом
+    бота. Повторное добавление сообщения с тем же ключом игнорируется.
+    """
+
+    pending = "pending"
+    """ Сообщение ожидает доставки """
+
+    sent = "sent"
+    """ Сообщение доставлено """
+
+    failed = "failed"
+    """ Сообщение не доставлено, попытки доставки прекращены """
+
+    async def enqueue(
+        self, dedup_key: str, chat_id: int | str, method: str, payload: dict
+    ) -> bool:
+        """Добавляет сообщение в очередь.
+
+        Args:
+            dedup_key (str): ключ, уникальный для сообщения
+            chat_id (int | str): ID чата Telegram
+            method (str): метод отправки сообщения
+            payload (dict): параметры метода отправки
+
+        Returns:
+            bool: False, если сообщение с таким ключом уже есть в очереди
+        """
+        now = time.time()
+        params = (
+            dedup_key,
+            int(chat_id),
+            method,
+            json.dumps(payload, ensure_ascii=False),
+            self.pending,
+            now,
+            now,
+        )
+        query_str = "INSERT OR IGNORE INTO `outbox` (`dedup_key`, \
+`chat_id`, `method`, `payload`, `status`, `next_attempt_at`, `created_at`) \
+VALUES (?, ?, ?, ?, ?, ?, ?)"
+        return await self._execute(query_str, params) > 0
+
+    async def get_due(self, limit: int) -> list:
+        """Возвращает сообщения, ожидающие доставки, в порядке добавления.
+
+        Args:
+            limit (int): максимальное число сообщений
+
+        Returns:
+            list: сообщения (OutboxMessage)
+        """
+        params = (self.pending, time.time(), limit)
+        query_str = "SELECT `id`, `chat_id`, `method`, `payload`, \
+`attempts` FROM `outbox` WHERE `status` = ? AND `next_attempt_at` <= ? \
+ORDER BY `id` LIMIT ?"
+        rows = await self._fetchall(query_str, params)
+        return [
+            OutboxMessage(
+                id=row[0],
+                chat_id=row[1],
+                method=row[2],
+                payload=json.loads(row[3]),
+                attempts=row[4],
+            )
+            for row in rows
+        ]
+
+    async def mark_sent(self, message_id: int) -> None:
+        """Отмечает сообщение доставленным.
+
+        Args:
+            message_id (int): ID сообщения в очереди
+        """
+        params = (self.sent, time.time(), message_id)
+        query_str = "UPDATE `outbox` SET `status` = ?, `sent_at` = ?, \
+`attempts` = `attempts` + 1 WHERE `id` = ?"
+        await self._execute(query_str, params)
+
+    async def mark_retry(
+        self, message_id: int, error: str, delay: float
+    ) -> None:
+        """Откладывает повторную доставку сообщения.
+
+        Args:
+            message_id (int): ID сообщения в очереди
+            error (str): описание ошибки доставки
+            delay (float): задержка до следующей попытки, в секундах
+        """
+        params = (time.time() + delay, error, message_id)
+        query_str = "UPDATE `outbox` SET `next_attempt_at` = ?, \
+`last_error` = ?, `attempts` = `attempts` + 1 WHERE `id` = ?"
+        await self._execute(query_str, params)
+
+    async def mark_failed(self, message_id: int, error: str) -> None:
+        """Прекращает попытки доставки сообщения.
+
+        Args:
+            message_id (int): ID сообщения в очереди
+            error (str): описание ошибки доставки
+        """
+        params = (self.failed, error, message_id)
+        query_str = "UPDATE `outbox` SET `status` = ?, `last_error` = ?, \
+`attempts` = `attempts` + 1 WHERE `id` = ?"
+        await self._execute(query_str, params)
+
+    async def purge(self, before: float) -> None:
+        """Удаляет доставленные и отклоненные сообщения.
+
+        Args:
+            before (float): время добавления (unix time), ранее которого
+            сообщения удаляются
+        """
+        params = (self.pending, before)
+        query_str = "DELETE FROM `outbox` WHERE `status` != ? \
+AND `created_at` < ?"
+        await self._execute(query_str, params)
+
+
+class ReportMessages(DB):
+    """Сообщения последнего общего отчета в чатах.
+
+    Используется для обновления отчета редактированием ранее отправленных
+    сообщений. Для каждой части отчета хранится ID сообщения и контрольная
+    сумма отображенного текста.
+    """
+
+    async def get_parts(self, chat_id: int | str) -> dict:
+        """Возвращает сообщения отчета в чате.
+
+        Args:
+            chat_id (int | str): ID чата Telegram
+
+        Returns:
+            dict: сообщение (ReportMessage) по имени части отчета
+        """
+        query_str = "SELECT `chat_id`, `part`, `message_id`, `digest`, \
+`report_date` FROM `report_message` WHERE `chat_id` = ?"
+        rows = await self._fetchall(query_str, (int(chat_id),))
+        return {row[1]: ReportMessage(*row) for row in rows}
+
+    async def save(self, message: ReportMessage) -> None:
+        """Сохраняет сообщение части отчета.
+
+        Args:
+            message (ReportMessage): сообщение отчета
+        """
+        params = (
+            message.chat_id,
+            message.part,
+            message.message_id,
+            message.digest,
+            message.report_date,
+        )
+        query_str = "INSERT OR REPLACE INTO `report_message` (`chat_id`, \
+`part`, `message_id`, `digest`, `report_date`) VALUES (?, ?, ?, ?, ?)"
+        await self._execute(query_str, params)
+
+    async def delete(self, chat_id: int | str, part: str) -> None:
+        """Удаляет сообщение части отчета.
+
+        Args:
+            chat_id (int | str): ID чата Telegram
+            part (str): имя части отчета
+        """
+        query_str = "DELETE FROM `report_message` WHERE `chat_id` = ? \
+AND `part` = ?"
+        await self._execute(query_str, (int(chat_id), part))
+
+    @staticmethod
+    def get_digest(text: str) -> str:
+        """Возвращает контрольную сумму текста части отчета."""
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class CallbackTokens(DB):
+    """Значения параметров кнопок, заменяемые в callback_data токенами.
+
+    Токен вычисляется по значению, поэтому одно значение всегда получает один
+    и тот же токен, а таблица растет только с появлением новых значений.
+    """
+
+    async def put(self, value: str) -> str:
+        """Сохраняет значение и возвращает его токен.
+
+        Args:
+            value (str): значение параметра
+
+        Returns:
+            str: токен значения
+        """
+        token = self.get_token(value)
+        query_str = "INSERT OR IGNORE INTO `callback_token` (`token`, \
+`value`) VALUES (?, ?)"
+        await self._execute(query_str, (token, value))
+        return token
+
+    async def get(self, token: str) -> str | None:
+        """Возвращает значение по токену.
+
+        Args:
+            token (str): токен значения
+
+        Returns:
+            str|None: значение или None, если токен неизвестен
+        """
+        query_str = "SELECT `value` FROM `callback_token` \
+WHERE `token` = ?"
+        result = await self._fetchall(query_str, (token,))
+        return result[0][0] if len(result) else None
+
+    @staticmethod
+    def get_token(value: str) -> str:
+        """Возвращает токен значения: 8 символов base64url."""
+        digest = hashlib.blake2b(value.encode(), digest_size=6).digest()
+        return base64.urlsafe_b64encode(digest).decode()
+
+
+class TaskSearchIndex(DB):
+    """Полнотекстовый индекс заявок по объекту и тексту заявки.
+
+    Индексируются номер, наименование и адрес объекта и текст заявки.
+    Идентификатор строки индекса совпадает с абсолютным номером заявки, для
+    каждой строки хранится контрольная сумма индексируемых полей.
+    """
+
+    indexed_fields = ("numobj", "nameobj", "addrobj", "zay")
+    """ Индексируемые поля заявки """
+
+    max_terms = 8
+    """ Максимальное число слов поискового запроса """
+
+    async def get_digests(self) -> dict:
+        """Возвращает контрольные суммы строк индекса по номерам заявок.
+
+        Returns:
+            dict: контрольная сумма строки по абсолютному номеру заявки
+        """
+        query_str = "SELECT `rowid`, `digest` FROM `task_search`"
+        return dict(await self._fetchall(query_str))
+
+    async def upsert_tasks(self, tasks: list) -> None:
+        """Добавляет или заменяет строки индекса.
+
+        Строки удаляются и добавляются в одной транзакции.
+
+        Args:
+            tasks (list): заявки (Task)
+        """
+        await self._pool.run(self._replace_rows, tasks)
+
+    async def delete_tasks(self, n_abs_list: list) -> None:
+        """Удаляет строки индекса.
+
+        Args:
+            n_abs_list (list): абсолютные номера заявок
+        """
+        query_str = "DELETE FROM `task_search` WHERE `rowid` = ?"
+        await self._executemany(query_str, [(n_abs,) for n_abs in n_abs_list])
+
+    async def search(self, text: str, limit: int) -> list:
+        """Ищет заявки, поля которых содержат все слова запроса.
+
+        Слова запроса сравниваются с началом слов полей. Результаты
+        упорядочены от новых заявок к старым: такой порядок индекс
+        возвращает без сортировки всех совпадений.
+
+        Args:
+            text (str): поисковый запрос
+            limit (int): максимальное число результатов
+
+        Returns:
+            list: абсолютные номера найденных заявок
+        """
+        match = self.get_match(text)
+        if not match:
+            return []
+        query_str = "SELECT `rowid` FROM `task_search` \
+WHERE `task_search` MATCH ? ORDER BY `rowid` DESC LIMIT ?"
+        result = await self._fetchall(query_str, (match, limit))
+        return [row[0] for row in result]
+
+    @classmethod
+    def get_match(cls, text: str) -> str:
+        """Возвращает выражение MATCH для поискового запроса.
+
+        Каждое слово запроса заключается в кавычки, поэтому символы
+        синтаксиса FTS5 в запросе не интерпретируются.
+        """
+        terms = re.findall(r"\w+", text)[: cls.max_terms]
+        return " ".join(f'"{term}"*' for term in terms)
+
+    @classmethod
+    def get_fields(cls, task: Task) -> tuple:
+        """Возвращает значения индексируемых полей заявки."""
+        return tuple(str(getattr(task, name)) for name in cls.indexed_fields)
+
+    @staticmethod
+    def get_digest(fields: tuple) -> str:
+        """Возвращает контрольную сумму значений индексируемых полей."""
+        data = "\x1f".join(fields)
+        return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+    @classmethod
+    def _replace_rows(
+        cls, connection: sqlite3.Connection, tasks: list
+    ) -> None:
+        rows = []
+        for task in tasks:
+            fields = cls.get_fields(task)
+            rows.append((task.n_abs, *fields, cls.get_digest(fields)))
+        connection.executemany(
+            "DELETE FROM `task_search` WHERE `rowid` = ?",
+            [(row[0],) for row in rows],
+        )
+        query_str = "INSERT INTO `task_search` (`rowid`, `numobj`, \
+`nameobj`, `addrobj`, `zay`, `digest`) VALUES (?, ?, ?, ?, ?, ?)"
+        connection.executemany(query_str, rows)
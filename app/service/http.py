@@ -0,0 +1,439 @@
+"""Управление http-соединениями с REST API КПО Кобра.
+
+Содержит общий для процесса пул соединений с поддержкой keep-alive,
+объединение одновременных одинаковых запросов, потоковый разбор ответов,
+повторы запросов и приостановку запросов при недоступности КПО Кобра.
+"""
+
+# Standard Library
+import asyncio
+import codecs
+import json
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable
+
+import aiohttp
+
+from app.service.config import CobraConfig
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+chunk_size = 64 * 1024
+""" Размер блока, читаемого из тела ответа при потоковом разборе """
+
+_whitespace = re.compile(r"[\s,]*")
+""" Пробелы и разделители между элементами массива """
+
+_item_end = re.compile(r"[\s,\]]")
+""" Символ, которым завершается элемент массива """
+
+
+def loads(body: bytes) -> Any:
+    """Разбирает тело ответа целиком.
+
+    Используется orjson, если он установлен.
+
+    Args:
+        body (bytes): тело ответа
+
+    Returns:
+        Any: разобранный документ JSON
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+async def iter_json_array(
+    content: aiohttp.StreamReader, key: str = "result"
+) -> AsyncIterator[Any]:
+    """Разбирает массив верхнего уровня ответа по одному элементу.
+
+    Тело ответа читается блоками, в памяти одновременно находятся только
+    непрочитанный остаток блока и очередной элемент массива. Если установлен
+    ijson, разбор выполняется им.
+
+    Args:
+        content (aiohttp.StreamReader): тело ответа
+        key (str): ключ массива в объекте ответа
+
+    Yields:
+        Any: элементы массива
+    """
+    if ijson is not None:
+        async for item in ijson.items(content, f"{key}.item", use_float=True):
+            yield item
+        return
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer, position, eof = await _find_array(content, text_decoder, key)
+    if position is None:
+        for item in json.loads(buffer)[key]:
+            yield item
+        return
+    decoder = json.JSONDecoder()
+    while True:
+        position = _whitespace.match(buffer, position).end()  # type: ignore
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        item, end = _decode_item(decoder, buffer, position, eof)
+        if end is None:
+            text, eof = await _read_text(content, text_decoder)
+            buffer = buffer[position:] + text
+            position = 0
+            continue
+        yield item
+        position = end
+
+
+async def _read_text(
+    content: aiohttp.StreamReader, text_decoder: codecs.IncrementalDecoder
+) -> tuple:
+    """Читает очередной блок тела ответа.
+
+    Returns:
+        tuple: текст блока и признак окончания тела ответа
+    """
+    chunk = await content.read(chunk_size)
+    eof = not chunk
+    return text_decoder.decode(chunk, final=eof), eof
+
+
+async def _find_array(
+    content: aiohttp.StreamReader,
+    text_decoder: codecs.IncrementalDecoder,
+    key: str,
+) -> tuple:
+    """Читает тело ответа до начала массива с ключом key.
+
+    Returns:
+        tuple: прочитанный текст, позиция после открывающей скобки массива
+        или None, если массив не найден во всем теле ответа, и признак
+        окончания тела ответа
+    """
+    start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    buffer = ""
+    while True:
+        text, eof = await _read_text(content, text_decoder)
+        buffer += text
+        match = start.search(buffer)
+        if match is not None:
+            return buffer, match.end(), eof
+        if eof:
+            return buffer, None, eof
+
+
+def _decode_item(
+    decoder: json.JSONDecoder, buffer: str, position: int, eof: bool
+) -> tuple:
+    """Разбирает элемент массива, начинающийся в позиции буфера.
+
+    Returns:
+        tuple: элемент и позиция после него; (None, None), если элемент
+        продолжается в непрочитанной части тела ответа
+    """
+    try:
+        item, end = decoder.raw_decode(buffer, position)
+    except json.JSONDecodeError:
+        if eof:
+            raise
+        return None, None
+    # Число в конце буфера может продолжаться в следующем блоке
+    if not eof and not _item_end.match(buffer, end):
+        return None, None
+    return item, end
+
+
+@dataclass
+class ConnectionStats:
+    """Объект передачи данных.
+
+    Содержит счетчики соединений пула.
+    """
+
+    opened: int = 0
+    reused: int = 0
+    requests: int = 0
+    response_bytes: int = 0
+    max_response_bytes: int = 0
+
+
+class CobraSession:
+    """Общий пул http-соединений с КПО Кобра.
+
+    Сессия aiohttp создается по первому запросу отдельно для каждого цикла
+    событий и переиспользует открытые соединения между запросами.
+    """
+
+    def __init__(self) -> None:  # noqa D107
+        self.stats = ConnectionStats()
+        self._sessions: dict = dict()
+        self._pool_size = CobraConfig.default_pool_size
+        self._keepalive = CobraConfig.default_keepalive_timeout
+        self._timeout = aiohttp.ClientTimeout(
+            sock_connect=CobraConfig.default_connect_timeout,
+            sock_read=CobraConfig.default_read_timeout,
+        )
+
+    def configure(self, config: CobraConfig) -> None:
+        """Устанавливает параметры пула из файла конфигурации.
+
+        Параметры применяются к сессиям, создаваемым после вызова.
+
+        Args:
+            config (CobraConfig): параметры подключения к КПО Кобра
+        """
+        self._pool_size = config.get_pool_size()
+        self._keepalive = config.get_keepalive_timeout()
+        self._timeout = aiohttp.ClientTimeout(
+            sock_connect=config.get_connect_timeout(),
+            sock_read=config.get_read_timeout(),
+        )
+
+    async def get(self) -> aiohttp.ClientSession:
+        """Возвращает сессию текущего цикла событий.
+
+        Returns:
+            aiohttp.ClientSession: сессия с общим пулом соединений
+        """
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = self._create_session()
+            self._sessions[loop] = session
+        self.stats.requests += 1
+        return session
+
+    def get_timeout(self, deadline: float) -> aiohttp.ClientTimeout:
+        """Возвращает таймауты запроса с предельным временем выполнения.
+
+        Args:
+            deadline (float): предельное время выполнения запроса, в секундах
+
+        Returns:
+            aiohttp.ClientTimeout: таймауты запроса
+        """
+        return aiohttp.ClientTimeout(
+            total=deadline,
+            sock_connect=self._timeout.sock_connect,
+            sock_read=self._timeout.sock_read,
+        )
+
+    def record_response(self, size: int) -> None:
+        """Учитывает размер тела ответа КПО Кобра.
+
+        Args:
+            size (int): размер тела ответа в байтах
+        """
+        self.stats.response_bytes += size
+        self.stats.max_response_bytes = max(
+            self.stats.max_response_bytes, size
+        )
+
+    async def close(self) -> None:
+        """Закрывает сессию текущего цикла событий и ее соединения."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self._pool_size,
+            keepalive_timeout=self._keepalive,
+        )
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_create)
+        trace_config.on_connection_reuseconn.append(self._on_reuse)
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=self._timeout,
+            trace_configs=[trace_config],
+        )
+
+    async def _on_create(self, session, context, params) -> None:
+        self.stats.opened += 1
+
+    async def _on_reuse(self, session, context, params) -> None:
+        self.stats.reused += 1
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых запросов.
+
+    Пока запрос с некоторым ключом выполняется, повторные вызовы с тем же
+    ключом не создают новый запрос, а ожидают результат уже выполняющегося.
+    """
+
+    def __init__(self) -> None:  # noqa D107
+        self.deduplicated = 0
+        """ Число вызовов, получивших результат чужого запроса """
+        self._calls: dict = dict()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable]):
+        """Выполняет запрос или присоединяется к уже выполняющемуся.
+
+        Args:
+            key (Hashable): ключ запроса
+            func (Callable[[], Awaitable]): выполнение запроса
+
+        Returns:
+            Any: результат запроса
+        """
+        loop = asyncio.get_running_loop()
+        call = self._calls.get(key)
+        if call is not None and not call.done() and call.get_loop() is loop:
+            self.deduplicated += 1
+        else:
+            call = loop.create_task(func())
+            self._calls[key] = call
+            call.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(call)
+
+    def _forget(self, key: Hashable, call: asyncio.Task) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+class CobraUnavailableError(aiohttp.ClientError):
+    """КПО Кобра недоступна, запросы к ней приостановлены."""
+
+
+@dataclass
+class BreakerStats:
+    """Объект передачи данных.
+
+    Содержит счетчики приостановки запросов к КПО Кобра.
+    """
+
+    failures: int = 0
+    opened: int = 0
+    rejected: int = 0
+
+
+class CircuitBreaker:
+    """Приостановка запросов к недоступной КПО Кобра.
+
+    После threshold ошибок подряд запросы отклоняются без обращения к КПО
+    Кобра в течение reset_timeout. Затем пропускается один пробный запрос:
+    при успехе запросы возобновляются, при ошибке снова приостанавливаются.
+    """
+
+    closed = "closed"
+    """ Запросы выполняются """
+
+    open = "open"
+    """ Запросы отклоняются """
+
+    half_open = "half_open"
+    """ Выполняется пробный запрос """
+
+    def __init__(self) -> None:  # noqa D107
+        self.stats = BreakerStats()
+        self._threshold = CobraConfig.default_breaker_threshold
+        self._reset_timeout = CobraConfig.default_breaker_reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_until = 0.0
+
+    def configure(self, config: CobraConfig) -> None:
+        """Устанавливает параметры приостановки из файла конфигурации.
+
+        Args:
+            config (CobraConfig): параметры подключения к КПО Кобра
+        """
+        self._threshold = config.get_breaker_threshold()
+        self._reset_timeout = config.get_breaker_reset_timeout()
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние: closed, open или half_open."""
+        if self._opened_at is None:
+            return self.closed
+        if time.monotonic() - self._opened_at < self._reset_timeout:
+            return self.open
+        return self.half_open
+
+    def check(self) -> None:
+        """Проверяет, можно ли выполнить запрос.
+
+        Raises:
+            CobraUnavailableError: запросы приостановлены
+        """
+        state = self.state
+        now = time.monotonic()
+        if state == self.closed:
+            return
+        if state == self.half_open and now >= self._probe_until:
+            self._probe_until = now + self._reset_timeout
+            return
+        self.stats.rejected += 1
+        raise CobraUnavailableError("КПО Кобра недоступна")
+
+    def record_success(self) -> None:
+        """Учитывает успешный запрос."""
+        if self._opened_at is not None:
+            logger.info("Запросы к КПО Кобра возобновлены")
+        self._failures = 0
+        self._opened_at = None
+        self._probe_until = 0.0
+
+    def record_failure(self) -> None:
+        """Учитывает неудачный запрос."""
+        self._failures += 1
+        self.stats.failures += 1
+        if self._opened_at is None and self._failures < self._threshold:
+            return
+        if self._opened_at is None:
+            self.stats.opened += 1
+            logger.warning(
+                f"Запросы к КПО Кобра приостановлены на \
+{self._reset_timeout} с"
+            )
+        self._opened_at = time.monotonic()
+
+
+class RetryPolicy:
+    """Повтор неудачных запросов с экспоненциальной задержкой.
+
+    Задержка выбирается случайно от нуля до backoff * 2 ** attempt, чтобы
+    повторы одновременных запросов не приходили к КПО Кобра одновременно.
+    """
+
+    def __init__(self, retries: int, backoff: float) -> None:  # noqa D107
+        self.retries = retries
+        self.backoff = backoff
+
+    @staticmethod
+    def is_transient(error: Exception) -> bool:
+        """Проверяет, может ли повтор запроса завершиться успешно.
+
+        Ответы КПО Кобра с кодом 4xx не повторяются.
+        """
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status >= 500
+        return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+    def get_delay(self, attempt: int) -> float:
+        """Возвращает задержку перед повтором.
+
+        Args:
+            attempt (int): номер неудачной попытки, начиная с нуля
+
+        Returns:
+            float: задержка в секундах
+        """
+        return random.uniform(0, self.backoff * 2**attempt)
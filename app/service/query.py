@@ -0,0 +1,177 @@
+"""Построение запросов к таблицам КПО Кобра.
+
+Формирует параметры filter и fields метода api.table.get. Условия, которые
+КПО Кобра не умеет проверять, проверяются на стороне приложения.
+"""
+
+# Standard Library
+import functools
+import json
+import urllib.parse
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable
+
+from app.service.db import parse_cobra_datetime
+
+
+def _to_date(value: str) -> date | None:
+    parsed = parse_cobra_datetime(value)
+    return parsed.date() if parsed is not None else None
+
+
+_checks: dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda current, value: str(current) == str(value),
+    "prefix": lambda current, value: str(current).startswith(value),
+    "ne": lambda current, value: str(current) != str(value),
+    "date_le": lambda current, value: (_to_date(current) or date.max) <= value,
+    "date_ge": lambda current, value: (_to_date(current) or date.min) >= value,
+}
+""" Проверка условия на стороне приложения по имени оператора """
+
+
+@dataclass(frozen=True)
+class Predicate:
+    """Условие отбора строк по значению одного поля."""
+
+    field: str
+    operator: str
+    value: Any
+
+    def matches(self, row) -> bool:
+        """Проверяет условие для строки таблицы.
+
+        Args:
+            row (dict | Task): строка таблицы КПО Кобра или объект заявки
+
+        Returns:
+            bool: результат проверки
+        """
+        if isinstance(row, dict):
+            current = row[self.field]
+        else:
+            current = getattr(row, self.field)
+        return _checks[self.operator](current, self.value)
+
+
+@dataclass(frozen=True)
+class CobraQuery:
+    """Запрос к таблице КПО Кобра.
+
+    Запрос неизменяем: каждый метод построения возвращает новый запрос.
+    Фильтр КПО Кобра отбирает строки, значение поля которых начинается с
+    указанного значения. Поэтому условие совпадения значения передается в
+    фильтре для сокращения ответа и повторно проверяется после получения
+    ответа, как и условия, которые фильтром не выражаются.
+    """
+
+    table: str
+    predicates: tuple = ()
+    fields: tuple = ()
+
+    server_operators = frozenset({"eq", "prefix"})
+    """ Операторы, которые выражаются фильтром КПО Кобра """
+
+    exact_operators = frozenset({"prefix"})
+    """ Операторы, которые фильтр КПО Кобра проверяет точно """
+
+    def where(self, *predicates: Predicate) -> "CobraQuery":
+        """Добавляет условия отбора."""
+        return CobraQuery(self.table, self.predicates + predicates, self.fields)
+
+    def equals(self, field: str, value: Any) -> "CobraQuery":
+        """Отбор строк с указанным значением поля."""
+        return self.where(Predicate(field, "eq", value))
+
+    def startswith(self, field: str, prefix: str) -> "CobraQuery":
+        """Отбор строк, значение поля которых начинается с префикса."""
+        return self.where(Predicate(field, "prefix", prefix))
+
+    def not_equals(self, field: str, value: Any) -> "CobraQuery":
+        """Отбор строк, значение поля которых отличается от указанного."""
+        return self.where(Predicate(field, "ne", value))
+
+    def date_until(self, field: str, value: date) -> "CobraQuery":
+        """Отбор строк с датой в поле не позднее указанной."""
+        return self.where(Predicate(field, "date_le", value))
+
+    def date_from(self, field: str, value: date) -> "CobraQuery":
+        """Отбор строк с датой в поле не ранее указанной."""
+        return self.where(Predicate(field, "date_ge", value))
+
+    def select(self, *fields: str) -> "CobraQuery":
+        """Устанавливает набор возвращаемых полей."""
+        return CobraQuery(self.table, self.predicates, fields)
+
+    @property
+    def server_predicates(self) -> tuple:
+        """Условия, передаваемые в фильтре КПО Кобра."""
+        return tuple(
+            predicate
+            for predicate in self.predicates
+            if predicate.operator in self.server_operators
+        )
+
+    @property
+    def client_predicates(self) -> tuple:
+        """Условия, проверяемые на стороне приложения."""
+        return tuple(
+            predicate
+            for predicate in self.predicates
+            if predicate.operator not in self.exact_operators
+        )
+
+    def matches(self, row) -> bool:
+        """Проверяет все условия запроса для строки таблицы.
+
+        Используется для отбора строк из ранее полученного снимка таблицы.
+        """
+        return all(predicate.matches(row) for predicate in self.predicates)
+
+    def accepts(self, row) -> bool:
+        """Проверяет условия приложения для строки ответа КПО Кобра."""
+        return all(
+            predicate.matches(row) for predicate in self.client_predicates
+        )
+
+    def filter_response(self, rows: list) -> list:
+        """Отбирает строки ответа КПО Кобра по условиям приложения."""
+        if not self.client_predicates:
+            return rows
+        return [row for row in rows if self.accepts(row)]
+
+    def compile(self) -> str:
+        """Возвращает строку параметров запроса api.table.get."""
+        return compile_query(self)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_query(query: CobraQuery) -> str:
+    """Формирует строку параметров запроса.
+
+    Результат кэшируется: одинаковые запросы формируются один раз. Поля
+    условий, проверяемых на стороне приложения, добавляются к возвращаемым
+    полям.
+
+    Args:
+        query (CobraQuery): запрос к таблице КПО Кобра
+
+    Returns:
+        str: параметры name, filter и fields в кодировке url
+    """
+    params = {"name": query.table}
+    if query.server_predicates:
+        params["filter"] = json.dumps(
+            [
+                {predicate.field: str(predicate.value)}
+                for predicate in query.server_predicates
+            ],
+            ensure_ascii=False,
+        )
+    if query.fields:
+        checked = (predicate.field for predicate in query.client_predicates)
+        fields = dict.fromkeys((*query.fields, *checked))
+        params["fields"] = json.dumps(
+            [{name: "1"} for name in fields], ensure_ascii=False
+        )
+    return urllib.parse.urlencode(params)
@@ -14,6 +14,7 @@ from openpyxl.styles import Alignment, Font
 from openpyxl.styles.borders import Border, Side
 
 from app.service.cobra import TaskReportHeader
+from app.service.db import Task
 
 
 class ExcelReport(ABC):
@@ -78,7 +79,7 @@ class CobraTaskExcelReport(ExcelReport):
             f"Дата формирования отчета: {current_datetime}"
         )
 
-    def set_row(self, task: dict) -> None:
+    def set_row(self, task: Task) -> None:
         """Устанавливает данные строки отчета."""
         if self.max_row == self.start_row:
             self._sheet["A" + str(self.max_row)] = TaskReportHeader().timez
@@ -105,15 +106,15 @@ class CobraTaskExcelReport(ExcelReport):
         Увеличение на 2 для 1-й записи, т.к. добавляются заголовки таблицы """
         self.max_row += 1 if self.max_row > self.start_row else 2
 
-    def _add_row_by_number(self, task: dict, number: int):
-        self._sheet["A" + str(number)] = task["timez"]
-        self._sheet["B" + str(number)] = task["timev"]
-        self._sheet["C" + str(number)] = task["prin"]
-        self._sheet["D" + str(number)] = task["numobj"]
-        self._sheet["E" + str(number)] = task["nameobj"]
-        self._sheet["F" + str(number)] = task["addrobj"]
-        self._sheet["G" + str(number)] = task["zay"]
-        self._sheet["H" + str(number)] = task["tehn"]
+    def _add_row_by_number(self, task: Task, number: int):
+        self._sheet["A" + str(number)] = task.timez
+        self._sheet["B" + str(number)] = task.timev
+        self._sheet["C" + str(number)] = task.prin
+        self._sheet["D" + str(number)] = task.numobj
+        self._sheet["E" + str(number)] = task.nameobj
+        self._sheet["F" + str(number)] = task.addrobj
+        self._sheet["G" + str(number)] = task.zay
+        self._sheet["H" + str(number)] = task.tehn
 
     def _set_row_border(self, number: int) -> None:
         brdr = Side(border_style="thin", color="000000")
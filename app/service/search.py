@@ -0,0 +1,154 @@
+"""Поиск текущих заявок по объекту и тексту заявки.
+
+Полнотекстовый индекс в БД строится по общему снимку заявок и обновляется
+в фоне только для изменившихся заявок при изменении снимка.
+"""
+
+# Standard Library
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from app.service.cobra import CobraTaskReport
+from app.service.config import TelegramConfig
+from app.service.db import TaskSearchIndex, TaskSet
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SearchStats:
+    """Объект передачи данных.
+
+    Содержит счетчики поиска заявок.
+    """
+
+    searches: int = 0
+    refreshes: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+
+class TaskSearch:
+    """Поиск текущих заявок.
+
+    Запрос выполняется по индексу в его текущем состоянии, без обращения к
+    КПО Кобра. Фоновая задача бота раз в refresh_interval сверяет индекс со
+    снимком заявок, если снимок изменился с прошлой сверки: в индекс
+    записываются только заявки с измененными индексируемыми полями,
+    завершенные (sttech = 3) и отсутствующие в снимке заявки удаляются. При
+    первой сверке поля сравниваются с контрольными суммами индекса, при
+    последующих - со значениями, запомненными при прошлой сверке. Если
+    первая сверка еще не выполнена, запрос ожидает ее.
+    """
+
+    def __init__(  # noqa D107
+        self,
+        report: CobraTaskReport,
+        index: TaskSearchIndex,
+        config: TelegramConfig,
+    ) -> None:
+        self.stats = SearchStats()
+        self._report = report
+        self._index = index
+        self._interval = config.get_inline_refresh_interval()
+        self._indexed: TaskSet | None = None
+        self._indexed_version = -1
+        self._fields: dict | None = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Запускает фоновую сверку индекса."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую сверку индекса."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def search(self, text: str, limit: int) -> list:
+        """Ищет текущие заявки, содержащие все слова запроса.
+
+        Args:
+            text (str): поисковый запрос
+            limit (int): максимальное число результатов
+
+        Returns:
+            list: найденные заявки (Task), от новых к старым
+        """
+        if self._indexed is None:
+            await self.update()
+        tasks: TaskSet = self._indexed  # type: ignore
+        self.stats.searches += 1
+        n_abs_list = await self._index.search(text, limit)
+        found = (tasks.get(n_abs) for n_abs in n_abs_list)
+        # Заявка могла быть завершена после последней сверки индекса
+        return [
+            task for task in found if task is not None and task.sttech != 3
+        ]
+
+    async def update(self) -> None:
+        """Сверяет индекс с текущим снимком заявок."""
+        await self.refresh(await self._report.get_unfinished_tasks())
+
+    async def refresh(self, tasks: TaskSet) -> None:
+        """Сверяет индекс со снимком заявок, если снимок изменился.
+
+        Args:
+            tasks (TaskSet): текущие заявки из снимка
+        """
+        async with self._lock:
+            await self._refresh(tasks)
+
+    async def _refresh(self, tasks: TaskSet) -> None:
+        version = self._report.snapshot.version
+        if tasks is self._indexed and version == self._indexed_version:
+            return
+        started_at = time.monotonic()
+        if self._fields is None:
+            known = await self._index.get_digests()
+            get_key = TaskSearchIndex.get_digest
+        else:
+            known = self._fields
+            get_key = tuple
+        fields_by_n_abs = dict()
+        changed = []
+        for task in tasks:
+            if task.sttech == 3:
+                continue
+            fields = TaskSearchIndex.get_fields(task)
+            fields_by_n_abs[task.n_abs] = fields
+            if known.get(task.n_abs) != get_key(fields):
+                changed.append(task)
+        deleted = [n_abs for n_abs in known if n_abs not in fields_by_n_abs]
+        if changed:
+            await self._index.upsert_tasks(changed)
+        if deleted:
+            await self._index.delete_tasks(deleted)
+        self._indexed = tasks
+        self._indexed_version = version
+        self._fields = fields_by_n_abs
+        self.stats.refreshes += 1
+        self.stats.updated += len(changed)
+        self.stats.deleted += len(deleted)
+        if changed or deleted:
+            logger.info(
+                f"Индекс поиска заявок обновлен: изменено {len(changed)}, \
+удалено {len(deleted)}, {time.monotonic() - started_at:.2f} с"
+            )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.update()
+            except Exception as error:
+                logger.warning(f"Ошибка обновления индекса поиска: {error!r}")
+            await asyncio.sleep(self._interval)
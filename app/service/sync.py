@@ -0,0 +1,107 @@
+"""Синхронизация локальной копии заявок с КПО Кобра.
+
+Фоновая задача бота поддерживает в БД копию текущих заявок, из которой
+читают обработчики и планировщик.
+"""
+
+# Standard Library
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from app.service.cobra import CobraTaskReport
+from app.service.config import CobraConfig
+from app.service.db import TaskMirror
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SyncStats:
+    """Объект передачи данных.
+
+    Содержит счетчики синхронизации локальной копии заявок.
+    """
+
+    cycles: int = 0
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    errors: int = 0
+
+
+class CobraTaskSync:
+    """Синхронизация локальной копии заявок.
+
+    КПО Кобра не сообщает, какие заявки изменились, поэтому на каждом цикле
+    текущие заявки запрашиваются целиком со всеми полями копии. Контрольная
+    сумма всех полей каждой заявки сравнивается с суммой строки копии, и в
+    БД записываются только новые и измененные заявки, а завершенные
+    удаляются.
+    """
+
+    def __init__(  # noqa D107
+        self, report: CobraTaskReport, mirror: TaskMirror, config: CobraConfig
+    ) -> None:
+        self.stats = SyncStats()
+        self._report = report
+        self._mirror = mirror
+        self._interval = config.get_mirror_interval()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Запускает фоновую синхронизацию."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую синхронизацию."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sync(self) -> None:
+        """Выполняет один цикл синхронизации."""
+        self.stats.cycles += 1
+        tasks = await self._report.fetch_unfinished_tasks(
+            self._report.snapshot_fields
+        )
+        digests = await self._mirror.get_digests()
+        changed = [
+            task
+            for task in tasks
+            if digests.get(task.n_abs) != TaskMirror.get_digest(task)
+        ]
+        actual = {task.n_abs for task in tasks}
+        deleted = [n_abs for n_abs in digests if n_abs not in actual]
+        inserted = sum(1 for task in changed if task.n_abs not in digests)
+        self.stats.inserted += inserted
+        self.stats.updated += len(changed) - inserted
+        self.stats.deleted += len(deleted)
+        if changed:
+            await self._mirror.upsert_tasks(changed)
+        if deleted:
+            await self._mirror.delete_tasks(deleted)
+        await self._mirror.set_state(
+            TaskMirror.synced_at_state, str(time.time())
+        )
+        if changed or deleted:
+            CobraTaskReport.snapshot.invalidate()
+            logger.info(
+                f"Копия заявок синхронизирована: изменено {len(changed)}, \
+удалено {len(deleted)}"
+            )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except Exception as error:
+                self.stats.errors += 1
+                logger.warning(f"Ошибка синхронизации копии заявок: {error!r}")
+            await asyncio.sleep(self._interval)
@@ -0,0 +1,100 @@
+"""Получение обновлений Telegram через webhook.
+
+Содержит http-сервер бота: проверку секретного токена обновлений, проверку
+работоспособности и ожидание обработки принятых обновлений при остановке.
+"""
+
+# Standard Library
+import asyncio
+import hmac
+import logging
+
+from aiohttp import web
+
+from app.service.config import TelegramConfig
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookServer:
+    """http-сервер бота для режима webhook.
+
+    Обновления принимаются только с секретным токеном, указанным при
+    установке webhook. Без допустимого токена в файле конфигурации сервер
+    не создается. При остановке сервер перестает принимать обновления
+    и ожидает завершения обработки уже принятых, но не дольше drain_timeout.
+    """
+
+    secret_header = "X-Telegram-Bot-Api-Secret-Token"
+    """ Заголовок запроса с секретным токеном обновления """
+
+    health_path = "/health"
+    """ Путь проверки работоспособности бота """
+
+    def __init__(self, config: TelegramConfig) -> None:  # noqa D107
+        self._path = config.get_webhook_path()
+        self._secret = config.get_webhook_secret()
+        self._drain_timeout = config.get_drain_timeout()
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._draining = False
+
+    def get_app(self) -> web.Application:
+        """Возвращает приложение aiohttp для executor.set_webhook.
+
+        Returns:
+            web.Application: приложение с проверкой токена и проверкой
+            работоспособности
+        """
+        app = web.Application(middlewares=[self._check_update])
+        app.router.add_get(self.health_path, self.health)
+        app.on_shutdown.append(self._drain)
+        return app
+
+    async def health(self, request: web.Request) -> web.Response:
+        """Отвечает на проверку работоспособности.
+
+        Во время остановки возвращает код 503.
+        """
+        status = "draining" if self._draining else "ok"
+        return web.json_response(
+            {"status": status, "in_flight": self._in_flight},
+            status=503 if self._draining else 200,
+        )
+
+    @web.middleware
+    async def _check_update(self, request: web.Request, handler):
+        """Проверяет секретный токен и учитывает обрабатываемые обновления."""
+        if request.path != self._path:
+            return await handler(request)
+        if self._draining:
+            raise web.HTTPServiceUnavailable()
+        if not hmac.compare_digest(
+            request.headers.get(self.secret_header, ""), self._secret
+        ):
+            logger.warning(
+                f"Отклонено обновление без секретного токена: {request.remote}"
+            )
+            raise web.HTTPUnauthorized()
+        self._in_flight += 1
+        self._idle.clear()
+        try:
+            return await handler(request)
+        finally:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self._idle.set()
+
+    async def _drain(self, app: web.Application) -> None:
+        """Ожидает обработки принятых обновлений при остановке сервера."""
+        self._draining = True
+        if self._in_flight:
+            logger.info(f"Ожидание обработки обновлений: {self._in_flight}")
+        try:
+            await asyncio.wait_for(self._idle.wait(), self._drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Обработка обновлений не завершена за \
+{self._drain_timeout} с: {self._in_flight}"
+            )
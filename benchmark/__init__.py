@@ -0,0 +1,5 @@
+"""Замеры производительности бота.
+
+Замеры запускаются вручную из корня проекта, например
+python -m benchmark.query_payload, и не входят в тесты.
+"""
@@ -0,0 +1,153 @@
+"""Стоимость обработки нажатия кнопки диспетчером.
+
+До: обработчики зарегистрированы в диспетчере с цепочкой фильтров
+startswith по данным кнопки прежнего формата, как до введения
+CallbackRouter. После: один обработчик CallbackRouter, данные кнопки
+разбираются CallbackCodec и обработчик выбирается по коду действия.
+Замеряется обработка обновления диспетчером aiogram без обращений к
+Telegram: обработчики только считают вызовы. Токены строк уже разрешены и
+находятся в памяти кодека.
+
+Запуск: python -m benchmark.callback_dispatch [число нажатий]
+"""
+
+# Standard Library
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from aiogram import Bot, Dispatcher, types
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from yoyo import get_backend, read_migrations
+
+from app.service.callback import CallbackAction, CallbackCodec, CallbackRouter
+from app.service.db import CallbackTokens, ConnectionPool
+
+legacy_prefixes = (
+    "task",
+    "view_act",
+    "close_action",
+    "closing_act_accept",
+    "closing_act_edit",
+    "closing_act_cancel",
+    "accept_action",
+    "responsibility_act",
+)
+""" Действия прежнего формата в порядке регистрации обработчиков """
+
+presses = (
+    ("task|100123", CallbackAction.task, 100123),
+    ("view_act|100123|123456789", CallbackAction.view, 100123),
+    ("accept_action|Техник 6", CallbackAction.accept, "Техник 6"),
+)
+""" Нажатия: данные прежнего формата, код действия и параметр """
+
+
+def make_update(update_id: int, data: str) -> types.Update:
+    """Возвращает обновление с нажатием кнопки."""
+    chat = {"id": 1, "type": "private"}
+    sender = {"id": 1, "is_bot": False, "first_name": "Техник"}
+    return types.Update(
+        update_id=update_id,
+        callback_query={
+            "id": str(update_id),
+            "from": sender,
+            "chat_instance": "1",
+            "data": data,
+            "message": {
+                "message_id": 1,
+                "date": 0,
+                "chat": chat,
+                "from": sender,
+            },
+        },
+    )
+
+
+async def measure(dp: Dispatcher, updates: list, calls: list) -> float:
+    """Возвращает время обработки одного нажатия в микросекундах."""
+    calls.clear()
+    started_at = time.perf_counter()
+    for update in updates:
+        await dp.process_update(update)
+    elapsed = time.perf_counter() - started_at
+    assert len(calls) == len(updates)
+    return elapsed / len(updates) * 1e6
+
+
+def get_legacy_dispatcher(bot: Bot, calls: list) -> Dispatcher:
+    """Возвращает диспетчер с цепочкой фильтров прежнего формата."""
+    dp = Dispatcher(bot, storage=MemoryStorage())
+
+    async def handler(callback: types.CallbackQuery) -> None:
+        calls.append(callback.data)
+
+    for prefix in legacy_prefixes:
+        dp.register_callback_query_handler(
+            handler, lambda c, prefix=prefix: c.data.startswith(prefix)
+        )
+    return dp
+
+
+def get_router_dispatcher(
+    bot: Bot, codec: CallbackCodec, calls: list
+) -> Dispatcher:
+    """Возвращает диспетчер с маршрутизатором нажатий."""
+    dp = Dispatcher(bot, storage=MemoryStorage())
+    router = CallbackRouter(codec)
+
+    async def handler(callback, state, arg) -> None:
+        calls.append(arg)
+
+    for action in (
+        CallbackAction.task,
+        CallbackAction.view,
+        CallbackAction.accept,
+    ):
+        router.route(action)(handler)
+    dp.register_callback_query_handler(router.dispatch, state="*")
+    return dp
+
+
+async def main(count: int) -> None:
+    """Выполняет замер."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "db.sqlite3")
+        backend = get_backend(f"sqlite:///{db_file}")
+        with backend.lock():
+            backend.apply_migrations(
+                backend.to_apply(read_migrations("migration"))
+            )
+        backend.connection.close()
+        codec = CallbackCodec(CallbackTokens(db_file))
+        bot = Bot(token="123456:benchmark")
+        Bot.set_current(bot)
+        calls: list = []
+        legacy_dp = get_legacy_dispatcher(bot, calls)
+        router_dp = get_router_dispatcher(bot, codec, calls)
+        print(f"Нажатий: {count}")
+        try:
+            for legacy_data, action, arg in presses:
+                data = await codec.encode(action, arg)
+                before = await measure(
+                    legacy_dp,
+                    [make_update(i, legacy_data) for i in range(count)],
+                    calls,
+                )
+                after = await measure(
+                    router_dp,
+                    [make_update(i, data) for i in range(count)],
+                    calls,
+                )
+                print(
+                    f"{legacy_data:<28} до: {before:6.1f} мкс, "
+                    f"{data:<14} после: {after:6.1f} мкс"
+                )
+        finally:
+            await ConnectionPool.close_all()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
@@ -0,0 +1,114 @@
+"""Локальная замена REST API КПО Кобра для замеров.
+
+Сервер отдает синтетические строки таблицы zayavki. Фильтр сравнивает
+начало значений полей, как фильтр КПО Кобра, набор полей ответа
+ограничивается параметром fields.
+"""
+
+# Standard Library
+import json
+
+from aiohttp import web
+
+from app.service.config import CobraConfig
+
+template_file = "template/config/config.ini.template"
+""" Файл конфигурации, параметры подключения которого заменяются """
+
+token = "benchmark"
+""" Пароль удаленного доступа заменителя КПО Кобра """
+
+
+def make_rows(count: int, tehn_count: int = 100) -> list:
+    """Возвращает синтетические строки таблицы zayavki.
+
+    Args:
+        count (int): число строк
+        tehn_count (int): число техников, между которыми распределены заявки
+
+    Returns:
+        list: строки таблицы (dict)
+    """
+    return [
+        {
+            "n_abs": 100000 + i,
+            "zay": f"*** Нет связи с объектом, проверить прибор {i}",
+            "prin": "Дежурный ПЦН",
+            "who": "Оператор",
+            "timez": f"{1 + i % 28:02}.10.2026 {i % 24:02}:{i % 60:02}:00",
+            "nameobj": f"Магазин Продукты №{i % 997}",
+            "numobj": str(1000 + i % 5000),
+            "addrobj": f"г. Вологда, ул. Ленина, д. {i % 300}, кв. {i % 90}",
+            "tehn": f"Техник {i % tehn_count}",
+            "timev": f"{1 + i % 30:02}.10.2026 09:00:00",
+            "sttech": i % 4,
+            "rez": "",
+            "timer": "",
+            "primech": "Ключи у охраны, доступ с 8:00 до 20:00",
+        }
+        for i in range(count)
+    ]
+
+
+class CobraStub:
+    """Заменитель КПО Кобра на локальном порту.
+
+    Считает запросы и байты отправленных тел ответов.
+    """
+
+    def __init__(self, rows: list) -> None:  # noqa D107
+        self.rows = rows
+        self.requests = 0
+        self.sent_bytes = 0
+        self._runner: web.AppRunner | None = None
+
+    async def start(self) -> CobraConfig:
+        """Запускает сервер.
+
+        Returns:
+            CobraConfig: конфигурация подключения к заменителю
+        """
+        app = web.Application()
+        app.router.add_get("/api.table.get", self._get)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        config = CobraConfig(template_file)
+        config.config.set("Cobra", "host", "http://127.0.0.1")
+        config.config.set("Cobra", "port", str(port))
+        config.config.set("Cobra", "token", token)
+        return config
+
+    async def stop(self) -> None:
+        """Останавливает сервер."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def reset(self) -> None:
+        """Обнуляет счетчики."""
+        self.requests = 0
+        self.sent_bytes = 0
+
+    async def _get(self, request: web.Request) -> web.Response:
+        if request.query.get("pud") != token:
+            raise web.HTTPForbidden()
+        rows = self.rows
+        if "filter" in request.query:
+            for condition in json.loads(request.query["filter"]):
+                for name, value in condition.items():
+                    rows = [
+                        row for row in rows if str(row[name]).startswith(value)
+                    ]
+        if "fields" in request.query:
+            names = [
+                name
+                for field in json.loads(request.query["fields"])
+                for name in field
+            ]
+            rows = [{name: row[name] for name in names} for row in rows]
+        body = json.dumps({"result": rows}, ensure_ascii=False).encode()
+        self.requests += 1
+        self.sent_bytes += len(body)
+        return web.Response(body=body, content_type="application/json")
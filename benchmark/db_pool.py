@@ -0,0 +1,147 @@
+"""Задержка цикла событий при запросах к БД во время записи другим процессом.
+
+До: запросы выполняются в цикле событий на одном соединении sqlite3 в
+режиме журнала по умолчанию, чтение ожидает окончания чужой записи. После:
+запросы выполняются в потоках ConnectionPool на соединениях в режиме WAL.
+Второй процесс все время замера записывает строки outbox транзакциями по
+batch строк, как планировщик при постановке уведомлений. Обработчики
+одновременно ищут пользователей по chat_id; задержка цикла событий -
+опоздание периодической задачи с интервалом 10 мс.
+
+Запуск: python -m benchmark.db_pool [длительность замера, с]
+"""
+
+# Standard Library
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from yoyo import get_backend, read_migrations
+
+from app.service.db import ConnectionPool, User
+
+handlers = 8
+""" Число одновременных обработчиков """
+
+batch = 500
+""" Число строк outbox в транзакции записывающего процесса """
+
+tick = 0.01
+""" Интервал периодической задачи, в секундах """
+
+
+def write(db_file: str) -> None:
+    """Записывает строки outbox, пока процесс не будет остановлен."""
+    connection = sqlite3.connect(db_file, timeout=5.0)
+    query_str = "INSERT INTO `outbox` (`dedup_key`, `chat_id`, `method`, \
+`payload`, `status`, `next_attempt_at`, `created_at`) VALUES \
+(?, 1, 'send_message', '{}', 'pending', 0, 0)"
+    start = 0
+    while True:
+        with connection:
+            connection.executemany(
+                query_str,
+                ((f"bench:{i}",) for i in range(start, start + batch)),
+            )
+        start += batch
+
+
+class DirectUser(User):
+    """Пользователи БД на одном соединении в цикле событий."""
+
+    def __init__(self, db_file: str) -> None:  # noqa D107
+        self._connection = sqlite3.connect(db_file, timeout=5.0)
+
+    async def _fetchall(self, query_str: str, params: tuple = ()) -> list:
+        return self._connection.execute(query_str, params).fetchall()
+
+
+async def watch_loop(lags: list, stop: asyncio.Event) -> None:
+    """Записывает опоздания периодической задачи, в мс."""
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append((time.perf_counter() - started_at - tick) * 1000)
+
+
+async def handle(users: User, timings: list, stop: asyncio.Event) -> None:
+    """Ищет пользователей и записывает время запросов, в мс."""
+    i = 0
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        await users.get_user(i % 100)
+        timings.append((time.perf_counter() - started_at) * 1000)
+        i += 1
+        await asyncio.sleep(0)
+
+
+async def measure(users: User, db_file: str, duration: float) -> tuple:
+    """Возвращает число запросов, их 99-й процентиль и задержки цикла."""
+    writer = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "benchmark.db_pool", "--write", db_file
+    )
+    await asyncio.sleep(0.5)
+    lags: list = []
+    timings: list = []
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(watch_loop(lags, stop))]
+    tasks += [
+        asyncio.create_task(handle(users, timings, stop))
+        for _ in range(handlers)
+    ]
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    writer.terminate()
+    await writer.wait()
+    percentile = statistics.quantiles(timings, n=100)[-1]
+    return len(timings), percentile, statistics.median(lags), max(lags)
+
+
+def create_db(db_file: str) -> None:
+    """Создает БД с пользователями."""
+    backend = get_backend(f"sqlite:///{db_file}")
+    with backend.lock():
+        backend.apply_migrations(
+            backend.to_apply(read_migrations("migration"))
+        )
+    backend.connection.close()
+    with sqlite3.connect(db_file) as connection:
+        connection.executemany(
+            "INSERT INTO `user` (`chat_id`, `first_name`) VALUES (?, ?)",
+            ((chat_id, "Иван") for chat_id in range(100)),
+        )
+    connection.close()
+
+
+async def main(duration: float) -> None:
+    """Выполняет замер."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, make_users in (("sqlite3", DirectUser), ("pool", User)):
+            db_file = os.path.join(tmp_dir, f"{name}.sqlite3")
+            create_db(db_file)
+            users = make_users(db_file)
+            # Пул переводит БД в режим WAL при первом соединении
+            await users.get_user(1)
+            try:
+                queries, percentile, lag, max_lag = await measure(
+                    users, db_file, duration
+                )
+            finally:
+                await ConnectionPool.close_all()
+            print(
+                f"{name:<8} запросов {queries / duration:8.0f}/с, "
+                f"99% {percentile:6.2f} мс, задержка цикла: медиана "
+                f"{lag:6.2f} мс, максимум {max_lag:7.2f} мс"
+            )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--write"]:
+        write(sys.argv[2])
+    else:
+        asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 3.0))
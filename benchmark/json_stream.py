@@ -0,0 +1,110 @@
+"""Пиковая память и время загрузки заявок: разбор ответа целиком и потоком.
+
+До: тело ответа КПО Кобра читается целиком, разбирается в список строк и
+только затем преобразуется в заявки. После: строки разбираются по мере
+получения тела ответа (iter_json_array) и сразу преобразуются в заявки.
+Каждый способ выполняется в отдельном процессе, память - прирост пикового
+RSS процесса (ru_maxrss) за время загрузки. Заменитель КПО Кобра тоже
+работает в отдельном процессе: дочерний процесс Linux наследует пиковый
+RSS родителя. Замер на 100000 заявок (ответ 49 МБ): пиковая память +329 МБ
+и +124 МБ, загрузка 2,6 с и 2,8 с.
+
+Запуск: python -m benchmark.json_stream [число заявок ...]
+"""
+
+# Standard Library
+import asyncio
+import resource
+import subprocess
+import sys
+import time
+
+from app.service.cobra import CobraTable, CobraTaskReport
+from app.service.config import CobraConfig
+from app.service.db import Task, TaskSet
+from app.service.query import CobraQuery
+from benchmark.cobra_stub import CobraStub, make_rows, template_file, token
+
+modes = ("full", "stream")
+""" Способы разбора ответа """
+
+
+async def load(report: CobraTaskReport, mode: str) -> TaskSet:
+    """Загружает заявки выбранным способом."""
+    query = CobraQuery(report.table_name)
+    if mode == "full":
+        rows = await report._select(query)
+        return TaskSet(Task.from_row(row) for row in rows)
+    return await report._load_tasks(query)
+
+
+async def run(port: int, mode: str) -> None:
+    """Выполняет загрузку в дочернем процессе и выводит результат."""
+    config = CobraConfig(template_file)
+    config.config.set("Cobra", "host", "http://127.0.0.1")
+    config.config.set("Cobra", "port", str(port))
+    config.config.set("Cobra", "token", token)
+    report = CobraTaskReport(config)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started_at = time.perf_counter()
+    tasks = await load(report, mode)
+    elapsed = time.perf_counter() - started_at
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    await CobraTable.close_session()
+    size = report.session.stats.max_response_bytes
+    print(len(tasks), size, (peak - before) / 1024, elapsed)
+
+
+async def serve(count: int) -> None:
+    """Запускает заменитель КПО Кобра и выводит его порт."""
+    stub = CobraStub(make_rows(count))
+    config = await stub.start()
+    print(config.get_port(), flush=True)
+    await asyncio.Event().wait()
+
+
+async def start_process(*args: str) -> asyncio.subprocess.Process:
+    """Запускает этот модуль в дочернем процессе."""
+    return await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "benchmark.json_stream",
+        *args,
+        stdout=subprocess.PIPE,
+    )
+
+
+async def measure(port: str, mode: str) -> tuple:
+    """Возвращает число заявок, ответ и прирост пикового RSS в МБ, время."""
+    process = await start_process("--run", port, mode)
+    stdout, _ = await process.communicate()
+    found, size, memory, elapsed = stdout.split()
+    return int(found), int(size) / 2**20, float(memory), float(elapsed)
+
+
+async def main(counts: list) -> None:
+    """Выполняет замер."""
+    for count in counts:
+        server = await start_process("--serve", str(count))
+        port = (await server.stdout.readline()).decode()  # type: ignore
+        print(f"Заявок: {count}")
+        try:
+            for mode in modes:
+                found, size, memory, elapsed = await measure(port, mode)
+                print(
+                    f"{mode:<6} ответ {size:5.1f} МБ, "
+                    f"пиковая память +{memory:6.1f} МБ, "
+                    f"загрузка {elapsed:6.3f} с ({found} заявок)"
+                )
+        finally:
+            server.terminate()
+            await server.wait()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        asyncio.run(run(int(sys.argv[2]), sys.argv[3]))
+    elif sys.argv[1:2] == ["--serve"]:
+        asyncio.run(serve(int(sys.argv[2])))
+    else:
+        asyncio.run(main([int(arg) for arg in sys.argv[1:]] or [100000]))
@@ -0,0 +1,64 @@
+"""Объем ответов КПО Кобра до и после переноса условий в фильтр запроса.
+
+До: заявки *** запрашиваются со всеми полями, остальные условия
+проверяются приложением. После: запросы CobraTaskReport с отбором полей и
+условием по технику в фильтре (снимок заявок отключен). Фильтр КПО Кобра
+сравнивает начало значения, поэтому по условию "Техник 6" передаются и
+заявки техников 60-69, которые затем отбрасываются приложением.
+
+Запуск: python -m benchmark.query_payload [число заявок]
+"""
+
+# Standard Library
+import asyncio
+import sys
+
+from app.service.cobra import CobraTable, CobraTaskReport
+from app.service.query import CobraQuery
+from benchmark.cobra_stub import CobraStub, make_rows
+
+
+async def measure(stub: CobraStub, request) -> tuple:
+    """Возвращает число строк результата и байты ответа КПО Кобра."""
+    stub.reset()
+    result = await request()
+    return len(result), stub.sent_bytes
+
+
+async def main(count: int) -> None:
+    """Выполняет замер."""
+    stub = CobraStub(make_rows(count))
+    config = await stub.start()
+    config.config.set("Cobra", "cache_ttl", "0")
+    report = CobraTaskReport(config)
+    tehn = "Техник 6"
+    full_query = CobraQuery(report.table_name).startswith("zay", "***")
+    try:
+        cases = [
+            (
+                "get_tasks",
+                lambda: report._select(full_query),
+                report.get_tasks,
+            ),
+            (
+                "get_my_tasks",
+                lambda: report._select(full_query),
+                lambda: report.get_my_tasks(tehn),
+            ),
+        ]
+        print(f"Заявок: {count}")
+        for name, before, after in cases:
+            rows, before_bytes = await measure(stub, before)
+            found, after_bytes = await measure(stub, after)
+            print(
+                f"{name:<14} до: {before_bytes:>12,} байт ({rows} строк), "
+                f"после: {after_bytes:>12,} байт ({found} заявок), "
+                f"x{before_bytes / after_bytes:.1f}"
+            )
+    finally:
+        await CobraTable.close_session()
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
@@ -0,0 +1,117 @@
+"""Память и время обработки заявок: строки JSON и объекты Task.
+
+До: строки ответа КПО Кобра хранятся словарями, назначенное время
+разбирается strptime при каждом отборе, заявки сортируются и группируются
+по технику при каждом обращении. После: строки один раз преобразуются в
+Task, даты разбираются при создании, отборы выполняются по индексам
+TaskSet. Память - размер хранимых заявок по tracemalloc после разбора
+тела ответа. Время - разбор и десять обращений: общий отчет и списки
+заявок девяти техников.
+
+Запуск: python -m benchmark.task_model [число заявок ...]
+"""
+
+# Standard Library
+import gc
+import itertools
+import json
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime
+
+from app.service.db import Task, TaskSet, parse_cobra_datetime
+from benchmark.cobra_stub import make_rows
+
+report_date = date(2026, 10, 15)
+""" Дата общего отчета """
+
+tehns = [f"Техник {i}" for i in range(1, 10)]
+""" Техники, списки заявок которых запрашиваются """
+
+
+def load_rows(body: bytes) -> list:
+    """Возвращает строки ответа, хранимые словарями."""
+    return json.loads(body)["result"]
+
+
+def load_tasks(body: bytes) -> TaskSet:
+    """Возвращает заявки, созданные из строк ответа."""
+    return TaskSet(Task.from_row(row) for row in json.loads(body)["result"])
+
+
+def use_rows(rows: list) -> int:
+    """Формирует общий отчет и списки заявок техников по словарям."""
+    found = 0
+    current = [
+        row
+        for row in rows
+        if int(row["sttech"]) != 3
+        and datetime.strptime(row["timev"], "%d.%m.%Y %H:%M:%S").date()
+        <= report_date
+    ]
+    current.sort(key=lambda row: row["tehn"])
+    for _, tehn_rows in itertools.groupby(current, lambda row: row["tehn"]):
+        found += len(list(tehn_rows))
+    for tehn in tehns:
+        found += sum(
+            1
+            for row in rows
+            if row["tehn"] == tehn and int(row["sttech"]) != 3
+        )
+    return found
+
+
+def use_tasks(tasks: TaskSet) -> int:
+    """Формирует общий отчет и списки заявок техников по TaskSet."""
+    found = 0
+    current = TaskSet(
+        task for task in tasks.get_until(report_date) if task.sttech != 3
+    )
+    for _, tehn_tasks in current.group_by_tehn():
+        found += len(tehn_tasks)
+    for tehn in tehns:
+        found += sum(
+            1 for task in tasks.get_by_tehn(tehn) if task.sttech != 3
+        )
+    return found
+
+
+def measure(body: bytes, load, use) -> tuple:
+    """Возвращает объем хранимых данных в МБ, время разбора и обращений."""
+    gc.collect()
+    tracemalloc.start()
+    data = load(body)
+    size = tracemalloc.get_traced_memory()[0] / 2**20
+    tracemalloc.stop()
+    del data
+    started_at = time.perf_counter()
+    data = load(body)
+    loaded_at = time.perf_counter()
+    found = use(data)
+    used_at = time.perf_counter()
+    return size, loaded_at - started_at, used_at - loaded_at, found
+
+
+def main(counts: list) -> None:
+    """Выполняет замер."""
+    for count in counts:
+        body = json.dumps(
+            {"result": make_rows(count)}, ensure_ascii=False
+        ).encode()
+        print(f"Заявок: {count}, тело ответа {len(body) / 2**20:.1f} МБ")
+        for name, load, use in (
+            ("dict", load_rows, use_rows),
+            ("Task", load_tasks, use_tasks),
+        ):
+            parse_cobra_datetime.cache_clear()
+            size, load_time, use_time, found = measure(body, load, use)
+            print(
+                f"{name:<5} память {size:7.1f} МБ, "
+                f"разбор {load_time:6.3f} с, "
+                f"обращения {use_time:6.3f} с ({found} заявок)"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
@@ -0,0 +1,118 @@
+"""Время поиска заявок по полнотекстовому индексу.
+
+Индекс строится по синтетическим заявкам во временной БД. Замеряются
+первичное построение индекса, сверка снимка с изменением части заявок и
+время ответа на запросы разной избирательности. Запрос выполняется по
+индексу в его текущем состоянии, как обработчик режима inline.
+
+Запуск: python -m benchmark.task_search [число заявок]
+"""
+
+# Standard Library
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import replace
+
+from yoyo import get_backend, read_migrations
+
+from app.service.config import TelegramConfig
+from app.service.db import ConnectionPool, Task, TaskSearchIndex, TaskSet
+from app.service.search import TaskSearch
+from benchmark.cobra_stub import make_rows
+
+queries = (
+    "1234",
+    "Продукты №5",
+    "Ленина 12",
+    "нет связи прибор 99",
+    "проверить прибор",
+    "отсутствует",
+)
+""" Поисковые запросы: от редких совпадений до совпадения всех заявок """
+
+repeats = 200
+""" Число повторов каждого запроса """
+
+
+class Snapshot:
+    """Снимок заявок с номером версии."""
+
+    version = 0
+    """ Номер версии снимка """
+
+
+class Report:
+    """Источник текущих заявок для поиска."""
+
+    def __init__(self, tasks: TaskSet) -> None:  # noqa D107
+        self.snapshot = Snapshot()
+        self.tasks = tasks
+
+    async def get_unfinished_tasks(self) -> TaskSet:
+        """Возвращает текущие заявки."""
+        return self.tasks
+
+
+async def measure(search: TaskSearch, text: str) -> tuple:
+    """Возвращает число результатов, медиану и 95-й процентиль, в мс."""
+    timings = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        found = await search.search(text, 20)
+        timings.append((time.perf_counter() - started_at) * 1000)
+    percentile = statistics.quantiles(timings, n=20)[-1]
+    return len(found), statistics.median(timings), percentile
+
+
+async def main(count: int) -> None:
+    """Выполняет замер."""
+    tasks = TaskSet(Task.from_row(row) for row in make_rows(count))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "db.sqlite3")
+        backend = get_backend(f"sqlite:///{db_file}")
+        with backend.lock():
+            backend.apply_migrations(
+                backend.to_apply(read_migrations("migration"))
+            )
+        backend.connection.close()
+        report = Report(tasks)
+        search = TaskSearch(
+            report,  # type: ignore
+            TaskSearchIndex(db_file),
+            TelegramConfig(os.devnull),
+        )
+        try:
+            print(f"Заявок: {count}")
+            started_at = time.perf_counter()
+            await search.update()
+            elapsed = time.perf_counter() - started_at
+            print(f"Построение индекса: {elapsed:.2f} с")
+
+            changed = list(tasks)
+            for i in range(0, count, 100):
+                zay = f"{changed[i].zay} ремонт"
+                changed[i] = replace(changed[i], zay=zay)
+            report.tasks = TaskSet(changed)
+            started_at = time.perf_counter()
+            await search.update()
+            print(
+                f"Сверка с изменением {search.stats.updated - count} заявок: "
+                f"{time.perf_counter() - started_at:.2f} с"
+            )
+
+            for text in queries:
+                found, median, percentile = await measure(search, text)
+                print(
+                    f"{text:<22} найдено {found:>2}, "
+                    f"медиана {median:6.2f} мс, 95% {percentile:6.2f} мс"
+                )
+        finally:
+            await ConnectionPool.close_all()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
@@ -0,0 +1,84 @@
+"""Время поиска зарегистрированных пользователей: БД и кэш.
+
+До: каждая проверка пользователя - запрос к таблице user через пул
+соединений SQLite, рассылка личных уведомлений ищет пользователя каждого
+техника отдельным запросом. После: поиск по словарям UserCache, техники
+рассылки разрешаются одним обращением get_users_by_tehns.
+
+Запуск: python -m benchmark.user_cache [число пользователей]
+"""
+
+# Standard Library
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from yoyo import get_backend, read_migrations
+
+from app.service.cache import UserCache
+from app.service.config import TelegramConfig
+from app.service.db import ConnectionPool, OneUser, User
+
+repeats = 2000
+""" Число повторов поиска одного пользователя """
+
+
+async def measure(lookup, repeat: int = repeats) -> float:
+    """Возвращает медиану времени вызова lookup, в мкс."""
+    timings = []
+    for i in range(repeat):
+        started_at = time.perf_counter()
+        await lookup(i)
+        timings.append((time.perf_counter() - started_at) * 10**6)
+    return statistics.median(timings)
+
+
+async def main(count: int) -> None:
+    """Выполняет замер."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, "db.sqlite3")
+        backend = get_backend(f"sqlite:///{db_file}")
+        with backend.lock():
+            backend.apply_migrations(
+                backend.to_apply(read_migrations("migration"))
+            )
+        backend.connection.close()
+        users = User(db_file)
+        cache = UserCache(users, TelegramConfig(os.devnull))
+        tehns = [f"Техник {i}" for i in range(count)]
+        try:
+            for i, tehn in enumerate(tehns):
+                await users.add_user(OneUser(i, "Иван", None, None, 1, tehn))
+            await cache.load()
+            print(f"Пользователей: {count}")
+            for name, source in (("User", users), ("UserCache", cache)):
+                by_chat_id = await measure(
+                    lambda i: source.get_user(i % count)
+                )
+                by_tehn = await measure(
+                    lambda i: source.get_user_by_tehn(tehns[i % count])
+                )
+                print(
+                    f"{name:<10} get_user {by_chat_id:7.1f} мкс, "
+                    f"get_user_by_tehn {by_tehn:7.1f} мкс"
+                )
+
+            async def resolve_each(i: int) -> None:
+                for tehn in tehns:
+                    await users.get_user_by_tehn(tehn)
+
+            each = await measure(resolve_each, 20)
+            bulk = await measure(lambda i: cache.get_users_by_tehns(tehns))
+            print(
+                f"Техники рассылки: по одному {each / 1000:.2f} мс, "
+                f"get_users_by_tehns {bulk / 1000:.2f} мс"
+            )
+        finally:
+            await ConnectionPool.close_all()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
@@ -10,10 +10,31 @@ from aiogram import executor  # noqa
 from aiogram.types import BotCommand  # noqa
 
 from app.bot_global import bot as bot_app  # noqa
+from app.bot_global import broadcaster  # noqa
+from app.bot_global import cobra_config  # noqa
+from app.bot_global import cobra_tasks  # noqa
 from app.bot_global import dp  # noqa
+from app.bot_global import outbox  # noqa
+from app.bot_global import report_messages  # noqa
+from app.bot_global import task_search  # noqa
+from app.bot_global import tg_config  # noqa
+from app.bot_global import user  # noqa
 from app.handlers.common import register_handlers_common  # noqa
 from app.handlers.event import register_handlers_event  # noqa
 from app.handlers.signup import register_handlers_signup  # noqa
+from app.service.broadcast import OutboxWorker  # noqa
+from app.service.cobra import CobraTable  # noqa
+from app.service.config import TelegramConfig  # noqa
+from app.service.db import ConnectionPool  # noqa
+from app.service.sync import CobraTaskSync  # noqa
+from app.service.webhook import WebhookServer  # noqa
+
+task_sync = None
+if cobra_tasks.mirror is not None:
+    task_sync = CobraTaskSync(cobra_tasks, cobra_tasks.mirror, cobra_config)
+outbox_worker = OutboxWorker(
+    outbox, broadcaster, tg_config, report_messages
+)
 
 
 async def set_commands(bot: Bot) -> None:
@@ -36,13 +57,23 @@ async def shutdown(dispatcher: Dispatcher) -> None:
     """
     Действие при завершении.
 
-    Сохраняет состояние диалога при завершении работы приложения
+    Сохраняет состояние диалога при завершении работы приложения.
+    Останавливает доставку очереди исходящих сообщений.
+    Останавливает обновление индекса поиска заявок.
+    Закрывает соединения с КПО Кобра
+    Закрывает соединения с БД
 
     Args:
         dispatcher (Dispatcher): диспетчер обновлений
     """
+    if task_sync is not None:
+        await task_sync.stop()
+    await outbox_worker.stop()
+    await task_search.stop()
     await dispatcher.storage.close()
     await dispatcher.storage.wait_closed()
+    await CobraTable.close_session()
+    await ConnectionPool.close_all()
 
 
 async def startup(dispatcher: Dispatcher) -> None:
@@ -51,7 +82,12 @@ async def startup(dispatcher: Dispatcher) -> None:
     Действие перед запуском.
 
     Регистрация обработчиков событий.
-    Установка команд бота
+    Установка команд бота.
+    Загрузка зарегистрированных пользователей в кэш
+    Установка webhook в режиме webhook или его удаление в режиме polling
+    Запуск синхронизации локальной копии заявок (при включенной копии)
+    Запуск доставки очереди исходящих сообщений
+    Запуск обновления индекса поиска заявок
 
     Args:
         dispatcher (Dispatcher): диспетчер обновлений
@@ -60,7 +96,33 @@ async def startup(dispatcher: Dispatcher) -> None:
     register_handlers_signup(dispatcher)
     register_handlers_event(dispatcher)
     await set_commands(bot_app)
+    await user.load()
+    if tg_config.get_mode() == TelegramConfig.webhook_mode:
+        await bot_app.set_webhook(
+            tg_config.get_webhook_url(),
+            secret_token=tg_config.get_webhook_secret(),
+        )
+    else:
+        await bot_app.delete_webhook()
+    if task_sync is not None:
+        task_sync.start()
+    outbox_worker.start()
+    task_search.start()
 
 
 if __name__ == "__main__":
-    executor.start_polling(dp, on_shutdown=shutdown, on_startup=startup)
+    if tg_config.get_mode() == TelegramConfig.webhook_mode:
+        webhook_executor = executor.set_webhook(
+            dp,
+            webhook_path=tg_config.get_webhook_path(),
+            on_startup=startup,
+            on_shutdown=shutdown,
+            web_app=WebhookServer(tg_config).get_app(),
+        )
+        webhook_executor.run_app(
+            host=tg_config.get_webhook_host(),
+            port=tg_config.get_webhook_port(),
+            shutdown_timeout=tg_config.get_drain_timeout(),
+        )
+    else:
+        executor.start_polling(dp, on_shutdown=shutdown, on_startup=startup)
@@ -0,0 +1,35 @@
+"""Create task mirror table if not exist."""
+
+from yoyo import step
+
+__depends__ = {"20240325_01_KDxwZ-create-user-table-if-not-exist"}
+
+steps = [
+    step(
+        'CREATE TABLE IF NOT EXISTS "task" \
+            ("n_abs" INTEGER NOT NULL, "tehn" VARCHAR(255), \
+            "timev" VARCHAR(19), "timev_date" VARCHAR(10), \
+            "sttech" INTEGER, "digest" VARCHAR(32) NOT NULL, \
+            "data" TEXT NOT NULL, PRIMARY KEY("n_abs"));',
+        'DROP TABLE "task"',
+    ),
+    step(
+        'CREATE INDEX IF NOT EXISTS "task_tehn" ON "task" ("tehn");',
+        'DROP INDEX "task_tehn"',
+    ),
+    step(
+        'CREATE INDEX IF NOT EXISTS "task_timev_date" ON "task" \
+            ("timev_date");',
+        'DROP INDEX "task_timev_date"',
+    ),
+    step(
+        'CREATE INDEX IF NOT EXISTS "task_sttech" ON "task" ("sttech");',
+        'DROP INDEX "task_sttech"',
+    ),
+    step(
+        'CREATE TABLE IF NOT EXISTS "task_sync" \
+            ("name" VARCHAR(64) NOT NULL, "value" VARCHAR(255), \
+            PRIMARY KEY("name"));',
+        'DROP TABLE "task_sync"',
+    ),
+]
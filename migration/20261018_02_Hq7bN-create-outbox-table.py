@@ -0,0 +1,24 @@
+"""Create outbox table if not exist."""
+
+from yoyo import step
+
+__depends__ = {"20261018_01_mRt4q-create-task-mirror-table"}
+
+steps = [
+    step(
+        'CREATE TABLE IF NOT EXISTS "outbox" \
+            ("id" INTEGER NOT NULL, "dedup_key" VARCHAR(255) NOT NULL, \
+            "chat_id" INTEGER NOT NULL, "method" VARCHAR(32) NOT NULL, \
+            "payload" TEXT NOT NULL, "status" VARCHAR(16) NOT NULL, \
+            "attempts" INTEGER NOT NULL DEFAULT 0, \
+            "next_attempt_at" REAL NOT NULL, "last_error" TEXT, \
+            "created_at" REAL NOT NULL, "sent_at" REAL, \
+            PRIMARY KEY("id" AUTOINCREMENT), UNIQUE("dedup_key"));',
+        'DROP TABLE "outbox"',
+    ),
+    step(
+        'CREATE INDEX IF NOT EXISTS "outbox_due" ON "outbox" \
+            ("status", "next_attempt_at");',
+        'DROP INDEX "outbox_due"',
+    ),
+]
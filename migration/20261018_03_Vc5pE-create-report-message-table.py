@@ -0,0 +1,16 @@
+"""Create report message table if not exist."""
+
+from yoyo import step
+
+__depends__ = {"20261018_02_Hq7bN-create-outbox-table"}
+
+steps = [
+    step(
+        'CREATE TABLE IF NOT EXISTS "report_message" \
+            ("chat_id" INTEGER NOT NULL, "part" VARCHAR(16) NOT NULL, \
+            "message_id" INTEGER NOT NULL, "digest" VARCHAR(32) NOT NULL, \
+            "report_date" VARCHAR(10) NOT NULL, \
+            PRIMARY KEY("chat_id", "part"));',
+        'DROP TABLE "report_message"',
+    ),
+]
@@ -0,0 +1,14 @@
+"""Create callback token table if not exist."""
+
+from yoyo import step
+
+__depends__ = {"20261018_03_Vc5pE-create-report-message-table"}
+
+steps = [
+    step(
+        'CREATE TABLE IF NOT EXISTS "callback_token" \
+            ("token" VARCHAR(16) NOT NULL, "value" TEXT NOT NULL, \
+            PRIMARY KEY("token"));',
+        'DROP TABLE "callback_token"',
+    ),
+]
@@ -0,0 +1,15 @@
+"""Create task full-text search table if not exist."""
+
+from yoyo import step
+
+__depends__ = {"20261018_04_Tk8wN-create-callback-token-table"}
+
+steps = [
+    step(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS \"task_search\" USING fts5 \
+            (\"numobj\", \"nameobj\", \"addrobj\", \"zay\", \
+            \"digest\" UNINDEXED, \
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3');",
+        'DROP TABLE "task_search"',
+    ),
+]
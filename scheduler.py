@@ -11,7 +11,11 @@ import asyncio
 import aiocron
 
 from app.bot_global import tg_config
-from tasks_notify import send_all_tasks, send_personal_tasks
+from tasks_notify import (
+    get_schedule_run_id,
+    send_all_tasks,
+    send_personal_tasks,
+)
 
 
 async def main() -> None:
@@ -27,7 +31,11 @@ async def main() -> None:
     aiocron.crontab(
         f"{task_full_report_min} {task_full_report_hour} * * *",
         func=send_all_tasks,
-        args=(),
+        args=(
+            get_schedule_run_id(
+                f"{task_full_report_hour}:{task_full_report_min}"
+            ),
+        ),
         start=True,
     )
 
@@ -37,7 +45,11 @@ async def main() -> None:
     aiocron.crontab(
         f"{task_personal_report_min} {task_personal_report_hour} * * *",
         func=send_personal_tasks,
-        args=(),
+        args=(
+            get_schedule_run_id(
+                f"{task_personal_report_hour}:{task_personal_report_min}"
+            ),
+        ),
         start=True,
     )
 
@@ -51,7 +63,7 @@ async def main() -> None:
         aiocron.crontab(
             f"{personal_time_min} {personal_time_hour} * * *",
             func=send_personal_tasks,
-            args=(False,),
+            args=(get_schedule_run_id(notification_time), False),
             start=True,
         )
 
@@ -6,119 +6,255 @@
 
 # Standard Library
 import asyncio
-from itertools import groupby
+import time
+from datetime import date, datetime
 
 from aiogram import types
 
-from app.bot_global import bot, cobra_config, db_file, tg_config
-from app.service.cobra import CobraTaskReport, CobraTaskReportMessage
-from app.service.db import User
+from app.bot_global import (
+    callback_codec,
+    cobra_config,
+    outbox,
+    tg_config,
+    user,
+)
+from app.service.broadcast import OutboxWorker
+from app.service.callback import CallbackAction
+from app.service.cobra import (
+    CobraTable,
+    CobraTaskReport,
+    CobraTaskReportMessage,
+    CobraTaskReportPacker,
+)
+from app.service.db import ReportMessages
 from app.service.report import CobraTaskExcelReport
 
 
-async def send_all_tasks():
+async def send_all_tasks(run_id: str):
     """
     Формирование общей статистики по аварийным заявкам .
 
     Запрашивает статистику заявок по аварийным объектам не старше
     текущей даты из КПО Кобра. Сортирует по исполнителю.
-    Отправляет в общую группу
+    Добавляет сообщения для общей группы в очередь исходящих сообщений.
+    Если включено обновление отчета редактированием, сообщения добавляются
+    методом live_report с контрольными суммами частей отчета
+
+    Args:
+        run_id (str): идентификатор запуска рассылки за текущий день
     """
     cobra_base = CobraTaskReport(cobra_config)
-    task_objects = cobra_base.get_tasks()
+    task_objects = await cobra_base.get_tasks()
+    chats = tg_config.get_task_full_report_chat_ids()
+    run_key = get_run_key("full", run_id)
+    live_report = tg_config.get_live_report()
     if task_objects:
         task_report = CobraTaskExcelReport()
         task_report.set_header()
-        tehn_count = 0
-        report_message = CobraTaskReportMessage()
-        report_message.add_report_header()
-        for tehn, one_tehn_tasks in groupby(
-            task_objects, lambda task_list: task_list["tehn"]
-        ):
-            tehn_count += 1
-            report_message.add_tehn_to_report_message(tehn)
+        packer = CobraTaskReportPacker()
+        for tehn, one_tehn_tasks in task_objects.group_by_tehn():
             for task in one_tehn_tasks:
                 task_report.set_row(task)
-                report_message.add_task_to_report_message(task)
-                report_message.add_empty_string_to_report_message()
-
-            if tehn_count == 3:
-                report_message.add_generation_datetime()
-                for chat in tg_config.get_task_full_report_chat_ids():
-                    report_msg = report_message.get_report_message_text()
-                    await bot.send_message(chat, report_msg, parse_mode="html")
-                report_message = CobraTaskReportMessage()
-                report_message.add_report_header()
-                tehn_count = 0
-
-        report_message.add_generation_datetime()
+            packer.add_tehn_tasks(tehn, one_tehn_tasks)
 
         task_report.set_footer()
         task_report.save()
 
-        for chat in tg_config.get_task_full_report_chat_ids():
-            if tehn_count > 0:
-                report_msg = report_message.get_report_message_text()
-                await bot.send_message(chat, report_msg, parse_mode="html")
-            document = open(task_report.export_filename, "rb")
-            await bot.send_document(chat, document)
+        messages = packer.get_messages()
+        digests = packer.get_digests()
+        parts = [str(part) for part in range(1, len(messages) + 1)]
+        parts.append("document")
+        for part, report_msg, digest in zip(parts, messages, digests):
+            live_part = get_live_part(part, parts, digest)
+            for chat in chats:
+                await enqueue_report_part(
+                    f"{run_key}:{chat}:{part}",
+                    chat,
+                    "send_message",
+                    {"text": report_msg, "parse_mode": "html"},
+                    live_part if live_report else None,
+                )
+        document_digest = ReportMessages.get_digest(str(digests))
+        for chat in chats:
+            await enqueue_report_part(
+                f"{run_key}:{chat}:document",
+                chat,
+                "send_document",
+                {"document": str(task_report.export_filename)},
+                get_live_part("document", parts, document_digest)
+                if live_report
+                else None,
+            )
     else:
-        for chat in tg_config.get_task_full_report_chat_ids():
-            await bot.send_message(
-                chat, "Заявки на текущую дату отсутствуют", parse_mode="html"
+        text = "Заявки на текущую дату отсутствуют"
+        digest = ReportMessages.get_digest(text)
+        for chat in chats:
+            await enqueue_report_part(
+                f"{run_key}:{chat}",
+                chat,
+                "send_message",
+                {"text": text, "parse_mode": "html"},
+                get_live_part("1", ["1"], digest) if live_report else None,
             )
 
 
-async def send_personal_tasks(is_acceptance=True):
+async def send_personal_tasks(run_id: str, is_acceptance=True):
     """
     Отправляет персональные уведомления.
 
     Выбирает заявки каждого техника, с датой исполнения не превосходящей
     текущую дату. В случае, если техник прошел процедуру регистрации -
-    отправляет персональное уведомление
+    добавляет персональное уведомление в очередь исходящих сообщений
+
+    Args:
+        run_id (str): идентификатор запуска рассылки за текущий день
+        is_acceptance (bool): добавить кнопку подтверждения ознакомления
     """
-    user = User(db_file)
     cobra_base = CobraTaskReport(cobra_config)
-    task_objects = cobra_base.get_tasks()
+    task_objects = await cobra_base.get_tasks()
+    kind = "personal" if is_acceptance else "reminder"
+    run_key = get_run_key(kind, run_id)
     if task_objects:
-        for tehn, one_tehn_tasks in groupby(
-            task_objects, lambda task_list: task_list["tehn"]
-        ):
-            current_user = user.get_user_by_tehn(tehn)
+        tehn_tasks = list(task_objects.group_by_tehn())
+        users = await user.get_users_by_tehns(tehn for tehn, _ in tehn_tasks)
+        for tehn, one_tehn_tasks in tehn_tasks:
+            current_user = users.get(tehn)
             if current_user:
                 report_message_personal = CobraTaskReportMessage()
                 report_message_personal.add_tehn_to_report_message(tehn)
                 tasks_for_accept = []
                 for task in one_tehn_tasks:
-                    tasks_for_accept.append(task["n_abs"])
+                    tasks_for_accept.append(task.n_abs)
                     report_message_personal.add_task_to_report_message(task)
                 report_message_personal.add_empty_string_to_report_message()
 
+                payload = {
+                    "text": report_message_personal.get_report_message_text(),
+                    "parse_mode": "html",
+                }
                 if is_acceptance:
                     kb = [
                         [
                             types.InlineKeyboardButton(
                                 text="Ознакомлен",
-                                callback_data=f"accept_action|{task['tehn']}",
+                                callback_data=await callback_codec.encode(
+                                    CallbackAction.accept, task.tehn
+                                ),
                             ),  # type: ignore
                         ],
                     ]
                     accept_kb = types.InlineKeyboardMarkup(inline_keyboard=kb)
-                    await bot.send_message(
-                        current_user.chat_id,
-                        report_message_personal.get_report_message_text(),
-                        parse_mode="html",
-                        reply_markup=accept_kb,
-                    )
-                else:
-                    await bot.send_message(
-                        current_user.chat_id,
-                        report_message_personal.get_report_message_text(),
-                        parse_mode="html",
-                    )
+                    payload["reply_markup"] = accept_kb.to_python()
+                await outbox.enqueue(
+                    f"{run_key}:{current_user.chat_id}",
+                    current_user.chat_id,
+                    "send_message",
+                    payload,
+                )
+
+
+async def enqueue_report_part(
+    dedup_key: str,
+    chat: str,
+    method: str,
+    payload: dict,
+    live_part: dict | None,
+) -> None:
+    """
+    Добавляет часть общего отчета в очередь исходящих сообщений.
+
+    Args:
+        dedup_key (str): ключ сообщения в очереди
+        chat (str): ID чата Telegram
+        method (str): метод отправки сообщения
+        payload (dict): параметры метода отправки
+        live_part (dict|None): параметры обновления части отчета
+        редактированием или None, если отчет отправляется заново
+    """
+    if live_part is not None:
+        method = OutboxWorker.live_report_method
+        payload = {**payload, **live_part}
+    await outbox.enqueue(dedup_key, chat, method, payload)
+
+
+def get_live_part(part: str, parts: list, digest: str) -> dict:
+    """
+    Возвращает параметры обновления части отчета редактированием.
+
+    Args:
+        part (str): имя части отчета
+        parts (list): имена всех частей отчета в порядке отправки
+        digest (str): контрольная сумма части отчета
+
+    Returns:
+        dict: параметры части отчета
+    """
+    return {
+        "part": part,
+        "parts": parts,
+        "date": date.today().isoformat(),
+        "digest": digest,
+    }
+
+
+def get_run_key(kind: str, run_id: str) -> str:
+    """
+    Возвращает префикс ключей сообщений одного запуска рассылки.
+
+    Запуск по расписанию идентифицируется временем расписания, поэтому
+    повторный запуск того же задания за день, например вторым экземпляром
+    планировщика, не добавляет сообщения в очередь повторно. Запуск командой
+    идентифицируется сообщением с командой и всегда добавляет сообщения.
+
+    Args:
+        kind (str): вид рассылки
+        run_id (str): идентификатор запуска за текущий день
+
+    Returns:
+        str: префикс ключей сообщений
+    """
+    return f"{kind}:{date.today():%Y%m%d}:{run_id}"
+
+
+def get_schedule_run_id(schedule_time: str) -> str:
+    """
+    Возвращает идентификатор запуска рассылки по расписанию.
+
+    Args:
+        schedule_time (str): время расписания в формате ЧЧ:ММ
+
+    Returns:
+        str: идентификатор запуска
+    """
+    return f"schedule{schedule_time}"
+
+
+def get_command_run_id(message: types.Message) -> str:
+    """
+    Возвращает идентификатор запуска рассылки командой.
+
+    Args:
+        message (types.Message): сообщение с командой
+
+    Returns:
+        str: идентификатор запуска
+    """
+    return f"command{message.chat.id}:{message.message_id}"
+
+
+def get_manual_run_id() -> str:
+    """
+    Возвращает идентификатор запуска рассылки скриптом вручную.
+
+    Returns:
+        str: идентификатор запуска, уникальный для каждого запуска
+    """
+    return f"manual{time.time_ns()}"
 
 
 if __name__ == "__main__":
     loop = asyncio.get_event_loop()
-    loop.run_until_complete(send_all_tasks())
-    loop.run_until_complete(send_personal_tasks())
+    script_run_id = get_schedule_run_id(f"{datetime.now():%H:%M}")
+    loop.run_until_complete(send_all_tasks(script_run_id))
+    loop.run_until_complete(send_personal_tasks(script_run_id))
+    loop.run_until_complete(CobraTable.close_session())
@@ -9,8 +9,10 @@
 # Standard Library
 import asyncio
 
-from tasks_notify import send_personal_tasks
+from app.service.cobra import CobraTable
+from tasks_notify import get_manual_run_id, send_personal_tasks
 
 if __name__ == "__main__":
     loop = asyncio.get_event_loop()
-    loop.run_until_complete(send_personal_tasks(False))
+    loop.run_until_complete(send_personal_tasks(get_manual_run_id(), False))
+    loop.run_until_complete(CobraTable.close_session())
@@ -0,0 +1,36 @@
+"""Временная БД приложения для тестов."""
+
+# Standard Library
+import os
+import tempfile
+import unittest
+
+from yoyo import get_backend, read_migrations
+
+from app.service.db import ConnectionPool
+
+migrations_dir = "migration"
+""" Каталог миграций БД """
+
+
+class DatabaseTestCase(unittest.IsolatedAsyncioTestCase):
+    """Тест с БД во временном каталоге, к которой применены миграции."""
+
+    def setUp(self) -> None:
+        """Создает БД и применяет миграции."""
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self._tmp_dir.name, "db.sqlite3")
+        backend = get_backend(f"sqlite:///{self.db_file}")
+        with backend.lock():
+            backend.apply_migrations(
+                backend.to_apply(read_migrations(migrations_dir))
+            )
+        backend.connection.close()
+
+    async def asyncTearDown(self) -> None:
+        """Закрывает соединения с БД."""
+        await ConnectionPool.close_all()
+
+    def tearDown(self) -> None:
+        """Удаляет БД."""
+        self._tmp_dir.cleanup()
@@ -0,0 +1,282 @@
+"""Тесты доставки очереди исходящих сообщений."""
+
+# Standard Library
+import asyncio
+import os
+import time
+import unittest
+
+from aiogram import types
+from aiogram.utils.exceptions import RetryAfter
+
+from app.service.broadcast import Broadcaster, OutboxWorker, TokenBucket
+from app.service.config import TelegramConfig
+from app.service.db import Outbox, ReportMessages
+from test.database import DatabaseTestCase
+
+chat_id = 1001
+""" ID личного чата получателя отчета """
+
+
+class FakeBot:
+    """Бот, записывающий вызовы методов Bot API."""
+
+    def __init__(self) -> None:  # noqa D107
+        self.calls: list = []
+        self.retry_after: list = []
+        """ Задержки RetryAfter, возвращаемые при следующих отправках """
+        self._message_id = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        """Отправляет текстовое сообщение."""
+        if self.retry_after:
+            self.calls.append(("retry_after", text, None))
+            raise RetryAfter(self.retry_after.pop(0))
+        return self._reply("send_message", text)
+
+    async def send_document(self, chat_id, document, **kwargs):
+        """Отправляет документ."""
+        return self._reply("send_document", "document")
+
+    async def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        """Редактирует текст сообщения."""
+        self.calls.append(("edit_message_text", text, message_id))
+        return types.Message(message_id=message_id)
+
+    async def edit_message_media(self, media, chat_id, message_id):
+        """Заменяет документ сообщения."""
+        self.calls.append(("edit_message_media", "document", message_id))
+        return self._document(message_id)
+
+    async def delete_message(self, chat_id, message_id):
+        """Удаляет сообщение."""
+        self.calls.append(("delete_message", None, message_id))
+        return True
+
+    def _reply(self, method: str, text: str) -> types.Message:
+        self._message_id += 1
+        self.calls.append((method, text, self._message_id))
+        return self._document(self._message_id)
+
+    @staticmethod
+    def _document(message_id: int) -> types.Message:
+        return types.Message(
+            message_id=message_id, document=types.Document(file_id="file")
+        )
+
+
+def make_config(**params: str) -> TelegramConfig:
+    """Возвращает параметры бота с указанными лимитами рассылки."""
+    config = TelegramConfig(os.devnull)
+    config.config.read_dict({"Telegram": params})
+    return config
+
+
+class TokenBucketTest(unittest.IsolatedAsyncioTestCase):
+    """Ограничение частоты операций."""
+
+    async def acquire(self, bucket: TokenBucket, count: int) -> float:
+        """Расходует count токенов и возвращает затраченное время."""
+        started_at = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.monotonic() - started_at
+
+    async def test_paced_by_rate(self):
+        """Операции сверх capacity выполняются с частотой rate."""
+        elapsed = await self.acquire(TokenBucket(50), 6)
+        self.assertGreaterEqual(elapsed, 0.09)
+        self.assertLess(elapsed, 0.5)
+
+    async def test_burst_up_to_capacity(self):
+        """Операции в пределах capacity выполняются без ожидания."""
+        self.assertLess(await self.acquire(TokenBucket(1, 5), 5), 0.05)
+
+    async def test_waiters_served_in_order(self):
+        """Ожидающие операции выполняются в порядке обращения."""
+        bucket = TokenBucket(100)
+        done: list = []
+
+        async def acquire(i: int) -> None:
+            await bucket.acquire()
+            done.append(i)
+
+        await asyncio.gather(*(acquire(i) for i in range(5)))
+        self.assertEqual(done, list(range(5)))
+
+    async def test_pause(self):
+        """После pause операции ожидают указанное время."""
+        bucket = TokenBucket(1000, 10)
+        bucket.pause(0.1)
+        self.assertGreaterEqual(await self.acquire(bucket, 1), 0.09)
+
+
+class RetryAfterTest(unittest.IsolatedAsyncioTestCase):
+    """Повтор отправки после ответа RetryAfter."""
+
+    def setUp(self) -> None:
+        """Создает бота и рассылку с двумя повторами."""
+        self.bot = FakeBot()
+        self.broadcaster = Broadcaster(
+            self.bot,
+            make_config(
+                broadcast_rate="1000",
+                broadcast_chat_rate="1000",
+                broadcast_retries="2",
+            ),
+        )
+
+    async def send(self, text: str):
+        """Отправляет сообщение под блокировкой чата."""
+        async with self.broadcaster.chat_lock(chat_id):
+            return await self.broadcaster.deliver_locked(
+                chat_id, lambda: self.bot.send_message(chat_id, text)
+            )
+
+    async def test_paused_and_retried(self):
+        """Отправка в чат приостанавливается на время RetryAfter."""
+        self.bot.retry_after = [1]
+        started_at = time.monotonic()
+        message = await self.send("a")
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.9)
+        self.assertEqual(message.message_id, 1)
+        self.assertEqual(
+            self.bot.calls,
+            [("retry_after", "a", None), ("send_message", "a", 1)],
+        )
+        self.assertEqual(self.broadcaster.stats.retried, 1)
+        self.assertEqual(self.broadcaster.stats.sent, 1)
+
+    async def test_raised_after_retries(self):
+        """После broadcast_retries повторов RetryAfter передается дальше."""
+        self.bot.retry_after = [0, 0, 0, 0]
+        with self.assertRaises(RetryAfter):
+            await self.send("a")
+        self.assertEqual(len(self.bot.calls), 3)
+        self.assertEqual(self.bot.retry_after, [0])
+        self.assertEqual(self.broadcaster.stats.retried, 2)
+        self.assertEqual(self.broadcaster.stats.sent, 0)
+
+    async def test_other_chats_not_paused(self):
+        """Ответ RetryAfter приостанавливает отправку только в свой чат."""
+        self.bot.retry_after = [1]
+        delivery = asyncio.ensure_future(self.send("a"))
+        await asyncio.sleep(0.05)
+        started_at = time.monotonic()
+        await self.broadcaster.deliver(
+            chat_id + 1, lambda: self.bot.send_message(chat_id + 1, "b")
+        )
+        self.assertLess(time.monotonic() - started_at, 0.5)
+        await delivery
+        self.assertEqual([call[1] for call in self.bot.calls], ["a", "b", "a"])
+
+
+class LiveReportTest(DatabaseTestCase):
+    """Обновление общего отчета редактированием сообщений."""
+
+    def setUp(self) -> None:
+        """Создает очередь, бота и файл отчета."""
+        super().setUp()
+        config = make_config(broadcast_rate="1000", broadcast_chat_rate="1000")
+        self.bot = FakeBot()
+        self.outbox = Outbox(self.db_file)
+        self.worker = OutboxWorker(
+            self.outbox,
+            Broadcaster(self.bot, config),
+            config,
+            ReportMessages(self.db_file),
+        )
+        self.document = os.path.join(os.path.dirname(self.db_file), "a.xlsx")
+        with open(self.document, "wb") as document:
+            document.write(b"xlsx")
+        self._run = 0
+
+    async def send_report(self, texts: list) -> None:
+        """Добавляет в очередь отчет из сообщений и документа и доставляет."""
+        self._run += 1
+        parts = [str(part) for part in range(1, len(texts) + 1)]
+        parts.append("document")
+        payloads = [{"text": text} for text in texts]
+        payloads.append({"document": self.document})
+        digests = [ReportMessages.get_digest(text) for text in texts]
+        digests.append(ReportMessages.get_digest(str(digests)))
+        for part, payload, digest in zip(parts, payloads, digests):
+            live_part = {
+                "part": part,
+                "parts": parts,
+                "date": "2026-10-18",
+                "digest": digest,
+            }
+            await self.outbox.enqueue(
+                f"{self._run}:{part}",
+                chat_id,
+                OutboxWorker.live_report_method,
+                {**payload, **live_part},
+            )
+        await self.worker.drain()
+
+    async def test_parts_sent_in_queue_order(self):
+        """Части отчета отправляются в порядке очереди."""
+        await self.send_report(["a", "b"])
+        self.assertEqual(
+            self.bot.calls,
+            [
+                ("send_message", "a", 1),
+                ("send_message", "b", 2),
+                ("send_document", "document", 3),
+            ],
+        )
+
+    async def test_changed_part_edited(self):
+        """Измененная часть редактируется, неизмененные не отправляются."""
+        await self.send_report(["a", "b"])
+        self.bot.calls.clear()
+        await self.send_report(["a", "c"])
+        self.assertEqual(
+            self.bot.calls,
+            [
+                ("edit_message_text", "c", 2),
+                ("edit_message_media", "document", 3),
+            ],
+        )
+
+    async def test_appended_part_ahead_of_document(self):
+        """Документ отправляется заново после добавленной части отчета."""
+        await self.send_report(["a"])
+        self.bot.calls.clear()
+        await self.send_report(["a", "b"])
+        self.assertEqual(
+            self.bot.calls,
+            [
+                ("send_message", "b", 3),
+                ("delete_message", None, 2),
+                ("send_document", "document", 4),
+            ],
+        )
+
+    async def test_removed_part_deleted(self):
+        """Лишняя часть прежнего отчета удаляется."""
+        await self.send_report(["a", "b"])
+        self.bot.calls.clear()
+        await self.send_report(["a"])
+        self.assertEqual(
+            self.bot.calls,
+            [
+                ("edit_message_media", "document", 3),
+                ("delete_message", None, 2),
+            ],
+        )
+
+    async def test_report_waits_for_chat_messages(self):
+        """Часть отчета не опережает сообщение, отправляемое в чат."""
+        broadcaster = self.worker._broadcaster
+        async with broadcaster.chat_lock(chat_id):
+            delivery = asyncio.ensure_future(self.send_report(["a"]))
+            await asyncio.sleep(0.1)
+            self.assertEqual(self.bot.calls, [])
+        await delivery
+        self.assertEqual(self.bot.calls[0], ("send_message", "a", 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
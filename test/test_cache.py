@@ -0,0 +1,229 @@
+"""Тесты кэширования данных КПО Кобра и пользователей бота."""
+
+# Standard Library
+import asyncio
+import os
+import tempfile
+import unittest
+
+import aiohttp
+
+from app.service.cache import TaskSnapshotCache, UserCache
+from app.service.config import CobraConfig, TelegramConfig
+from app.service.db import OneUser, Task, TaskSet, User
+from test.database import DatabaseTestCase
+
+
+def make_snapshot(**params: str) -> TaskSnapshotCache:
+    """Возвращает снимок заявок с параметрами из файла конфигурации."""
+    config = CobraConfig(os.devnull)
+    config.config.read_dict(
+        {"Cobra": {"snapshot_file": "", "degraded_budget": "0.05", **params}}
+    )
+    snapshot = TaskSnapshotCache()
+    snapshot.configure(config)
+    return snapshot
+
+
+def make_loader(*results):
+    """Возвращает загрузку, возвращающую результаты по очереди.
+
+    Результат-исключение выбрасывается, результат-число задает задержку
+    загрузки пустого набора заявок.
+    """
+    queue = list(results)
+
+    async def loader() -> TaskSet:
+        result = queue.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        if isinstance(result, float):
+            await asyncio.sleep(result)
+            return TaskSet()
+        return result
+
+    return loader
+
+
+class TaskSnapshotCacheTest(unittest.IsolatedAsyncioTestCase):
+    """Снимок таблицы заявок."""
+
+    tasks = TaskSet([Task(1, tehn="Иванов"), Task(2, tehn="Петров")])
+    """ Успешно загруженные заявки """
+
+    async def test_cached_within_ttl(self):
+        """Снимок загружается один раз за время жизни."""
+        snapshot = make_snapshot(cache_ttl="60")
+        loader = make_loader(self.tasks)
+        self.assertIs(await snapshot.get(loader), self.tasks)
+        self.assertIs(await snapshot.get(loader), self.tasks)
+        self.assertEqual(snapshot.stats.refreshes, 1)
+        self.assertIsNone(snapshot.stale_age)
+
+    async def test_without_ttl_loaded_each_time(self):
+        """При нулевом времени жизни снимок загружается при обращении."""
+        snapshot = make_snapshot(cache_ttl="0")
+        other = TaskSet([Task(3)])
+        loader = make_loader(self.tasks, other)
+        self.assertIs(await snapshot.get(loader), self.tasks)
+        self.assertIs(await snapshot.get(loader), other)
+        self.assertIsNone(snapshot.stale_age)
+
+    async def test_degraded_without_ttl(self):
+        """При нулевом времени жизни ошибка загрузки не мешает ответу."""
+        snapshot = make_snapshot(cache_ttl="0")
+        loader = make_loader(self.tasks, aiohttp.ClientError(), 1.0)
+        await snapshot.get(loader)
+        self.assertIs(await snapshot.get(loader, True), self.tasks)
+        self.assertIs(await snapshot.get(loader, True), self.tasks)
+        self.assertEqual(snapshot.stats.degraded, 2)
+        self.assertIsNotNone(snapshot.stale_age)
+
+    async def test_fetch_degraded(self):
+        """Запрос в обход снимка отбирает заявки из последнего снимка."""
+        snapshot = make_snapshot(cache_ttl="0")
+        await snapshot.get(make_loader(self.tasks))
+
+        def matches(task: Task) -> bool:
+            return task.tehn == "Петров"
+
+        tasks = await snapshot.fetch(make_loader(TaskSet()), matches)
+        self.assertEqual(len(tasks), 0)
+        self.assertIsNone(snapshot.stale_age)
+        loader = make_loader(asyncio.TimeoutError())
+        tasks = await snapshot.fetch(loader, matches, allow_degraded=True)
+        self.assertEqual([task.n_abs for task in tasks], [2])
+        self.assertIsNotNone(snapshot.stale_age)
+
+    async def test_fetch_without_last_good(self):
+        """Без последнего снимка ошибка запроса передается вызывающему."""
+        snapshot = make_snapshot(cache_ttl="0")
+        with self.assertRaises(aiohttp.ClientError):
+            await snapshot.fetch(
+                make_loader(aiohttp.ClientError()), lambda task: True, True
+            )
+
+    async def test_last_good_read_from_file(self):
+        """Последний снимок читается из файла после перезапуска."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_file = os.path.join(tmp_dir, "tasks.json")
+            snapshot = make_snapshot(snapshot_file=snapshot_file)
+            await snapshot.get(make_loader(self.tasks))
+            restarted = make_snapshot(
+                cache_ttl="0", snapshot_file=snapshot_file
+            )
+            tasks = await restarted.get(
+                make_loader(aiohttp.ClientError()), allow_degraded=True
+            )
+            self.assertEqual(os.listdir(tmp_dir), ["tasks.json"])
+        self.assertEqual([task.n_abs for task in tasks], [1, 2])
+
+    async def test_live_data_awaited_by_default(self):
+        """Без разрешения устаревших данных загрузка ожидается."""
+        snapshot = make_snapshot(cache_ttl="0")
+        await snapshot.get(make_loader(self.tasks))
+        self.assertEqual(len(await snapshot.get(make_loader(0.1))), 0)
+        self.assertIsNone(snapshot.stale_age)
+        tasks = await snapshot.fetch(make_loader(0.1), lambda task: True)
+        self.assertEqual(len(tasks), 0)
+        with self.assertRaises(aiohttp.ClientError):
+            await snapshot.get(make_loader(aiohttp.ClientError()))
+        self.assertEqual(snapshot.stats.degraded, 0)
+
+    async def test_concurrent_file_writes(self):
+        """Одновременная запись снимка процессами не портит файл."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_file = os.path.join(tmp_dir, "tasks.json")
+            snapshots = [
+                make_snapshot(snapshot_file=snapshot_file) for _ in range(4)
+            ]
+            await asyncio.gather(
+                *(item.get(make_loader(self.tasks)) for item in snapshots)
+            )
+            self.assertEqual(os.listdir(tmp_dir), ["tasks.json"])
+            restarted = make_snapshot(snapshot_file=snapshot_file)
+            tasks = await restarted.get(
+                make_loader(aiohttp.ClientError()), allow_degraded=True
+            )
+        self.assertEqual([task.n_abs for task in tasks], [1, 2])
+
+
+class UserCacheTest(DatabaseTestCase):
+    """Кэш зарегистрированных пользователей с записью в БД."""
+
+    def setUp(self) -> None:
+        """Создает кэш пользователей БД."""
+        super().setUp()
+        self.users = User(self.db_file)
+        self.cache = self.make_cache("300")
+
+    def make_cache(self, ttl: str) -> UserCache:
+        """Возвращает кэш с заданным временем жизни."""
+        config = TelegramConfig(os.devnull)
+        config.config.read_dict({"Telegram": {"user_cache_ttl": ttl}})
+        return UserCache(self.users, config)
+
+    async def asyncSetUp(self) -> None:
+        """Регистрирует двух пользователей одного техника."""
+        await self.users.add_user(OneUser(1, "Иван", None, None, 1, "Иванов"))
+        await self.users.add_user(OneUser(2, "Петр", None, None, 0, "Иванов"))
+
+    async def test_lookups_without_db(self):
+        """Таблица читается один раз, поиск выполняется по кэшу."""
+        user = await self.cache.get_user(1)
+        self.assertEqual(user.first_name, "Иван")
+        self.assertTrue(await self.cache.is_user_exists(2))
+        self.assertFalse(await self.cache.is_user_exists(3))
+        self.assertEqual(self.cache.stats.refreshes, 1)
+        self.assertEqual(self.cache.stats.hits, 2)
+        self.assertEqual(self.cache.stats.misses, 1)
+
+    async def test_first_user_of_tehn(self):
+        """По имени техника возвращается первый зарегистрированный."""
+        user = await self.cache.get_user_by_tehn("Иванов")
+        self.assertEqual(user.chat_id, 1)
+        users = await self.cache.get_users_by_tehns(["Иванов", "Петров"])
+        self.assertEqual(list(users), ["Иванов"])
+        self.assertEqual(users["Иванов"].chat_id, 1)
+
+    async def test_add_user_written_through(self):
+        """Регистрация записывается в БД и видна без перечитывания."""
+        await self.cache.load()
+        user = OneUser(3, "Сидор", None, None, 0, "Сидоров")
+        await self.cache.add_user(user)
+        self.assertEqual((await self.users.get_user(3)).tehn, "Сидоров")
+        self.assertEqual((await self.cache.get_user(3)).tehn, "Сидоров")
+        self.assertIs(await self.cache.get_user_by_tehn("Сидоров"), user)
+        self.assertEqual(self.cache.stats.refreshes, 1)
+
+    async def test_change_status_written_through(self):
+        """Смена статуса записывается в БД и применяется к кэшу."""
+        await self.cache.load()
+        await self.cache.change_status(OneUser(2, "Петр", None, None, 1))
+        self.assertEqual((await self.users.get_user(2)).status, 1)
+        self.assertEqual((await self.cache.get_user(2)).status, 1)
+        self.assertEqual(self.cache.stats.refreshes, 1)
+
+    async def test_add_during_load(self):
+        """Регистрация во время перечитывания не теряется."""
+        user = OneUser(3, "Сидор", None, None, 0, "Сидоров")
+        await asyncio.gather(
+            self.cache.get_user(1), self.cache.add_user(user)
+        )
+        self.assertIsNotNone(await self.cache.get_user(3))
+
+    async def test_other_process_changes(self):
+        """Изменения другого процесса видны после перечитывания."""
+        await self.cache.load()
+        await self.users.add_user(OneUser(3, "Сидор", None, None, 0))
+        self.assertIsNone(await self.cache.get_user(3))
+        self.cache.invalidate()
+        self.assertIsNotNone(await self.cache.get_user(3))
+        expiring = self.make_cache("0")
+        await expiring.load()
+        await self.users.change_status(OneUser(3, "Сидор", None, None, 1))
+        self.assertEqual((await expiring.get_user(3)).status, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+"""Тесты кодирования callback_data и маршрутизации нажатий."""
+
+# Standard Library
+import unittest
+
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from aiogram.dispatcher import FSMContext
+from aiogram.dispatcher.filters.state import State, StatesGroup
+
+from app.service.callback import (
+    CallbackAction,
+    CallbackCodec,
+    CallbackData,
+    CallbackRouter,
+)
+from app.service.db import CallbackTokens
+from test.database import DatabaseTestCase
+
+
+class Dialog(StatesGroup):
+    """Состояния диалога для тестов."""
+
+    waiting = State()
+
+
+class FakeCallback:
+    """Нажатие кнопки, записывающее ответы."""
+
+    def __init__(self, data: str) -> None:  # noqa D107
+        self.data = data
+        self.answers = 0
+
+    async def answer(self, *args, **kwargs) -> None:
+        """Отвечает на нажатие."""
+        self.answers += 1
+
+
+class CallbackCodecTest(DatabaseTestCase):
+    """Кодирование и разбор callback_data."""
+
+    def setUp(self) -> None:
+        """Создает кодек."""
+        super().setUp()
+        self.codec = CallbackCodec(CallbackTokens(self.db_file))
+
+    async def test_round_trip(self):
+        """Разобранные данные совпадают с закодированными."""
+        args = (0, 1234567, -35, "Техник Иванов")
+        data = await self.codec.encode(CallbackAction.page, *args)
+        self.assertLessEqual(len(data.encode()), CallbackCodec.max_size)
+        self.assertEqual(
+            await self.codec.decode(data),
+            CallbackData(CallbackAction.page, args),
+        )
+
+    async def test_token_resolved_from_db(self):
+        """Токен строки разрешается новым кодеком через БД."""
+        data = await self.codec.encode(CallbackAction.accept, "Петров")
+        codec = CallbackCodec(CallbackTokens(self.db_file))
+        self.assertEqual(
+            await codec.decode(data),
+            CallbackData(CallbackAction.accept, ("Петров",)),
+        )
+
+    async def test_too_large(self):
+        """Слишком длинные данные кнопки не кодируются."""
+        with self.assertRaises(ValueError):
+            await self.codec.encode(CallbackAction.page, *[36**10] * 8)
+
+    async def test_malformed(self):
+        """Некорректные данные разбираются как неизвестные."""
+        for data in (
+            None,
+            "",
+            "1t:!!",
+            "1t:~unknown",
+            "view_act",
+            "view_act|abc",
+            "unknown|1",
+        ):
+            with self.subTest(data=data):
+                self.assertIsNone(await self.codec.decode(data))
+
+    async def test_legacy(self):
+        """Данные прежнего формата разбираются по-прежнему."""
+        self.assertEqual(
+            await self.codec.decode("view_act|123|456"),
+            CallbackData(CallbackAction.view, (123,)),
+        )
+        self.assertEqual(
+            await self.codec.decode("accept_action|Иванов"),
+            CallbackData(CallbackAction.accept, ("Иванов",)),
+        )
+        self.assertEqual(
+            await self.codec.decode("closing_act_cancel"),
+            CallbackData(CallbackAction.closing_cancel),
+        )
+
+
+class CallbackRouterTest(DatabaseTestCase):
+    """Маршрутизация нажатий кнопок."""
+
+    def setUp(self) -> None:
+        """Создает маршрутизатор с обработчиками действий."""
+        super().setUp()
+        self.codec = CallbackCodec(CallbackTokens(self.db_file))
+        self.router = CallbackRouter(self.codec)
+        self.state = FSMContext(MemoryStorage(), chat=1, user=1)
+        self.calls: list = []
+
+        @self.router.route(CallbackAction.view)
+        async def view(callback, state, cobra_task_id):
+            self.calls.append(("view", cobra_task_id))
+
+        @self.router.route(CallbackAction.closing_accept, state=Dialog.waiting)
+        async def closing_accept(callback, state):
+            self.calls.append(("closing_accept",))
+
+        @self.router.route(CallbackAction.page, state=CallbackRouter.any_state)
+        async def page(callback, state, page):
+            self.calls.append(("page", page))
+
+    async def dispatch(self, action: str, *args) -> FakeCallback:
+        """Передает маршрутизатору нажатие кнопки."""
+        callback = FakeCallback(await self.codec.encode(action, *args))
+        await self.router.dispatch(callback, self.state)
+        return callback
+
+    async def test_stateless_route(self):
+        """Действие без состояния вызывается только вне диалога."""
+        await self.dispatch(CallbackAction.view, 42)
+        await self.state.set_state(Dialog.waiting)
+        callback = await self.dispatch(CallbackAction.view, 43)
+        self.assertEqual(self.calls, [("view", 42)])
+        self.assertEqual(callback.answers, 1)
+
+    async def test_state_route(self):
+        """Действие с состоянием вызывается только в этом состоянии."""
+        callback = await self.dispatch(CallbackAction.closing_accept)
+        self.assertEqual(callback.answers, 1)
+        await self.state.set_state(Dialog.waiting)
+        await self.dispatch(CallbackAction.closing_accept)
+        self.assertEqual(self.calls, [("closing_accept",)])
+
+    async def test_any_state_route(self):
+        """Действие с состоянием "*" вызывается в любом состоянии."""
+        await self.dispatch(CallbackAction.page, 1)
+        await self.state.set_state(Dialog.waiting)
+        await self.dispatch(CallbackAction.page, 2)
+        self.assertEqual(self.calls, [("page", 1), ("page", 2)])
+
+    async def test_malformed_answered(self):
+        """На некорректное нажатие отвечается без вызова обработчика."""
+        for data in ("1v:!!", "1v", "1v:1:2", "1zz:1", "view_act|"):
+            with self.subTest(data=data):
+                callback = FakeCallback(data)
+                await self.router.dispatch(callback, self.state)
+                self.assertEqual(callback.answers, 1)
+        self.assertEqual(self.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,265 @@
+"""Тесты изменения заявок и отчета по заявкам КПО Кобра."""
+
+# Standard Library
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+
+from app.service.cobra import (
+    CobraSyncClient,
+    CobraTable,
+    CobraTaskEdit,
+    CobraTaskReport,
+    CobraTaskReportPacker,
+)
+from app.service.config import CobraConfig
+from app.service.db import Task, TaskMirror
+from app.service.http import CobraSession
+from benchmark.cobra_stub import CobraStub, make_rows
+from test.database import DatabaseTestCase
+
+template_file = "template/config/config.ini.template"
+""" Файл конфигурации с параметрами по умолчанию """
+
+
+class LocalTaskEdit(CobraTaskEdit):
+    """Изменение заявок, запросы которого к КПО Кобра всегда успешны."""
+
+    async def _request(self, params: dict):
+        """Выполняет запрос к КПО Кобра."""
+        return {}
+
+
+class EditTasksTest(DatabaseTestCase):
+    """Изменение заявок с обновлением локальной копии."""
+
+    def setUp(self) -> None:
+        """Создает копию заявок и изменение заявок."""
+        super().setUp()
+        self.mirror = TaskMirror(self.db_file)
+        self.edit = LocalTaskEdit(CobraConfig(template_file))
+        self.edit.mirror = self.mirror
+
+    async def asyncSetUp(self) -> None:
+        """Заполняет копию заявок."""
+        await self.mirror.upsert_tasks([Task(1, tehn="Иванов"), Task(2)])
+        await self.mirror.set_state(
+            TaskMirror.synced_at_state, str(time.time())
+        )
+
+    async def test_mirror_patched(self):
+        """Изменение заявки применяется к копии."""
+        results = await self.edit.edit_tasks({1: {"sttech": "1"}})
+        self.assertTrue(results[0].success)
+        tasks = await self.mirror.get_tasks()
+        self.assertEqual(tasks.get(1).sttech, 1)
+        self.assertTrue(await self.edit._is_mirror_fresh())
+
+    async def test_mirror_error_marks_stale(self):
+        """Ошибка БД не прерывает изменение заявок и отключает копию."""
+        await self.mirror._pool.run(
+            lambda connection: connection.execute("DROP TABLE `task`")
+        )
+        results = await self.edit.edit_tasks(
+            {1: {"sttech": "1"}, 2: {"sttech": "1"}}
+        )
+        self.assertEqual([result.success for result in results], [True, True])
+        self.assertIsNone(
+            await self.mirror.get_state(TaskMirror.synced_at_state)
+        )
+        self.assertFalse(await self.edit._is_mirror_fresh())
+
+
+class FetchMyTasksTest(unittest.IsolatedAsyncioTestCase):
+    """Запрос текущих заявок техника в обход снимка."""
+
+    async def asyncSetUp(self) -> None:
+        """Запускает заменитель КПО Кобра."""
+        self.stub = CobraStub(make_rows(40, tehn_count=20))
+        config = await self.stub.start()
+        config.config.set("Cobra", "snapshot_file", "")
+        self.report = CobraTaskReport(config)
+
+    async def asyncTearDown(self) -> None:
+        """Останавливает заменитель КПО Кобра."""
+        self.report.snapshot.invalidate()
+        await CobraTable.close_session()
+        await self.stub.stop()
+
+    async def test_finished_tasks_excluded(self):
+        """Завершенные заявки и заявки техников с похожим именем не входят."""
+        for row in self.stub.rows:
+            if row["n_abs"] == 100001:
+                row["sttech"] = 3
+        tasks = await self.report.fetch_my_tasks("Техник 1")
+        expected = [
+            row["n_abs"]
+            for row in self.stub.rows
+            if row["tehn"] == "Техник 1" and row["sttech"] != 3
+        ]
+        self.assertEqual([task.n_abs for task in tasks], expected)
+        self.assertNotIn(100001, expected)
+        self.assertEqual(self.stub.requests, 1)
+
+    async def test_snapshot_not_used(self):
+        """Заявка, завершенная после загрузки снимка, не возвращается."""
+        await self.report.get_unfinished_tasks()
+        for row in self.stub.rows:
+            if row["tehn"] == "Техник 1":
+                row["sttech"] = 3
+        self.assertEqual(await self.report.fetch_my_tasks("Техник 1"), ())
+
+
+class ConnectionReuseTest(unittest.IsolatedAsyncioTestCase):
+    """Переиспользование соединений общего пула."""
+
+    async def asyncSetUp(self) -> None:
+        """Запускает заменитель КПО Кобра и подменяет общий пул."""
+        patcher = mock.patch.object(CobraTable, "session", CobraSession())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.stub = CobraStub(make_rows(20))
+        self.report = CobraTaskReport(await self.stub.start())
+
+    async def asyncTearDown(self) -> None:
+        """Закрывает соединения и останавливает заменитель КПО Кобра."""
+        await CobraTable.close_session()
+        await self.stub.stop()
+
+    async def test_sequential_requests_reuse_connection(self):
+        """Последовательные запросы выполняются на одном соединении."""
+        for row in self.stub.rows[:5]:
+            await self.report.fetch_one_task(row["n_abs"], ("n_abs",))
+        stats = CobraTable.session.stats
+        self.assertEqual((stats.opened, stats.reused), (1, 4))
+
+    async def test_concurrent_requests_share_pool(self):
+        """Одновременные запросы возвращают соединения в пул."""
+        for _ in range(3):
+            await asyncio.gather(
+                *(
+                    self.report.fetch_one_task(row["n_abs"], ("n_abs",))
+                    for row in self.stub.rows[:4]
+                )
+            )
+        stats = CobraTable.session.stats
+        self.assertEqual(stats.opened, 4)
+        self.assertEqual(stats.reused, 8)
+
+
+class CobraSyncClientTest(unittest.TestCase):
+    """Синхронный фасад клиента КПО Кобра."""
+
+    def setUp(self) -> None:
+        """Запускает заменитель КПО Кобра в отдельном потоке."""
+        self.stub = CobraStub(make_rows(40, tehn_count=20))
+        self.loop = asyncio.new_event_loop()
+        self.config = self.loop.run_until_complete(self.stub.start())
+        self.config.config.set("Cobra", "snapshot_file", "")
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        """Останавливает заменитель КПО Кобра."""
+        asyncio.run_coroutine_threadsafe(self.stub.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def test_sync_calls(self):
+        """Методы клиента вызываются без цикла событий."""
+        client = CobraSyncClient(CobraTaskReport(self.config))
+        try:
+            tasks = client.fetch_my_tasks("Техник 1")
+            self.assertEqual(len(tasks), 2)
+            task = client.fetch_one_task(tasks[0].n_abs, ("n_abs", "tehn"))
+            self.assertEqual(task.tehn, "Техник 1")
+            self.assertEqual(client.table_name, "zayavki")
+        finally:
+            client.close()
+        self.assertEqual(self.stub.requests, 2)
+
+
+def make_report_task(n_abs: int, zay: str = "*** Нет связи") -> Task:
+    """Возвращает заявку с заполненными полями отчета."""
+    return Task(
+        n_abs,
+        numobj=str(n_abs),
+        nameobj="Магазин «Продукты» 🛒",
+        addrobj="ул. Ленина, д. 1",
+        zay=zay,
+        who="Оператор",
+        prin="Дежурный ПЦН",
+        timez="15.10.2026 09:00:00",
+    )
+
+
+class CobraTaskReportPackerTest(unittest.TestCase):
+    """Разбиение общего отчета на сообщения Telegram."""
+
+    def pack(self, tehn_tasks: dict) -> CobraTaskReportPacker:
+        """Возвращает разбиение с добавленными заявками техников."""
+        packer = CobraTaskReportPacker()
+        for tehn, tasks in tehn_tasks.items():
+            packer.add_tehn_tasks(tehn, tasks)
+        return packer
+
+    def test_messages_within_limit(self):
+        """Сообщения не длиннее 4096 единиц UTF-16 и содержат все заявки."""
+        tehn_tasks = {
+            f"Техник {i}": [make_report_task(i * 100 + j) for j in range(9)]
+            for i in range(10)
+        }
+        messages = self.pack(tehn_tasks).get_messages()
+        self.assertGreater(len(messages), 1)
+        for message in messages:
+            size = len(message.encode("utf-16-le")) // 2
+            self.assertLessEqual(size, CobraTaskReportPacker.max_length)
+            self.assertGreater(size, len(message))
+        text = "".join(messages)
+        positions = [
+            text.index(f"\r\n{task.numobj}\r\n")
+            for tasks in tehn_tasks.values()
+            for task in tasks
+        ]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_tehn_repeated_in_next_message(self):
+        """Имя техника повторяется, если его заявки продолжаются."""
+        tasks = [make_report_task(n_abs) for n_abs in range(40)]
+        messages = self.pack({"Иванов": tasks}).get_messages()
+        self.assertGreater(len(messages), 1)
+        for message in messages:
+            self.assertEqual(message.count("<b>Иванов</b>"), 1)
+
+    def test_long_task_shortened(self):
+        """Заявка длиннее сообщения сокращается, а не разделяется."""
+        task = make_report_task(1, zay="Нет связи " * 1000)
+        messages = self.pack({"Иванов": [task]}).get_messages()
+        self.assertEqual(len(messages), 1)
+        self.assertIn("…</code>", messages[0])
+        self.assertLessEqual(
+            CobraTaskReportPacker.get_size(messages[0]),
+            CobraTaskReportPacker.max_length,
+        )
+
+    def test_digests_match_messages(self):
+        """Контрольные суммы не зависят от даты формирования отчета."""
+        tehn_tasks = {
+            "Иванов": [make_report_task(n_abs) for n_abs in range(30)],
+            "Петров": [make_report_task(100)],
+        }
+        packer = self.pack(tehn_tasks)
+        digests = packer.get_digests()
+        self.assertEqual(len(digests), len(packer.get_messages()))
+        self.assertEqual(self.pack(tehn_tasks).get_digests(), digests)
+        tehn_tasks["Петров"] = [make_report_task(101)]
+        changed = self.pack(tehn_tasks).get_digests()
+        self.assertEqual(changed[:-1], digests[:-1])
+        self.assertNotEqual(changed[-1], digests[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
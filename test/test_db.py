@@ -0,0 +1,91 @@
+"""Тесты пула соединений с БД."""
+
+# Standard Library
+import asyncio
+import sqlite3
+import threading
+import unittest
+
+from app.service.db import ConnectionPool, OneUser, User
+from test.database import DatabaseTestCase
+
+
+class ConnectionPoolTest(DatabaseTestCase):
+    """Выполнение запросов через пул соединений."""
+
+    def setUp(self) -> None:
+        """Создает пул соединений."""
+        super().setUp()
+        self.pool = ConnectionPool.get_pool(self.db_file)
+
+    async def test_shared_pool(self):
+        """Пул соединений с файлом БД общий для процесса."""
+        self.assertIs(ConnectionPool.get_pool(self.db_file), self.pool)
+
+    async def test_wal_mode(self):
+        """Соединения открываются в режиме WAL."""
+        mode = await self.pool.run(
+            lambda connection: connection.execute(
+                "PRAGMA journal_mode"
+            ).fetchone()[0]
+        )
+        self.assertEqual(mode, "wal")
+
+    async def test_transaction_rolled_back(self):
+        """Изменения функции, завершившейся ошибкой, отменяются."""
+
+        def insert_and_fail(connection: sqlite3.Connection) -> None:
+            connection.execute(
+                "INSERT INTO `user` (`chat_id`, `first_name`) VALUES (1, 'a')"
+            )
+            raise sqlite3.IntegrityError("ошибка")
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            await self.pool.run(insert_and_fail)
+        self.assertIsNone(await User(self.db_file).get_user(1))
+
+    async def test_connections_limited(self):
+        """Одновременных соединений открывается не больше size."""
+        threads = set()
+
+        def get_thread(connection: sqlite3.Connection) -> int:
+            threads.add(threading.get_ident())
+            return id(connection)
+
+        connections = await asyncio.gather(
+            *(self.pool.run(get_thread) for _ in range(50))
+        )
+        self.assertLessEqual(len(set(connections)), ConnectionPool.size)
+        self.assertLessEqual(len(threads), ConnectionPool.size)
+
+    async def test_reopened_after_close(self):
+        """После закрытия пула запросы выполняются на новых соединениях."""
+        users = User(self.db_file)
+        await users.add_user(OneUser(1, "Иван", None, None, tehn="Иванов"))
+        await ConnectionPool.close_all()
+        self.assertEqual((await users.get_user(1)).tehn, "Иванов")
+
+    async def test_close_waits_without_blocking_loop(self):
+        """Закрытие ожидает запросы, не блокируя цикл событий."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow(connection: sqlite3.Connection) -> sqlite3.Connection:
+            started.set()
+            release.wait(5)
+            return connection
+
+        query = asyncio.ensure_future(self.pool.run(slow))
+        await asyncio.to_thread(started.wait, 5)
+        closing = asyncio.ensure_future(self.pool.close())
+        await asyncio.sleep(0.05)
+        self.assertFalse(closing.done())
+        release.set()
+        connection = await query
+        await closing
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
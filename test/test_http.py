@@ -0,0 +1,109 @@
+"""Тесты потокового разбора ответов КПО Кобра."""
+
+# Standard Library
+import json
+import unittest
+from unittest import mock
+
+from app.service import http
+
+
+class FakeContent:
+    """Тело ответа, отдающее не больше step байт за чтение."""
+
+    def __init__(self, body: bytes, step: int) -> None:  # noqa D107
+        self.body = body
+        self.step = step
+        self.reads = 0
+
+    async def read(self, n: int = -1) -> bytes:
+        """Возвращает очередной блок тела ответа."""
+        self.reads += 1
+        size = min(n, self.step) if n > 0 else self.step
+        chunk, self.body = self.body[:size], self.body[size:]
+        return chunk
+
+
+async def collect(body: bytes, step: int, key: str = "result") -> list:
+    """Возвращает элементы массива, разобранного по блокам step байт."""
+    content = FakeContent(body, step)
+    return [item async for item in http.iter_json_array(content, key)]
+
+
+class IterJsonArrayTest(unittest.IsolatedAsyncioTestCase):
+    """Потоковый разбор массива верхнего уровня ответа."""
+
+    rows = [
+        {"n_abs": 1, "nameobj": "Магазин «Продукты»", "tehn": "Иванов"},
+        {"n_abs": 2, "zay": "*** Нет связи \"прибор\" ]", "sttech": 0},
+        {"n_abs": 3, "nested": {"a": [1, 2.5, None, True]}},
+        12345,
+        "строка",
+        [],
+        -0.125,
+    ]
+    """ Элементы массива разных типов, в т.ч. многобайтовые строки """
+
+    def setUp(self) -> None:
+        """Отключает ijson и уменьшает размер блока."""
+        patchers = (
+            mock.patch.object(http, "ijson", None),
+            mock.patch.object(http, "chunk_size", 5),
+        )
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_small_chunks(self):
+        """Элементы разбираются при любом разбиении тела на блоки."""
+        body = json.dumps(
+            {"version": 1, "result": self.rows, "count": 7},
+            ensure_ascii=False,
+        ).encode()
+        for step in range(1, 8):
+            with self.subTest(step=step):
+                self.assertEqual(await collect(body, step), self.rows)
+
+    async def test_whitespace_between_items(self):
+        """Пробелы и переводы строк между элементами пропускаются."""
+        body = json.dumps(
+            {"result": self.rows}, ensure_ascii=False, indent=2
+        ).encode()
+        self.assertEqual(await collect(body, 3), self.rows)
+
+    async def test_multibyte_split(self):
+        """Многобайтовый символ, разделенный между блоками, не искажается."""
+        body = '{"result": ["ёжик", "Щ"]}'.encode()
+        self.assertEqual(await collect(body, 1), ["ёжик", "Щ"])
+
+    async def test_empty_array(self):
+        """Пустой массив не содержит элементов."""
+        for body in (b'{"result": []}', b'{"result" : [ \n ]}'):
+            with self.subTest(body=body):
+                self.assertEqual(await collect(body, 2), [])
+
+    async def test_key_not_found(self):
+        """Без массива с ключом разбирается весь ответ."""
+        body = '{"error": "доступ запрещен"}'.encode()
+        with self.assertRaises(KeyError):
+            await collect(body, 4)
+        body = b'{"result": [1], "rows": [2, 3]}'
+        self.assertEqual(await collect(body, 4, key="rows"), [2, 3])
+
+    async def test_truncated_body(self):
+        """Обрыв тела ответа внутри элемента является ошибкой разбора."""
+        body = b'{"result": [{"n_abs": 1}, {"n_abs": '
+        with self.assertRaises(json.JSONDecodeError):
+            await collect(body, 4)
+
+    async def test_read_by_chunks(self):
+        """Тело ответа читается блоками размера chunk_size."""
+        body = json.dumps({"result": list(range(100))}).encode()
+        content = FakeContent(body, len(body))
+        items = [item async for item in http.iter_json_array(content)]
+        self.assertEqual(items, list(range(100)))
+        self.assertGreaterEqual(content.reads, len(body) // 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""Тесты построения запросов к таблицам КПО Кобра."""
+
+# Standard Library
+import json
+import unittest
+import urllib.parse
+from datetime import date
+
+from app.service.db import Task
+from app.service.query import CobraQuery, compile_query
+
+
+def get_params(query: CobraQuery) -> dict:
+    """Возвращает параметры сформированного запроса."""
+    return dict(urllib.parse.parse_qsl(compile_query(query)))
+
+
+class CompileQueryTest(unittest.TestCase):
+    """Формирование параметров запроса api.table.get."""
+
+    def test_server_predicates_in_filter(self):
+        """Условия совпадения и префикса передаются в фильтре."""
+        query = (
+            CobraQuery("zayavki")
+            .startswith("zay", "***")
+            .equals("tehn", "Иванов")
+            .not_equals("sttech", 3)
+        )
+        params = get_params(query)
+        self.assertEqual(params["name"], "zayavki")
+        self.assertEqual(
+            json.loads(params["filter"]), [{"zay": "***"}, {"tehn": "Иванов"}]
+        )
+
+    def test_fields_include_client_predicate_fields(self):
+        """Поля условий приложения добавляются к возвращаемым полям."""
+        query = (
+            CobraQuery("zayavki")
+            .equals("tehn", "Иванов")
+            .date_until("timev", date(2026, 10, 18))
+            .select("n_abs", "numobj")
+        )
+        fields = json.loads(get_params(query)["fields"])
+        self.assertEqual(
+            fields,
+            [{"n_abs": "1"}, {"numobj": "1"}, {"tehn": "1"}, {"timev": "1"}],
+        )
+
+    def test_without_predicates_and_fields(self):
+        """Запрос без условий и полей содержит только имя таблицы."""
+        self.assertEqual(get_params(CobraQuery("lkuser")), {"name": "lkuser"})
+
+    def test_compiled_once(self):
+        """Одинаковые запросы формируются один раз."""
+        compile_query.cache_clear()
+        query = CobraQuery("zayavki").equals("n_abs", 1)
+        self.assertIs(
+            compile_query(query),
+            compile_query(CobraQuery("zayavki").equals("n_abs", 1)),
+        )
+        self.assertEqual(compile_query.cache_info().hits, 1)
+
+
+class AcceptsTest(unittest.TestCase):
+    """Проверка строк ответа КПО Кобра на стороне приложения."""
+
+    def test_equals_rechecked_after_prefix_filter(self):
+        """Совпадение проверяется повторно: фильтр сравнивает начало."""
+        query = CobraQuery("zayavki").equals("tehn", "Иванов")
+        self.assertTrue(query.accepts({"tehn": "Иванов"}))
+        self.assertFalse(query.accepts({"tehn": "Иванова"}))
+
+    def test_equals_number(self):
+        """Число не совпадает с числом, которое начинается так же."""
+        query = CobraQuery("zayavki").equals("n_abs", 12)
+        self.assertTrue(query.accepts({"n_abs": 12}))
+        self.assertFalse(query.accepts({"n_abs": 123}))
+
+    def test_prefix_trusted_to_server(self):
+        """Условие префикса проверяется только фильтром КПО Кобра."""
+        query = CobraQuery("zayavki").startswith("zay", "***")
+        self.assertEqual(query.client_predicates, ())
+        self.assertTrue(query.accepts({}))
+
+    def test_client_only_predicates(self):
+        """Условия, не выражаемые фильтром, проверяются приложением."""
+        query = (
+            CobraQuery("zayavki")
+            .not_equals("sttech", 3)
+            .date_until("timev", date(2026, 10, 18))
+        )
+        self.assertTrue(
+            query.accepts({"sttech": 1, "timev": "18.10.2026 09:00:00"})
+        )
+        self.assertFalse(
+            query.accepts({"sttech": 3, "timev": "18.10.2026 09:00:00"})
+        )
+        self.assertFalse(
+            query.accepts({"sttech": 1, "timev": "19.10.2026 09:00:00"})
+        )
+
+    def test_date_without_value(self):
+        """Строка без даты не удовлетворяет условиям по дате."""
+        until = CobraQuery("zayavki").date_until("timev", date(2026, 10, 18))
+        since = CobraQuery("zayavki").date_from("timev", date(2026, 10, 18))
+        self.assertFalse(until.accepts({"timev": ""}))
+        self.assertFalse(since.accepts({"timev": ""}))
+
+    def test_filter_response(self):
+        """Строки ответа с другим значением поля отбрасываются."""
+        query = CobraQuery("zayavki").equals("tehn", "Петров")
+        rows = [{"tehn": "Петров"}, {"tehn": "Петров-Водкин"}]
+        self.assertEqual(query.filter_response(rows), [{"tehn": "Петров"}])
+
+    def test_matches_task(self):
+        """Все условия проверяются для заявки из снимка."""
+        query = (
+            CobraQuery("zayavki")
+            .startswith("zay", "***")
+            .equals("tehn", "Петров")
+        )
+        self.assertTrue(query.matches(Task(1, zay="*** а", tehn="Петров")))
+        self.assertFalse(query.matches(Task(1, zay="а", tehn="Петров")))
+        self.assertFalse(query.matches(Task(1, zay="*** а", tehn="Петрова")))
+
+
+if __name__ == "__main__":
+    unittest.main()
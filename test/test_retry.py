@@ -0,0 +1,240 @@
+"""Тесты повторов запросов и приостановки запросов к КПО Кобра."""
+
+# Standard Library
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+import aiohttp
+from aiohttp import web
+
+from app.service.cobra import CobraTable, CobraTaskEdit, CobraTaskReport
+from app.service.config import CobraConfig
+from app.service.http import CircuitBreaker, CobraUnavailableError, RetryPolicy
+
+template_file = "template/config/config.ini.template"
+""" Файл конфигурации с параметрами по умолчанию """
+
+
+def make_config(**params: str) -> CobraConfig:
+    """Возвращает параметры подключения к КПО Кобра."""
+    config = CobraConfig(template_file)
+    config.config.read_dict(
+        {
+            "Cobra": {
+                "snapshot_file": "",
+                "retry_backoff": "0",
+                "breaker_reset_timeout": "0.05",
+                **params,
+            }
+        }
+    )
+    return config
+
+
+class FlakyCobra:
+    """Заменитель КПО Кобра, отвечающий заданными кодами ошибок.
+
+    Коды из statuses возвращаются по одному на запрос, после них запросы
+    выполняются успешно.
+    """
+
+    def __init__(self, *statuses: int) -> None:  # noqa D107
+        self.statuses = list(statuses)
+        self.requests = 0
+        self._runner: web.AppRunner | None = None
+
+    async def start(self, config: CobraConfig) -> None:
+        """Запускает сервер и указывает его адрес в параметрах."""
+        app = web.Application()
+        app.router.add_get("/{method}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        config.config.set("Cobra", "host", "http://127.0.0.1")
+        config.config.set("Cobra", "port", str(self._runner.addresses[0][1]))
+
+    async def stop(self) -> None:
+        """Останавливает сервер."""
+        await self._runner.cleanup()  # type: ignore
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.statuses:
+            return web.Response(status=self.statuses.pop(0))
+        return web.json_response({"result": [{"n_abs": 1, "zay": "***"}]})
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    """Приостановка запросов после серии ошибок."""
+
+    def setUp(self) -> None:
+        """Создает приостановку с порогом в три ошибки."""
+        self.breaker = CircuitBreaker()
+        self.breaker.configure(make_config(breaker_threshold="3"))
+
+    def open(self) -> None:
+        """Приостанавливает запросы серией ошибок."""
+        for _ in range(3):
+            self.breaker.check()
+            self.breaker.record_failure()
+
+    def test_opens_after_threshold(self):
+        """Запросы отклоняются после breaker_threshold ошибок подряд."""
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.closed)
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.closed)
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.open)
+        with self.assertRaises(CobraUnavailableError):
+            self.breaker.check()
+        self.assertEqual(self.breaker.stats.opened, 1)
+        self.assertEqual(self.breaker.stats.rejected, 1)
+
+    def test_single_probe_when_half_open(self):
+        """После reset_timeout пропускается один пробный запрос."""
+        self.open()
+        time.sleep(0.06)
+        self.assertEqual(self.breaker.state, CircuitBreaker.half_open)
+        self.breaker.check()
+        with self.assertRaises(CobraUnavailableError):
+            self.breaker.check()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.closed)
+        self.breaker.check()
+
+    def test_failed_probe_reopens(self):
+        """Ошибка пробного запроса снова приостанавливает запросы."""
+        self.open()
+        time.sleep(0.06)
+        self.breaker.check()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.open)
+        self.assertEqual(self.breaker.stats.opened, 1)
+
+
+class RetryPolicyTest(unittest.TestCase):
+    """Выбор повторяемых ошибок и задержки повтора."""
+
+    def test_transient_errors(self):
+        """Повторяются ошибки соединения, таймауты и ответы 5xx."""
+        info = mock.Mock(real_url="http://cobra")
+
+        def response_error(status: int) -> Exception:
+            return aiohttp.ClientResponseError(info, (), status=status)
+
+        for error, transient in (
+            (response_error(503), True),
+            (response_error(500), True),
+            (response_error(404), False),
+            (aiohttp.ClientConnectionError(), True),
+            (asyncio.TimeoutError(), True),
+            (ValueError(), False),
+        ):
+            with self.subTest(error=error):
+                self.assertEqual(RetryPolicy.is_transient(error), transient)
+
+    def test_delay_bounds(self):
+        """Задержка не превышает backoff * 2 ** attempt."""
+        policy = RetryPolicy(3, 0.5)
+        for attempt in range(4):
+            for _ in range(50):
+                delay = policy.get_delay(attempt)
+                self.assertTrue(0 <= delay <= 0.5 * 2**attempt)
+
+
+class CobraRetryTest(unittest.IsolatedAsyncioTestCase):
+    """Повторы и приостановка запросов клиента КПО Кобра."""
+
+    async def asyncSetUp(self) -> None:
+        """Подменяет общую для процесса приостановку запросов."""
+        patcher = mock.patch.object(CobraTable, "breaker", CircuitBreaker())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server: FlakyCobra | None = None
+
+    async def asyncTearDown(self) -> None:
+        """Закрывает соединения и останавливает сервер."""
+        await CobraTable.close_session()
+        if self.server is not None:
+            await self.server.stop()
+
+    async def start(self, *statuses: int, **params: str) -> CobraConfig:
+        """Запускает сервер и возвращает параметры подключения к нему."""
+        config = make_config(**params)
+        self.server = FlakyCobra(*statuses)
+        await self.server.start(config)
+        return config
+
+    async def test_read_retried(self):
+        """Запрос чтения повторяется при ответах 5xx."""
+        config = await self.start(503, 502, retries="2")
+        report = CobraTaskReport(config)
+        self.assertIsNotNone(await report.fetch_one_task(1, ("n_abs",)))
+        self.assertEqual(self.server.requests, 3)  # type: ignore
+
+    async def test_stream_retried(self):
+        """Потоковый запрос повторяется до получения первой строки."""
+        config = await self.start(503, retries="1")
+        tasks = await CobraTaskReport(config).fetch_unfinished_tasks(
+            ("n_abs", "zay")
+        )
+        self.assertEqual([task.n_abs for task in tasks], [1])
+        self.assertEqual(self.server.requests, 2)  # type: ignore
+
+    async def test_retries_exhausted(self):
+        """После retries повторов ошибка передается вызывающему."""
+        config = await self.start(503, 503, 503, retries="1")
+        report = CobraTaskReport(config)
+        with self.assertRaises(aiohttp.ClientResponseError):
+            await report.fetch_one_task(1, ("n_abs",))
+        self.assertEqual(self.server.requests, 2)  # type: ignore
+
+    async def test_client_error_not_retried(self):
+        """Ответ 4xx не повторяется и не приостанавливает запросы."""
+        config = await self.start(404, retries="2", breaker_threshold="1")
+        report = CobraTaskReport(config)
+        with self.assertRaises(aiohttp.ClientResponseError):
+            await report.fetch_one_task(1, ("n_abs",))
+        self.assertEqual(self.server.requests, 1)  # type: ignore
+        self.assertEqual(CobraTable.breaker.state, CircuitBreaker.closed)
+
+    async def test_write_not_retried(self):
+        """Запрос изменения заявки не повторяется."""
+        config = await self.start(503, retries="2")
+        edit = CobraTaskEdit(config)
+        with self.assertRaises(aiohttp.ClientResponseError):
+            await edit.edit_one_task(1, {"sttech": "1"})
+        self.assertEqual(self.server.requests, 1)  # type: ignore
+
+    async def test_breaker_stops_requests(self):
+        """После серии ошибок запросы не отправляются до reset_timeout."""
+        config = await self.start(
+            503, 503, 503, retries="0", breaker_threshold="2"
+        )
+        report = CobraTaskReport(config)
+        for _ in range(2):
+            with self.assertRaises(aiohttp.ClientResponseError):
+                await report.fetch_one_task(1, ("n_abs",))
+        with self.assertRaises(CobraUnavailableError):
+            await report.fetch_one_task(1, ("n_abs",))
+        self.assertEqual(self.server.requests, 2)  # type: ignore
+        await asyncio.sleep(0.06)
+        with self.assertRaises(aiohttp.ClientResponseError):
+            await report.fetch_one_task(1, ("n_abs",))
+        with self.assertRaises(CobraUnavailableError):
+            await report.fetch_one_task(1, ("n_abs",))
+        self.assertEqual(self.server.requests, 3)  # type: ignore
+        await asyncio.sleep(0.06)
+        self.assertIsNotNone(await report.fetch_one_task(1, ("n_abs",)))
+        self.assertEqual(CobraTable.breaker.state, CircuitBreaker.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
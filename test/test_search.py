@@ -0,0 +1,162 @@
+"""Тесты поиска текущих заявок."""
+
+# Standard Library
+import os
+import unittest
+from dataclasses import replace
+
+from app.service.config import TelegramConfig
+from app.service.db import Task, TaskSearchIndex, TaskSet
+from app.service.search import TaskSearch
+from test.database import DatabaseTestCase
+
+
+def make_task(n_abs: int, **fields) -> Task:
+    """Возвращает заявку с заполненными индексируемыми полями."""
+    values = {
+        "numobj": str(n_abs),
+        "nameobj": "Магазин",
+        "addrobj": "ул. Ленина",
+        "zay": "*** Нет связи",
+        **fields,
+    }
+    return Task(n_abs, **values)
+
+
+class FakeSnapshot:
+    """Снимок заявок с номером версии."""
+
+    version = 0
+    """ Номер версии снимка """
+
+
+class FakeReport:
+    """Источник текущих заявок, считающий запросы."""
+
+    def __init__(self, tasks: TaskSet) -> None:  # noqa D107
+        self.snapshot = FakeSnapshot()
+        self.tasks = tasks
+        self.fetches = 0
+
+    async def get_unfinished_tasks(self) -> TaskSet:
+        """Возвращает текущие заявки."""
+        self.fetches += 1
+        return self.tasks
+
+
+class TaskSearchIndexTest(DatabaseTestCase):
+    """Полнотекстовый индекс заявок."""
+
+    def setUp(self) -> None:
+        """Создает индекс."""
+        super().setUp()
+        self.index = TaskSearchIndex(self.db_file)
+
+    async def test_search_by_word_prefixes(self):
+        """Все слова запроса сравниваются с началом слов полей."""
+        await self.index.upsert_tasks(
+            [
+                make_task(1, nameobj="Аптека Здоровье"),
+                make_task(2, addrobj="ул. Пушкина, д. 5"),
+                make_task(3, nameobj="Аптека", addrobj="ул. Пушкина"),
+            ]
+        )
+        self.assertEqual(await self.index.search("апт", 10), [3, 1])
+        self.assertEqual(await self.index.search("пушк апт", 10), [3])
+        self.assertEqual(await self.index.search("3", 10), [3])
+        self.assertEqual(await self.index.search("апт", 1), [3])
+
+    async def test_replace_and_delete(self):
+        """Строки индекса заменяются и удаляются по номеру заявки."""
+        await self.index.upsert_tasks([make_task(1, nameobj="Аптека")])
+        await self.index.upsert_tasks([make_task(1, nameobj="Школа")])
+        self.assertEqual(await self.index.search("аптека", 10), [])
+        self.assertEqual(await self.index.search("школа", 10), [1])
+        await self.index.delete_tasks([1])
+        self.assertEqual(await self.index.get_digests(), {})
+
+    async def test_query_syntax_escaped(self):
+        """Символы синтаксиса FTS5 в запросе не интерпретируются."""
+        await self.index.upsert_tasks([make_task(1, zay='*** "Нет" связи')])
+        for text in ('"нет', "нет OR", "NOT связи", "(связи)", "*", ""):
+            with self.subTest(text=text):
+                await self.index.search(text, 10)
+        self.assertEqual(await self.index.search('"нет" -', 10), [1])
+        self.assertEqual(await self.index.search("*", 10), [])
+
+
+class TaskSearchTest(DatabaseTestCase):
+    """Поиск текущих заявок по индексу."""
+
+    def setUp(self) -> None:
+        """Создает поиск по заявкам источника."""
+        super().setUp()
+        self.tasks = TaskSet(
+            [make_task(1, nameobj="Аптека"), make_task(2, nameobj="Школа")]
+        )
+        self.report = FakeReport(self.tasks)
+        self.index = TaskSearchIndex(self.db_file)
+        self.search = TaskSearch(
+            self.report, self.index, TelegramConfig(os.devnull)
+        )
+
+    async def test_search_without_fetch(self):
+        """Запрос не обращается к источнику после первой сверки."""
+        found = await self.search.search("аптека", 10)
+        self.assertEqual(found, [self.tasks.get(1)])
+        await self.search.search("школа", 10)
+        await self.search.search("магазин", 10)
+        self.assertEqual(self.report.fetches, 1)
+        self.assertEqual(self.search.stats.searches, 3)
+
+    async def test_refresh_changed_only(self):
+        """При сверке записываются только измененные заявки."""
+        await self.search.update()
+        self.assertEqual(self.search.stats.updated, 2)
+        changed = replace(self.tasks.get(2), nameobj="Больница")
+        self.report.tasks = TaskSet([self.tasks.get(1), changed])
+        await self.search.update()
+        self.assertEqual(self.search.stats.updated, 3)
+        self.assertEqual(await self.search.search("школа", 10), [])
+        self.assertEqual(await self.search.search("больн", 10), [changed])
+
+    async def test_refresh_skipped_for_same_snapshot(self):
+        """Неизмененный снимок не сверяется повторно."""
+        await self.search.update()
+        await self.search.update()
+        self.assertEqual(self.search.stats.refreshes, 1)
+
+    async def test_finished_tasks_deleted(self):
+        """Завершенные заявки удаляются из индекса."""
+        await self.search.update()
+        self.report.tasks = TaskSet([self.tasks.get(2)])
+        await self.search.update()
+        self.assertEqual(self.search.stats.deleted, 1)
+        self.assertEqual(await self.search.search("аптека", 10), [])
+
+    async def test_closed_tasks_not_found(self):
+        """Завершенные заявки снимка не индексируются и не возвращаются."""
+        self.report.tasks = TaskSet(
+            [make_task(1, nameobj="Аптека"), make_task(3, sttech=3)]
+        )
+        await self.search.update()
+        self.assertEqual(await self.index.search("магазин", 10), [])
+        self.report.tasks.patch(1, {"sttech": "3"})
+        self.assertEqual(await self.search.search("аптека", 10), [])
+        self.report.snapshot.version += 1
+        await self.search.update()
+        self.assertEqual(self.search.stats.deleted, 1)
+        self.assertEqual(await self.index.get_digests(), {})
+
+    async def test_index_reused_after_restart(self):
+        """После перезапуска сверка сравнивает контрольные суммы индекса."""
+        await self.search.update()
+        restarted = TaskSearch(
+            self.report, self.index, TelegramConfig(os.devnull)
+        )
+        await restarted.update()
+        self.assertEqual(restarted.stats.updated, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
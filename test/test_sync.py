@@ -0,0 +1,79 @@
+"""Тесты синхронизации локальной копии заявок."""
+
+# Standard Library
+import unittest
+
+from app.service.cobra import CobraTaskReport
+from app.service.config import CobraConfig
+from app.service.db import Task, TaskMirror, TaskSet
+from app.service.sync import CobraTaskSync
+from test.database import DatabaseTestCase
+
+
+class FakeReport:
+    """Источник текущих заявок вместо КПО Кобра."""
+
+    snapshot_fields = CobraTaskReport.snapshot_fields
+
+    def __init__(self) -> None:  # noqa D107
+        self.tasks: list = []
+        self.fetches = 0
+
+    async def fetch_unfinished_tasks(self, fields: tuple) -> TaskSet:
+        """Возвращает текущие заявки."""
+        self.fetches += 1
+        return TaskSet(self.tasks)
+
+
+class CobraTaskSyncTest(DatabaseTestCase):
+    """Цикл синхронизации копии."""
+
+    def setUp(self) -> None:
+        """Создает копию заявок и синхронизацию."""
+        super().setUp()
+        self.mirror = TaskMirror(self.db_file)
+        self.report = FakeReport()
+        config = CobraConfig("template/config/config.ini.template")
+        self.sync = CobraTaskSync(
+            self.report, self.mirror, config  # type: ignore
+        )
+
+    async def test_insert_update_delete(self):
+        """Новые, измененные и завершенные заявки применяются к копии."""
+        self.report.tasks = [
+            Task(1, zay="*** а", tehn="Иванов"),
+            Task(2, zay="*** б", tehn="Петров"),
+        ]
+        await self.sync.sync()
+        self.report.tasks = [Task(1, zay="*** а", tehn="Сидоров")]
+        await self.sync.sync()
+        tasks = list(await self.mirror.get_tasks())
+        self.assertEqual([task.tehn for task in tasks], ["Сидоров"])
+        self.assertEqual(
+            (self.sync.stats.inserted, self.sync.stats.updated), (2, 1)
+        )
+        self.assertEqual(self.sync.stats.deleted, 1)
+
+    async def test_change_of_any_field_detected(self):
+        """Изменение текста и адреса заявки попадает в копию за один цикл."""
+        self.report.tasks = [Task(1, zay="*** а", addrobj="ул. Мира")]
+        await self.sync.sync()
+        self.report.tasks = [Task(1, zay="*** б", addrobj="ул. Ленина")]
+        await self.sync.sync()
+        task = (await self.mirror.get_tasks()).get(1)
+        self.assertEqual((task.zay, task.addrobj), ("*** б", "ул. Ленина"))
+
+    async def test_unchanged_not_written(self):
+        """Неизмененные заявки не перезаписываются."""
+        self.report.tasks = [Task(1, zay="*** а")]
+        await self.sync.sync()
+        await self.sync.sync()
+        self.assertEqual(self.sync.stats.updated, 0)
+        self.assertEqual(self.report.fetches, 2)
+        self.assertIsNotNone(
+            await self.mirror.get_state(TaskMirror.synced_at_state)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
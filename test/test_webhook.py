@@ -0,0 +1,74 @@
+"""Тесты получения обновлений Telegram через webhook."""
+
+# Standard Library
+import os
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.service.config import TelegramConfig
+from app.service.webhook import WebhookServer
+
+
+def make_config(secret: str) -> TelegramConfig:
+    """Возвращает параметры Telegram с секретным токеном."""
+    config = TelegramConfig(os.devnull)
+    config.config.read_dict({"Telegram": {"webhook_secret": secret}})
+    return config
+
+
+class WebhookSecretTest(unittest.TestCase):
+    """Проверка секретного токена в файле конфигурации."""
+
+    def test_missing_or_invalid_secret(self):
+        """Без допустимого токена сервер не создается."""
+        for secret in ("", "токен", "a b", "a" * 257):
+            with self.subTest(secret=secret):
+                with self.assertRaises(ValueError):
+                    WebhookServer(make_config(secret))
+
+    def test_valid_secret(self):
+        """Допустимый токен возвращается без изменений."""
+        secret = "Abc_09-" * 10
+        self.assertEqual(make_config(secret).get_webhook_secret(), secret)
+
+
+class WebhookServerTest(unittest.IsolatedAsyncioTestCase):
+    """Прием обновлений http-сервером бота."""
+
+    async def asyncSetUp(self) -> None:
+        """Запускает сервер с обработчиком обновлений."""
+        app = WebhookServer(make_config("secret")).get_app()
+        app.router.add_post("/webhook", self.handle)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+        self.updates = 0
+
+    async def asyncTearDown(self) -> None:
+        """Останавливает сервер."""
+        await self.client.close()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """Учитывает принятое обновление."""
+        self.updates += 1
+        return web.json_response({})
+
+    async def test_update_without_token_rejected(self):
+        """Обновление без токена или с неверным токеном отклоняется."""
+        for headers in ({}, {WebhookServer.secret_header: "other"}):
+            with self.subTest(headers=headers):
+                resp = await self.client.post("/webhook", headers=headers)
+                self.assertEqual(resp.status, 401)
+        self.assertEqual(self.updates, 0)
+
+    async def test_update_with_token_accepted(self):
+        """Обновление с верным токеном передается обработчику."""
+        headers = {WebhookServer.secret_header: "secret"}
+        resp = await self.client.post("/webhook", headers=headers)
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(self.updates, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()